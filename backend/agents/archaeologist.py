@@ -1,26 +1,203 @@
-from services.ast_parser import parser_service
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from config import config
+from services.ast_parser import parser_service, LANG_MAP, Source
+from services.metrics import stage
+
+# Stands in for a nested definition inside its parent's code (see definition_units)
+NESTED_PLACEHOLDER = b"..."
 
 
 class Archaeologist:
-    def analyze_file(self, code: str, file_path: str):
+    def __init__(self, max_snapshots: int = config.INCREMENTAL_MAX_FILES):
+        # (repo, path) -> last parsed revision, kept for incremental re-analysis
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[Any, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def analyze_file(self, code: Union[str, Source], file_path: str):
         """
         Extracts structural information from the code using AST parsing.
+        `code` is preferably the raw file bytes (or a memoryview over them);
+        it is returned untouched as "source" and never decoded as a whole.
         """
-        # In a real system, this would use an LLM or complex static analysis.
-        # Here we use the Tree-sitter parser wrapper.
-        definitions = parser_service.extract_definitions(code, file_path)
-        
-        # Add basic import extraction (simplified)
-        imports = []
-        for line in code.splitlines():
-            if line.strip().startswith("import ") or line.strip().startswith("from "):
-                imports.append(line.strip())
-            if line.strip().startswith("include "): # C/C++
-                imports.append(line.strip())
+        source = code.encode("utf-8") if isinstance(code, str) else code
+        with stage("parse"):
+            definitions, imports = parser_service.extract_structure(source, file_path)
+            if not _has_parser(file_path):
+                imports = self._extract_imports(source)
 
         return {
             "definitions": definitions,
             "imports": imports,
-            "raw_code": code
+            "source": source
+        }
+
+    def needs_full_parse(self, snapshot_key, file_path: str, size: int) -> bool:
+        """
+        Whether reanalyze_file would parse from scratch (no usable previous
+        revision) or the file is too large to reparse in-process; callers
+        then parse in the process pool and pass the structure in.
+        """
+        lang = LANG_MAP.get(os.path.splitext(file_path)[1].lower())
+        if not lang:
+            return False
+        with self._lock:
+            previous = self._snapshots.get(snapshot_key)
+        inline = config.INCREMENTAL_INLINE_MAX_BYTES
+        return (
+            previous is None or previous["lang"] != lang or size > inline
+            or (previous["tree"] is None and len(previous["source"]) > inline)
+        )
+
+    def reanalyze_file(self, code: Union[str, Source], file_path: str, snapshot_key,
+                       structure: Optional[Tuple[List[Dict[str, Any]], List[str]]] = None) -> Dict[str, Any]:
+        """
+        Re-analyzes a file that may have been seen before under snapshot_key.
+        The previous tree is edited and reused so only changed regions are
+        reparsed, and the result lists which definitions were added, removed
+        or changed. Any artifacts stored for the previous revision are
+        returned so callers can skip work when nothing changed.
+
+        `structure` is (definitions, imports) from a full parse done
+        elsewhere (the process pool, see needs_full_parse). Its snapshot has
+        no tree; a later small revision re-creates it from the kept source.
+        """
+        _, ext = os.path.splitext(file_path)
+        lang = LANG_MAP.get(ext.lower())
+        # The snapshot keeps the source for the next diff, so it must own its bytes
+        source = code.encode("utf-8") if isinstance(code, str) else bytes(code)
+
+        with self._lock:
+            previous = self._snapshots.pop(snapshot_key, None)
+
+        if not lang:
+            analysis_data = self.analyze_file(source, file_path)
+            tree, mode = None, "unsupported"
+        else:
+            with stage("parse"):
+                if structure is not None:
+                    tree, mode = None, "full"
+                    definitions, imports = structure
+                else:
+                    if previous is not None and previous["lang"] == lang:
+                        old_tree = previous["tree"]
+                        if old_tree is None:
+                            old_tree = parser_service.parse_source(previous["source"], lang)
+                        tree = parser_service.reparse(old_tree, previous["source"], source, lang)
+                        mode = "incremental"
+                    else:
+                        tree = parser_service.parse_source(source, lang)
+                        mode = "full"
+                    definitions, imports = parser_service.structure_from_tree(tree, lang, source)
+            analysis_data = {
+                "definitions": definitions,
+                "imports": imports,
+                "source": source
+            }
+
+        old_definitions = previous["definitions"] if previous else []
+        old_source = previous["source"] if previous else b""
+        changes = diff_definitions(old_definitions, old_source, analysis_data["definitions"], source)
+        changes["imports_changed"] = previous is None or previous["imports"] != analysis_data["imports"]
+
+        with self._lock:
+            self._snapshots[snapshot_key] = {
+                "lang": lang,
+                "tree": tree,
+                "source": source,
+                "definitions": analysis_data["definitions"],
+                "imports": analysis_data["imports"],
+                "artifacts": {}
+            }
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+
+        return {
+            **analysis_data,
+            "changes": changes,
+            "reparse": mode,
+            "artifacts": previous["artifacts"] if previous else {}
         }
+
+    def store_artifacts(self, snapshot_key, **artifacts):
+        """Attaches derived results (graph, lesson) to the latest snapshot."""
+        with self._lock:
+            snapshot = self._snapshots.get(snapshot_key)
+            if snapshot is not None:
+                snapshot["artifacts"].update(artifacts)
+
+    def _extract_imports(self, source: Source) -> List[str]:
+        # Line-based fallback for files tree-sitter has no grammar for
+        imports = []
+        for line in bytes(source).splitlines():
+            line = line.strip()
+            if line.startswith((b"import ", b"from ", b"include ", b"#include")):
+                imports.append(line.decode("utf-8", errors="replace"))
+        return imports
+
+
+def _has_parser(file_path: str) -> bool:
+    return os.path.splitext(file_path)[1].lower() in LANG_MAP
+
+
+def _definition_identities(definitions: List[Dict[str, Any]], source: bytes) -> Dict[tuple, tuple]:
+    # (parent, type, name, occurrence) -> (definition, content hash)
+    identities = {}
+    seen = {}
+    for defn in definitions:
+        base = (defn.get("parent"), defn.get("type"), defn.get("name"))
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        body = source[defn.get("start_byte", 0):defn.get("end_byte", 0)]
+        identities[base + (occurrence,)] = (defn, hashlib.sha1(body).hexdigest())
+    return identities
+
+
+def diff_definitions(old_definitions: List[Dict[str, Any]], old_source: bytes,
+                     new_definitions: List[Dict[str, Any]], new_source: bytes) -> Dict[str, Any]:
+    """
+    Compares two revisions of a file's definitions by identity and by the
+    hash of each definition's source bytes.
+    """
+    old = _definition_identities(old_definitions, old_source)
+    new = _definition_identities(new_definitions, new_source)
+
+    return {
+        "added": [defn for key, (defn, _) in new.items() if key not in old],
+        "removed": [defn for key, (defn, _) in old.items() if key not in new],
+        "changed": [defn for key, (defn, digest) in new.items() if key in old and old[key][1] != digest]
+    }
+
+
+def definition_units(definitions: List[Dict[str, Any]], source: bytes) -> List[Dict[str, Any]]:
+    """
+    Each definition's own code and its sha256, in definition order. Nested
+    definitions are elided from their parent's code, so editing a method
+    changes the method's digest but not the class's.
+    """
+    spans = [(defn.get("start_byte", 0), defn.get("end_byte", 0)) for defn in definitions]
+    children: List[List[tuple]] = [[] for _ in definitions]
+    stack: List[int] = []
+    for i in sorted(range(len(spans)), key=lambda i: (spans[i][0], -spans[i][1])):
+        while stack and spans[stack[-1]][1] <= spans[i][0]:
+            stack.pop()
+        if stack and spans[i][1] <= spans[stack[-1]][1]:
+            children[stack[-1]].append(spans[i])
+        stack.append(i)
+
+    units = []
+    for (start, end), nested in zip(spans, children):
+        parts, position = [], start
+        for child_start, child_end in nested:
+            parts.append(source[position:child_start])
+            parts.append(NESTED_PLACEHOLDER)
+            position = child_end
+        parts.append(source[position:end])
+        code = b"".join(parts)
+        units.append({"code": code, "digest": hashlib.sha256(code).hexdigest()})
+    return units
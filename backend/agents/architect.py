@@ -1,5 +1,7 @@
 from typing import List, Dict, Any
-import random
+
+from services.graph_layout import tree_layout
+from services.import_resolver import ImportResolver
 
 class Architect:
     def generate_graph(self, analysis_data: Dict[str, Any]) -> Dict[str, List[Any]]:
@@ -11,6 +13,7 @@ class Architect:
         
         nodes = []
         edges = []
+        parents = []  # parent node index per node, consumed by the layout engine
         
         # Create a central node for the File
         file_node_id = "file_main"
@@ -18,11 +21,13 @@ class Architect:
             "id": file_node_id,
             "type": "input", # React Flow type
             "data": { "label": "File Analysis" },
-            "position": { "x": 250, "y": 0 }
         })
+        parents.append(-1)
         
         # Create nodes for definitions
-        class_nodes = {} # Store class positions to help layout methods
+        # Definitions arrive in document order, so the most recent class with
+        # a given name is the enclosing one (O(1) lookup instead of a scan).
+        class_index_by_name = {}
         
         for i, defn in enumerate(definitions):
             node_id = f"def_{i}"
@@ -31,79 +36,361 @@ class Architect:
             parent = defn.get("parent")
             
             # Styling based on type
-            style = {}
-            if def_type == "class":
-                style = { "background": "#e1f5fe", "border": "1px solid #0288d1", "width": 180 }
-            elif def_type == "function":
-                style = { "background": "#f3e5f5", "border": "1px solid #7b1fa2", "width": 150 }
-            
-            # Basic Layout Logic
-            x_pos = 100
-            y_pos = 100
-            
-            if def_type == "class":
-                x_pos = 250 + (len(class_nodes) * 250)
-                y_pos = 200
-                class_nodes[name] = { "x": x_pos, "y": y_pos, "child_count": 0 }
-            elif parent and parent in class_nodes:
-                # Position method relative to parent class
-                p_info = class_nodes[parent]
-                p_info["child_count"] += 1
-                x_pos = p_info["x"] + 20
-                y_pos = p_info["y"] + (p_info["child_count"] * 80)
-            else:
-                # Standalone functions
-                x_pos = 100
-                y_pos = 200 + (i * 80)
+            style = self._style_for(def_type)
 
             nodes.append({
                 "id": node_id,
                 "type": "default",
                 "data": { "label": f"{def_type}: {name}" },
-                "position": { "x": x_pos, "y": y_pos },
                 "style": style
             })
             
             # Edges
-            if parent:
-                # Find parent node id (inefficient O(N^2) but fine for small files)
-                parent_id = next((f"def_{idx}" for idx, d in enumerate(definitions) if d["name"] == parent), file_node_id)
+            parent_index = class_index_by_name.get(parent) if parent else None
+            if parent_index is not None:
+                parent_id = f"def_{parent_index}"
                 edges.append({
                     "id": f"e_{parent_id}_{node_id}",
                     "source": parent_id,
                     "target": node_id,
+                    "kind": "contains",
                     "animated": True,
                     "style": { "stroke": "#7b1fa2" }
                 })
+                parents.append(parent_index + 1)
             else:
                  # Link to main file if no parent class
                 edges.append({
                     "id": f"e_file_{i}",
                     "source": file_node_id,
                     "target": node_id,
+                    "kind": "contains",
                     "animated": True
                 })
+                parents.append(0)
+
+            if def_type == "class":
+                class_index_by_name[name] = i
+            
+        self._add_import_nodes(nodes, edges, parents, imports)
+
+        edges.extend(self._call_edges(definitions, lambda i: f"def_{i}"))
+
+        self._apply_layout(nodes, parents)
             
-        # Create nodes for imports (limit to 3 for visual clarity in MVP)
+        return {
+            "nodes": nodes,
+            "edges": edges
+        }
+
+    def generate_summary_graph(self, analysis_data: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """
+        Level-of-detail variant of generate_graph for large files: only the
+        file node, imports, classes and top-level functions, each with the
+        number of children it hides. Calls between hidden definitions are
+        drawn between their top-level ancestors. Node ids match
+        generate_graph, so expand_node can fill in the rest.
+        """
+        definitions = analysis_data.get("definitions", [])
+        parent_of = self._definition_parents(definitions)
+        child_counts = [0] * len(definitions)
+        for parent in parent_of:
+            if parent is not None:
+                child_counts[parent] += 1
+
+        nodes = [{
+            "id": "file_main",
+            "type": "input",
+            "data": { "label": "File Analysis" },
+        }]
+        edges = []
+        parents = [-1]
+
+        for i, defn in enumerate(definitions):
+            if parent_of[i] is not None:
+                continue
+            nodes.append(self._definition_node(i, defn, child_counts[i]))
+            parents.append(0)
+            edges.append({
+                "id": f"e_file_{i}",
+                "source": "file_main",
+                "target": f"def_{i}",
+                "kind": "contains",
+                "animated": True
+            })
+
+        self._add_import_nodes(nodes, edges, parents, analysis_data.get("imports", []))
+
+        # Each definition's top-level ancestor (parents precede their children)
+        top = list(range(len(definitions)))
+        for i, parent in enumerate(parent_of):
+            if parent is not None:
+                top[i] = top[parent]
+        seen = set()
+        for edge in self._call_edges(definitions, lambda i: f"def_{top[i]}"):
+            if edge["id"] not in seen:
+                seen.add(edge["id"])
+                edges.append(edge)
+
+        self._apply_layout(nodes, parents)
+
+        return {
+            "nodes": nodes,
+            "edges": edges
+        }
+
+    def expand_node(self, analysis_data: Dict[str, Any], node_id: str) -> Dict[str, List[Any]]:
+        """
+        The direct children of `node_id` (a "def_<i>" node of the summary
+        graph), the edges to them and the call edges touching them. Child
+        positions are relative to the expanded node. Raises KeyError for ids
+        that are not definition nodes.
+        """
+        definitions = analysis_data.get("definitions", [])
+        index = int(node_id[4:]) if node_id.startswith("def_") and node_id[4:].isdigit() else -1
+        if not 0 <= index < len(definitions):
+            raise KeyError(node_id)
+
+        parent_of = self._definition_parents(definitions)
+        child_counts = [0] * len(definitions)
+        for parent in parent_of:
+            if parent is not None:
+                child_counts[parent] += 1
+        children = [i for i, parent in enumerate(parent_of) if parent == index]
+
+        nodes = [self._definition_node(i, definitions[i], child_counts[i]) for i in children]
+        edges = [{
+            "id": f"e_{node_id}_def_{i}",
+            "source": node_id,
+            "target": f"def_{i}",
+            "kind": "contains",
+            "animated": True,
+            "style": { "stroke": "#7b1fa2" }
+        } for i in children]
+
+        child_ids = {node["id"] for node in nodes}
+        edges.extend(
+            edge for edge in self._call_edges(definitions, lambda i: f"def_{i}")
+            if edge["source"] in child_ids or edge["target"] in child_ids
+        )
+
+        # Laid out as a subtree under the expanded node, which sits at the origin
+        positions = tree_layout([-1] + [0] * len(children))
+        origin_x, origin_y = positions[0]
+        for node, (x, y) in zip(nodes, positions[1:]):
+            node["position"] = { "x": x - origin_x, "y": y - origin_y }
+
+        return {
+            "nodes": nodes,
+            "edges": edges
+        }
+
+    def generate_repo_graph(self, repo_analysis: Dict[str, Any], root_label: str = "Repository Analysis") -> Dict[str, List[Any]]:
+        """
+        Generates a repository-level graph: one node per file, with that
+        file's definitions hanging off it and import edges between files
+        that import each other.
+        """
+        nodes = []
+        edges = []
+        parents = []
+
+        root_id = "repo_root"
+        nodes.append({
+            "id": root_id,
+            "type": "input",
+            "data": { "label": root_label },
+        })
+        parents.append(-1)
+        file_definitions = []
+
+        for fi, file_info in enumerate(repo_analysis.get("files", [])):
+            file_id = f"file_{fi}"
+            file_index = len(nodes)
+            nodes.append({
+                "id": file_id,
+                "type": "default",
+                "data": { "label": file_info["path"] },
+                "style": { "background": "#e8f5e9", "border": "1px solid #388e3c", "width": 200 }
+            })
+            parents.append(0)
+            edges.append({
+                "id": f"e_{root_id}_{file_id}",
+                "source": root_id,
+                "target": file_id,
+                "kind": "contains"
+            })
+
+            # Parent lookup scoped to this file
+            class_indexes = {}
+            for di, defn in enumerate(file_info.get("definitions", [])):
+                node_id = f"{file_id}_def_{di}"
+                def_type = defn.get("type", "function")
+                name = defn.get("name", "unknown")
+
+                parent_index = class_indexes.get(defn.get("parent"), file_index)
+                if def_type == "class":
+                    class_indexes[name] = len(nodes)
+
+                edges.append({
+                    "id": f"e_{nodes[parent_index]['id']}_{node_id}",
+                    "source": nodes[parent_index]["id"],
+                    "target": node_id,
+                    "kind": "contains"
+                })
+                nodes.append({
+                    "id": node_id,
+                    "type": "default",
+                    "data": { "label": f"{def_type}: {name}" },
+                    "style": self._style_for(def_type)
+                })
+                parents.append(parent_index)
+
+            file_definitions.append((file_id, file_info.get("definitions", [])))
+
+        edges.extend(self._repo_import_edges(repo_analysis.get("files", [])))
+        edges.extend(self._repo_call_edges(file_definitions))
+
+        self._apply_layout(nodes, parents)
+
+        return {
+            "nodes": nodes,
+            "edges": edges
+        }
+
+    def _call_edges(self, definitions: List[Dict[str, Any]], node_id_for, fallback_index=None) -> List[Dict[str, Any]]:
+        """
+        Resolves each definition's called names against a name index of the
+        same file. Methods of the caller's own class win over other matches;
+        unresolved names are looked up in fallback_index (repo-wide) if given.
+        Linear in the number of definitions plus call sites.
+        """
+        by_name = {}
+        by_parent_and_name = {}
+        for i, defn in enumerate(definitions):
+            by_name.setdefault(defn.get("name"), i)
+            by_parent_and_name.setdefault((defn.get("parent"), defn.get("name")), i)
+
+        edges = []
+        for i, defn in enumerate(definitions):
+            source = node_id_for(i)
+            scope = defn.get("name") if defn.get("type") == "class" else defn.get("parent")
+            seen = set()
+            for callee in defn.get("calls", []):
+                j = by_parent_and_name.get((scope, callee), by_name.get(callee))
+                if j is not None:
+                    target = node_id_for(j)
+                elif fallback_index is not None:
+                    target = fallback_index.get(callee)
+                else:
+                    target = None
+                if target is None or target == source or target in seen:
+                    continue
+                seen.add(target)
+                edges.append({
+                    "id": f"e_call_{source}_{target}",
+                    "source": source,
+                    "target": target,
+                    "kind": "call",
+                    "label": "calls",
+                    "style": { "stroke": "#00897b", "strokeDasharray": "2,4" }
+                })
+        return edges
+
+    def _repo_import_edges(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        resolver = ImportResolver(f["path"] for f in files)
+        file_ids = {f["path"]: f"file_{fi}" for fi, f in enumerate(files)}
+
+        edges = []
+        seen = set()
+        for file_info in files:
+            source = file_ids[file_info["path"]]
+            for statement in file_info.get("imports", []):
+                for target_path in resolver.resolve(file_info["path"], statement):
+                    target = file_ids[target_path]
+                    if (source, target) in seen:
+                        continue
+                    seen.add((source, target))
+                    edges.append({
+                        "id": f"e_import_{source}_{target}",
+                        "source": source,
+                        "target": target,
+                        "kind": "import",
+                        "label": "imports",
+                        "style": { "stroke": "#ef6c00", "strokeDasharray": "5,5" }
+                    })
+        return edges
+
+    def _repo_call_edges(self, file_definitions) -> List[Dict[str, Any]]:
+        # Names defined exactly once in the repo can be linked across files
+        repo_index = {}
+        ambiguous = set()
+        for file_id, definitions in file_definitions:
+            for di, defn in enumerate(definitions):
+                name = defn.get("name")
+                if name in repo_index:
+                    ambiguous.add(name)
+                repo_index[name] = f"{file_id}_def_{di}"
+        for name in ambiguous:
+            del repo_index[name]
+
+        edges = []
+        for file_id, definitions in file_definitions:
+            edges.extend(self._call_edges(definitions, lambda i, file_id=file_id: f"{file_id}_def_{i}", repo_index))
+        return edges
+
+    def _definition_parents(self, definitions: List[Dict[str, Any]]) -> List[Any]:
+        """Index of each definition's enclosing class (as drawn by generate_graph), or None."""
+        # Definitions arrive in document order, so the most recent class with
+        # a given name is the enclosing one
+        class_index_by_name = {}
+        parent_of = []
+        for i, defn in enumerate(definitions):
+            parent = defn.get("parent")
+            parent_of.append(class_index_by_name.get(parent) if parent else None)
+            if defn.get("type", "function") == "class":
+                class_index_by_name[defn.get("name", "unknown")] = i
+        return parent_of
+
+    def _definition_node(self, index: int, defn: Dict[str, Any], child_count: int) -> Dict[str, Any]:
+        def_type = defn.get("type", "function")
+        return {
+            "id": f"def_{index}",
+            "type": "default",
+            "data": {
+                "label": f"{def_type}: {defn.get('name', 'unknown')}",
+                "childCount": child_count,
+                "collapsed": child_count > 0
+            },
+            "style": self._style_for(def_type)
+        }
+
+    def _add_import_nodes(self, nodes, edges, parents, imports: List[str]):
+        # Limited to 3 for visual clarity in MVP
         for i, imp in enumerate(imports[:3]):
             imp_id = f"imp_{i}"
             nodes.append({
                 "id": imp_id,
                 "type": "output",
                 "data": { "label": imp },
-                "position": { "x": 50 + (i * 150), "y": 600 }, # Move imports to bottom
                  "style": { "background": "#fff3e0", "border": "1px solid #ef6c00" }
             })
-            
-            # Link file to imports
+            parents.append(0)
             edges.append({
                 "id": f"e_imp_{i}",
-                "source": file_node_id,
+                "source": "file_main",
                 "target": imp_id,
+                "kind": "import",
                 "style": { "stroke": "#ef6c00", "strokeDasharray": "5,5" }
             })
-            
-        return {
-            "nodes": nodes,
-            "edges": edges
-        }
+
+    def _apply_layout(self, nodes: List[Dict[str, Any]], parents: List[int]):
+        for node, (x, y) in zip(nodes, tree_layout(parents)):
+            node["position"] = { "x": x, "y": y }
+
+    def _style_for(self, def_type: str) -> Dict[str, Any]:
+        if def_type == "class":
+            return { "background": "#e1f5fe", "border": "1px solid #0288d1", "width": 180 }
+        if def_type == "function":
+            return { "background": "#f3e5f5", "border": "1px solid #7b1fa2", "width": 150 }
+        return {}
@@ -0,0 +1,208 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from agents.archaeologist import Archaeologist
+from agents.architect import Architect
+from config import config
+from services.artifact_store import artifact_store, artifact_key
+from services.ast_parser import SUPPORTED_EXTENSIONS
+from services.github_loader import iter_repo_archive, git_blob_sha
+from services.metrics import collect_stages, stage
+from services.workers import get_process_pool
+
+archaeologist = Archaeologist()
+architect = Architect()
+
+GRAPH_DETAILS = ("full", "summary", "auto")
+
+# Bump whenever definition/import extraction or graph building changes:
+# stored artifacts of other versions are then ignored (and age out)
+ANALYZER_VERSION = "1"
+
+
+def graph_detail(detail: Optional[str], definition_count: int) -> str:
+    """Resolves a requested level of detail ("auto" or None: by file size) to "full" or "summary"."""
+    detail = detail or config.GRAPH_DETAIL
+    if detail not in GRAPH_DETAILS:
+        raise ValueError(f"detail must be one of {', '.join(GRAPH_DETAILS)}")
+    if detail == "auto":
+        return "summary" if definition_count >= config.GRAPH_SUMMARY_MIN_DEFINITIONS else "full"
+    return detail
+
+
+def run_static_analysis(source: Union[bytes, str], file_path: str,
+                        detail: Optional[str] = "full") -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, float]]:
+    """
+    Runs the CPU-bound stages (Archaeologist + Architect) for one file.
+    Kept at module level so it can be shipped to a worker process; the stage
+    timings are returned so the caller can record them (see services.metrics).
+    The source is not part of the returned analysis (the caller already has
+    it), so it is not pickled back from the worker. `detail` selects the
+    full graph or the summary graph (see graph_detail).
+    """
+    with collect_stages() as timings:
+        analysis_data = archaeologist.analyze_file(source, file_path)
+        with stage("graph"):
+            graph_data = build_graph(analysis_data, graph_detail(detail, len(analysis_data["definitions"])))
+    analysis_data.pop("source")
+    return analysis_data, graph_data, timings
+
+
+def build_graph(analysis_data: Dict[str, Any], resolved_detail: str) -> Dict[str, Any]:
+    if resolved_detail == "summary":
+        graph_data = architect.generate_summary_graph(analysis_data)
+    else:
+        graph_data = architect.generate_graph(analysis_data)
+    graph_data["detail"] = resolved_detail
+    return graph_data
+
+
+def load_artifacts(revision: str, file_path: str, detail: Optional[str]) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    (analysis_data, graph) of a blob from the shared artifact store, or None
+    if its structure was never stored. A graph of another level of detail is
+    rebuilt from the stored structure (and stored), so there is no parse.
+    Blocking; call it from a thread.
+    """
+    key = artifact_key(revision, file_path)
+    structure = artifact_store.get(key, "structure", ANALYZER_VERSION)
+    if structure is None:
+        return None
+    resolved = graph_detail(detail, len(structure["definitions"]))
+    graph_data = artifact_store.get(key, f"graph:{resolved}", ANALYZER_VERSION)
+    if graph_data is None:
+        with stage("graph"):
+            graph_data = build_graph(structure, resolved)
+        artifact_store.put(key, f"graph:{resolved}", ANALYZER_VERSION, graph_data)
+    return {**structure, "revision": revision}, graph_data
+
+
+def save_artifacts(revision: str, file_path: str, analysis_data: Dict[str, Any], graph_data: Optional[Dict[str, Any]] = None):
+    """Stores a blob's structure (and graph) for every worker. Blocking."""
+    key = artifact_key(revision, file_path)
+    artifact_store.put(key, "structure", ANALYZER_VERSION, {
+        "definitions": analysis_data["definitions"],
+        "imports": analysis_data["imports"]
+    })
+    if graph_data is not None:
+        artifact_store.put(key, f"graph:{graph_data['detail']}", ANALYZER_VERSION, graph_data)
+
+
+def load_structure(revision: str, file_path: str) -> Optional[Dict[str, Any]]:
+    """A stored file analysis in the shape analyze_source returns, or None."""
+    structure = artifact_store.get(artifact_key(revision, file_path), "structure", ANALYZER_VERSION)
+    if structure is None:
+        return None
+    return {"path": file_path, "revision": revision, **structure}
+
+
+def analyze_source(source: bytes, file_path: str) -> Dict[str, Any]:
+    """
+    Worker-side analysis of a single file from a repository archive.
+    The source is dropped so only the structure is pickled back.
+    """
+    analysis_data = archaeologist.analyze_file(source, file_path)
+    return {
+        "path": file_path,
+        "revision": git_blob_sha(source),
+        "definitions": analysis_data["definitions"],
+        "imports": analysis_data["imports"]
+    }
+
+
+def run_repo_analysis(repo_url: str, ref: Optional[str] = None, max_in_flight: Optional[int] = None,
+                      progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Streams the repository archive and fans each supported file out to the
+    process pool. Blocking; call it from a thread (e.g. asyncio.to_thread).
+    `max_in_flight` caps how many pool slots this analysis may hold, and
+    progress(done, total) is called from pool threads as files complete
+    (total is None until the whole archive has been read).
+    """
+    pool = get_process_pool()
+    # Bound the number of queued files so the archive is not buffered in memory
+    in_flight = threading.BoundedSemaphore(max_in_flight or config.ANALYSIS_WORKERS * 4)
+    futures = []
+    parsed = set()
+    counter_lock = threading.Lock()
+    counts = {"done": 0, "total": None}
+
+    def on_done(_):
+        in_flight.release()
+        if progress is not None:
+            with counter_lock:
+                counts["done"] += 1
+                done, total = counts["done"], counts["total"]
+            progress(done, total)
+
+    for path, source in iter_repo_archive(repo_url, SUPPORTED_EXTENSIONS, ref=ref):
+        if len(futures) >= config.REPO_MAX_FILES:
+            print(f"Repository has more than {config.REPO_MAX_FILES} supported files, truncating.")
+            break
+        in_flight.acquire()
+        # Blobs another worker (or an earlier run) already parsed skip the pool
+        stored = load_structure(git_blob_sha(source), path)
+        if stored is not None:
+            future = Future()
+            future.set_result(stored)
+        else:
+            future = pool.submit(analyze_source, source, path)
+            parsed.add(path)
+        future.add_done_callback(on_done)
+        futures.append(future)
+    with counter_lock:
+        counts["total"] = len(futures)
+
+    files = []
+    for future in futures:
+        try:
+            file_info = future.result()
+        except Exception as e:
+            print(f"Skipping file after parse failure: {e}")
+            continue
+        files.append(file_info)
+        if file_info["path"] in parsed:
+            save_artifacts(file_info["revision"], file_info["path"], file_info)
+
+    files.sort(key=lambda f: f["path"])
+    repo_analysis = {
+        "files": files,
+        "definitions": [
+            {**defn, "file": f["path"]} for f in files for defn in f["definitions"]
+        ],
+        "imports": sorted({imp for f in files for imp in f["imports"]})
+    }
+    return repo_analysis, architect.generate_repo_graph(repo_analysis)
+
+
+def combine_analyses(files: List[Dict[str, Any]], sources: Dict[str, bytes]) -> Dict[str, Any]:
+    """
+    One analysis covering several files, so a single lesson can be generated
+    for the set. Sources are concatenated under a header per file and each
+    definition's byte offsets are shifted to match, so the prompt builder can
+    truncate or chunk the set exactly like one large file.
+    """
+    parts = []
+    definitions = []
+    offset = 0
+    for file_info in files:
+        header = f"--- {file_info['path']} ---\n".encode("utf-8")
+        body_start = offset + len(header)
+        for defn in file_info["definitions"]:
+            definitions.append({
+                **defn,
+                "file": file_info["path"],
+                "start_byte": defn.get("start_byte", 0) + body_start,
+                "end_byte": defn.get("end_byte", 0) + body_start
+            })
+        source = sources[file_info["path"]]
+        parts.extend((header, source, b"\n"))
+        offset = body_start + len(source) + 1
+
+    return {
+        "files": [f["path"] for f in files],
+        "definitions": definitions,
+        "imports": sorted({imp for f in files for imp in f["imports"]}),
+        "source": b"".join(parts)
+    }
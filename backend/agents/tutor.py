@@ -1,5 +1,20 @@
-from typing import Dict, Any, List
-from services.ai_service import ai_service
+import hashlib
+import os
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
+from agents.archaeologist import definition_units
+from config import config
+from services.ai_service import ai_service, PROMPT_VERSION, DEFINITIONS_PROMPT_VERSION
+from services.lesson_cache import lesson_cache, definition_cache
+from services.prompt_builder import batch_units, definition_label
+
+MISSING_EXPLANATION = "No explanation could be generated for this definition yet; it is retried on the next analysis."
+
+def _definition_summary(unit: Dict[str, Any]) -> str:
+    """A chapter for a definition that is not explained yet: its first line and size."""
+    lines = unit["code"].decode("utf-8", "replace").strip().splitlines()
+    return (f"`{lines[0].strip() if lines else unit['label']}` ({len(lines)} lines). "
+            "This file has more definitions than one analysis explains; this one is explained on the next analysis.")
+
 
 class Tutor:
     def create_lesson(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -7,10 +22,145 @@ class Tutor:
         Generates educational content (Chapters + Quiz) based on the code analysis.
         Uses the AIService (Gemini) to generate content.
         """
-        # Limit the raw code sent to avoid token limits if necessary (Gemini has large window though)
-        # For now, we pass the full analysis data which includes definitions and imports.
-        
-        # In the future, if analysis_data['raw_code'] is too huge, truncate it here.
-        # analysis_data['raw_code'] = analysis_data['raw_code'][:10000] 
-
+        # Token budgeting happens in AIService: this sync path truncates the
+        # raw code to LESSON_TOKEN_BUDGET, the async paths use map-reduce.
         return ai_service.generate_lesson_content(analysis_data)
+
+    async def create_lesson_async(self, analysis_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Non-blocking variant of create_lesson for use inside request handlers.
+        Identical analyses share one cached (or in-flight) generation.
+        """
+        key = lesson_cache.make_key(analysis_data, PROMPT_VERSION, ai_service.model_name)
+        return await lesson_cache.get_or_compute(
+            key,
+            lambda: ai_service.generate_lesson_content_async(analysis_data),
+            # Never cache the fallback lesson; the next request should retry Gemini
+            should_cache=lambda lesson: not ai_service.is_fallback(lesson)
+        )
+
+    def has_cached_lesson(self, analysis_data: Dict[str, Any]) -> bool:
+        """Whether the lesson for this analysis is cached (so its source is not needed)."""
+        return lesson_cache.get(lesson_cache.make_key(analysis_data, PROMPT_VERSION, ai_service.model_name)) is not None
+
+    async def stream_lesson(self, analysis_data: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Yields ("chapter", ...) and ("quiz", ...) events as Gemini produces them.
+        Cached lessons are replayed immediately; only completed streams are
+        cached (a stream failing midway raises before the cache write).
+        """
+        key = lesson_cache.make_key(analysis_data, PROMPT_VERSION, ai_service.model_name)
+        cached = lesson_cache.get(key)
+        if cached is not None:
+            lesson_cache.record("hits")
+            for event in self._lesson_events(cached):
+                yield event
+            return
+
+        lesson_cache.record("misses")
+        lesson = {"chapters": [], "quiz": []}
+        async for kind, item in ai_service.stream_lesson_content(analysis_data):
+            if kind == "fallback":
+                for event in self._lesson_events(item):
+                    yield event
+                return
+            lesson["chapters" if kind == "chapter" else "quiz"].append(item)
+            yield kind, item
+
+        if lesson["chapters"]:
+            lesson_cache.put(key, lesson)
+
+    async def create_incremental_lesson(self, analysis_data: Dict[str, Any], file_path: str,
+                                        previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        One chapter per definition, each generated once per content digest
+        and cached, so re-analysis only sends new or edited definitions to
+        the LLM. `previous` is the lesson returned for the last revision; its
+        quiz is kept unless the set of definition digests changed.
+        Files without definitions get the regular whole-file lesson.
+        """
+        definitions = analysis_data.get("definitions", [])
+        if not definitions:
+            return await self.create_lesson_async(analysis_data)
+        if ai_service.provider is None:
+            return ai_service._get_fallback_content()
+
+        source = analysis_data.get("source") or b""
+        units = definition_units(definitions, bytes(source))
+        ext = os.path.splitext(file_path)[1].lower()
+        for i, (defn, unit) in enumerate(zip(definitions, units)):
+            unit["id"] = str(i)
+            unit["label"] = definition_label(defn)
+            unit["key"] = hashlib.sha256(
+                f"{DEFINITIONS_PROMPT_VERSION}:{ai_service.model_name}:{ext}:{unit['digest']}".encode("utf-8")
+            ).hexdigest()
+
+        explanations = {}
+        missing = []
+        for unit in units:
+            cached = definition_cache.get(unit["key"])
+            if cached is not None:
+                definition_cache.record("hits")
+                explanations[unit["key"]] = cached["content"]
+            elif unit["key"] not in explanations:
+                definition_cache.record("misses")
+                missing.append(unit)
+                explanations[unit["key"]] = None
+
+        # Bounded LLM work per analysis: definitions past LESSON_MAX_DEFINITION_CALLS
+        # batches get a summary now and are explained on a later analysis
+        batches = batch_units(missing, config.LESSON_CHUNK_TOKENS)
+        deferred = {unit["key"] for batch in batches[config.LESSON_MAX_DEFINITION_CALLS:] for unit in batch}
+        missing = [unit for batch in batches[:config.LESSON_MAX_DEFINITION_CALLS] for unit in batch]
+        if deferred:
+            print(f"Explaining {len(missing)} definitions of {file_path} now, {len(deferred)} later")
+
+        # Identical definitions (same digest) are explained once
+        generated = await ai_service.explain_definitions(missing, file_path)
+        for unit in missing:
+            content = generated.get(unit["id"])
+            if content:
+                definition_cache.put(unit["key"], {"content": content})
+                explanations[unit["key"]] = content
+
+        complete = all(explanations.values())
+        if not any(explanations.values()):
+            return ai_service._get_fallback_content()
+        chapters = [
+            {"title": unit["label"], "content": explanations[unit["key"]] or (
+                _definition_summary(unit) if unit["key"] in deferred else MISSING_EXPLANATION
+            )}
+            for unit in units
+        ]
+
+        digests = sorted({unit["digest"] for unit in units})
+        previous_digests = previous.get("digests") if previous else None
+        quiz = previous.get("quiz") if previous else None
+        if quiz is None or digests != previous_digests:
+            known = set(previous_digests or ())
+            changed = [unit for unit in units if unit["digest"] not in known]
+            # Only removals: there is nothing new to focus on, so quiz the whole file
+            new_quiz = await ai_service.generate_quiz(analysis_data, changed or units, file_path)
+            if new_quiz is not None:
+                quiz = new_quiz
+            else:
+                complete = False
+
+        lesson = {"chapters": chapters, "quiz": quiz or [], "digests": digests}
+        if not complete:
+            # Not stored as an artifact, so the gaps are filled on the next re-analysis
+            lesson["is_partial"] = True
+        return lesson
+
+    def is_fallback(self, lesson: Dict[str, Any]) -> bool:
+        return ai_service.is_fallback(lesson)
+
+    def is_complete(self, lesson: Dict[str, Any]) -> bool:
+        """False for fallback lessons and lessons with missing parts, which should not be reused."""
+        return not ai_service.is_fallback(lesson) and not lesson.get("is_partial", False)
+
+    def _lesson_events(self, lesson: Dict[str, Any]):
+        for chapter in lesson.get("chapters", []):
+            yield "chapter", chapter
+        for question in lesson.get("quiz", []):
+            yield "quiz", question
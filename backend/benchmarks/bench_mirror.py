@@ -0,0 +1,90 @@
+"""
+Fetch latency of the local mirror backend: a throwaway repository with
+synthetic Python files is mirrored, then files are read by path (pinned to
+HEAD) through the persistent `git cat-file --batch` process, cold (first
+read of each file) and warm. No network is used.
+
+Usage (from backend/):
+    python -m benchmarks.bench_mirror
+    python -m benchmarks.bench_mirror --files 1000 --reads 20000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import make_source
+from services.git_mirror import GitMirror
+
+
+def make_repo(path: str, files: int, definitions: int):
+    os.makedirs(path)
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@example.com"]
+    subprocess.run(git + ["init", "-q"], cwd=path, check=True)
+    code = make_source("python", definitions)
+    for i in range(files):
+        with open(os.path.join(path, f"mod_{i}.py"), "w") as f:
+            f.write(code)
+    subprocess.run(git + ["add", "-A"], cwd=path, check=True)
+    subprocess.run(git + ["commit", "-q", "-m", "bench"], cwd=path, check=True)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": statistics.median(samples) * 1e6,
+        "p99": samples[int(0.99 * (len(samples) - 1))] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--definitions", type=int, default=50, help="make_source units per file")
+    parser.add_argument("--reads", type=int, default=5000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-mirror-")
+    try:
+        upstream = os.path.join(root, "upstream")
+        make_repo(upstream, args.files, args.definitions)
+        mirror = GitMirror(upstream, os.path.join(root, "mirror.git"))
+
+        start = time.perf_counter()
+        mirror.ensure()
+        print(f"clone:           {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+        paths = [f"mod_{i}.py" for i in range(args.files)]
+        cold = []
+        for path in paths:
+            start = time.perf_counter()
+            mirror.read(path)
+            cold.append(time.perf_counter() - start)
+
+        warm = []
+        for i in range(args.reads):
+            start = time.perf_counter()
+            mirror.read(paths[i % len(paths)])
+            warm.append(time.perf_counter() - start)
+
+        size = len(mirror.read(paths[0]))
+        for label, samples in (("cold read", cold), ("warm read", warm)):
+            stats = percentiles(samples)
+            print(f"{label + ':':<16} p50 {stats['p50']:8.1f} us   p99 {stats['p99']:8.1f} us   ({size} bytes/file)")
+
+        start = time.perf_counter()
+        mirror.update()
+        print(f"no-op fetch:     {(time.perf_counter() - start) * 1000:8.1f} ms")
+        mirror.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares the precompiled-query definition extraction in AstParser against the
+original recursive Python traversal on synthetic 10k-100k line files.
+
+Usage (from backend/):
+    python -m benchmarks.bench_parser
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ast_parser import AstParser
+
+LINE_COUNTS = [10_000, 50_000, 100_000]
+
+
+def make_python_source(lines: int) -> str:
+    chunk = (
+        "class Model{i}:\n"
+        "    def save(self, value):\n"
+        "        if value:\n"
+        "            return [v * 2 for v in range(value)]\n"
+        "        return None\n"
+        "\n"
+        "def helper{i}(x):\n"
+        "    return x + 1\n"
+        "\n"
+    )
+    per_chunk = chunk.count("\n")
+    return "".join(chunk.format(i=i) for i in range(lines // per_chunk))
+
+
+def legacy_extract(tree, code: str):
+    """The pre-query implementation: recursive closure over node.children."""
+    definitions = []
+
+    def traverse(node, parent_name=None):
+        current_name = parent_name
+        if node.type in ["function_definition", "class_definition", "function_declaration", "class_declaration"]:
+            name_node = node.child_by_field_name("name")
+            if name_node:
+                name = code[name_node.start_byte:name_node.end_byte]
+                def_type = "class" if "class" in node.type else "function"
+                definitions.append({
+                    "type": def_type,
+                    "name": name,
+                    "parent": parent_name,
+                    "start_line": node.start_point[0],
+                    "end_line": node.end_point[0]
+                })
+                if def_type == "class":
+                    current_name = name
+        for child in node.children:
+            traverse(child, current_name)
+
+    traverse(tree.root_node)
+    return definitions
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = AstParser()
+    print(f"{'lines':>8} {'defs':>7} {'legacy (s)':>11} {'query (s)':>10} {'cursor (s)':>11} {'speedup':>8}")
+    for lines in LINE_COUNTS:
+        code = make_python_source(lines)
+        tree, lang = parser.parse_code(code, ".py")
+        query = parser.queries[lang]
+
+        definitions, _ = parser._definitions_from_query(query, tree.root_node)
+        legacy = best_of(lambda: legacy_extract(tree, code))
+        queried = best_of(lambda: parser._definitions_from_query(query, tree.root_node))
+        walked = best_of(lambda: parser._definitions_from_walk(tree.root_node))
+
+        print(f"{lines:>8} {len(definitions):>7} {legacy:>11.3f} {queried:>10.3f} {walked:>11.3f} {legacy / queried:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Before/after benchmark for the /analyze response path on large graphs.
+
+before: GraphData(**graph) + Chapter/QuizQuestion models, then FastAPI's
+        response_model handling (dump, re-validate, serialize) and the
+        stdlib-encoded JSONResponse.
+after:  services.responses.json_response (trusted projection + orjson),
+        uncompressed and with gzip (and brotli when installed).
+
+Usage (from backend/):
+    python -m benchmarks.bench_response
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.requests import Request
+
+from agents.pipeline import run_static_analysis
+from benchmarks.corpus import make_source
+from schemas import AnalyzeResponse, Chapter, GraphData, QuizQuestion
+from services import responses
+from services.responses import json_response
+
+DEFINITION_COUNTS = [1_000, 10_000, 50_000]
+LESSON = {
+    "chapters": [{"title": "Introduction", "content": "x" * 400}] * 3,
+    "quiz": [{"question": "Why?", "options": [{"text": "Because", "id": "a"}], "answer": "a"}] * 2
+}
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def request_with(accept_encoding: str) -> Request:
+    return Request({"type": "http", "method": "POST", "path": "/analyze",
+                    "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+def main():
+    loop = asyncio.new_event_loop()
+    field = create_response_field(name="Response_analyze", type_=AnalyzeResponse)
+
+    def before(graph):
+        model = AnalyzeResponse(
+            graph=GraphData(**graph),
+            chapters=[Chapter(**c) for c in LESSON["chapters"]],
+            quiz=[QuizQuestion(**q) for q in LESSON["quiz"]]
+        )
+        content = loop.run_until_complete(serialize_response(field=field, response_content=model))
+        return JSONResponse(content).body
+
+    encodings = ["identity", "gzip"] + (["br"] if responses.brotli else [])
+    header = f"{'nodes':>7} {'before ms':>10} {'after ms':>9} {'speedup':>8} {'bytes':>10}"
+    header += "".join(f" {e + ' ms':>9} {e + ' bytes':>11}" for e in encodings[1:])
+    print(header)
+
+    for count in DEFINITION_COUNTS:
+        code = make_source("python", count // 3)
+        _, graph, _ = run_static_analysis(code, "bench.py")
+        content = {"graph": graph, **LESSON}
+
+        before_seconds = best_of(lambda: before(graph))
+        results = {}
+        for encoding in encodings:
+            request = request_with(encoding)
+            seconds = best_of(lambda: json_response(request, AnalyzeResponse, content))
+            results[encoding] = (seconds, len(json_response(request, AnalyzeResponse, content).body))
+
+        after_seconds, size = results["identity"]
+        row = f"{len(graph['nodes']):>7} {before_seconds * 1000:>10.1f} {after_seconds * 1000:>9.1f} "
+        row += f"{before_seconds / after_seconds:>7.1f}x {size:>10}"
+        for encoding in encodings[1:]:
+            seconds, encoded_size = results[encoding]
+            row += f" {seconds * 1000:>9.1f} {encoded_size:>11}"
+        print(row)
+
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
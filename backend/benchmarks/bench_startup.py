@@ -0,0 +1,96 @@
+"""
+Cold-start benchmark: how long a fresh backend takes to import, to report
+ready, and to serve its first requests, with and without the lifespan
+prewarm (grammars, worker processes, GitHub and LLM clients).
+
+Each run starts the real app in a uvicorn subprocess against the fake
+GitHub API and the stub LLM from benchmarks.loadtest.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+
+from benchmarks.loadtest import BACKEND_DIR, BackgroundServer, create_fake_github, free_port, start_backend
+
+MODES = {
+    "lazy": {"PREWARM_LANGUAGES": "", "PREWARM_WORKERS": "false"},
+    "prewarm": {"PREWARM_LANGUAGES": "*", "PREWARM_WORKERS": "true"},
+}
+BACKEND_ARGS = SimpleNamespace(llm_latency=0.0, llm_error_rate=0.0, llm_rpm=100_000, llm_tpm=1e9,
+                               llm_retries=0, quiet_app=True)
+
+
+def import_seconds() -> float:
+    """Wall time of `import main` in a fresh interpreter."""
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, env={**os.environ, "LLM_PROVIDER": "stub"})
+    return float(output.decode().strip().splitlines()[-1])
+
+
+async def time_requests(base_url: str, started: float, run: int) -> Dict[str, float]:
+    async with httpx.AsyncClient(timeout=60) as client:
+        while True:
+            try:
+                if (await client.get(f"{base_url}/cache/stats")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                await asyncio.sleep(0.01)
+        timings = {"ready": time.perf_counter() - started}
+        for name in ("first_request", "second_request"):
+            # A new file each time, so no cache hides the cold path
+            payload = {"repo_url": "https://github.com/o/r", "file_path": f"small/startup_{run}_{name}.py"}
+            start = time.perf_counter()
+            response = await client.post(f"{base_url}/analyze", json=payload)
+            response.raise_for_status()
+            timings[name] = time.perf_counter() - start
+    return timings
+
+
+def cold_start(mode: str, github_url: str, run: int) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        started = time.perf_counter()
+        backend = start_backend(port, github_url, BACKEND_ARGS, workdir, extra_env=MODES[mode])
+        try:
+            return asyncio.run(time_requests(f"http://127.0.0.1:{port}", started, run))
+        finally:
+            backend.terminate()
+            backend.wait(timeout=10)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="cold starts per mode (medians are reported)")
+    args = parser.parse_args(argv)
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(f"import main: {statistics.median(imports) * 1000:.0f} ms (median of {args.runs})\n")
+
+    github = create_fake_github()
+    with BackgroundServer(github, free_port()) as server:
+        github_url = f"http://127.0.0.1:{server.server.config.port}"
+        print(f"{'mode':<8} {'ready ms':>9} {'1st req ms':>11} {'2nd req ms':>11}")
+        for mode in MODES:
+            runs = [cold_start(mode, github_url, i) for i in range(args.runs)]
+            medians = {key: statistics.median(r[key] for r in runs) * 1000 for key in runs[0]}
+            print(f"{mode:<8} {medians['ready']:>9.0f} {medians['first_request']:>11.0f} {medians['second_request']:>11.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
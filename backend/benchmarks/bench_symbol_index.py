@@ -0,0 +1,56 @@
+"""
+Measures SymbolIndex lookup latency over a few hundred thousand symbols.
+
+Usage (from backend/):
+    python -m benchmarks.bench_symbol_index
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.symbol_index import SymbolIndex
+
+FILES = 3000
+SYMBOLS_PER_FILE = 100
+WORDS = ["get", "set", "user", "order", "load", "save", "parse", "render", "item",
+         "cache", "handler", "config", "service", "build", "node"]
+QUERIES = [("prefix", "get_user"), ("prefix", "ren"), ("fuzzy", "get_usr"),
+           ("fuzzy", "rendr_item"), ("fuzzy", "cnfig_srvice")]
+
+
+def random_name(rng: random.Random) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))) + str(rng.randint(0, 999))
+
+
+def main():
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SymbolIndex(os.path.join(tmp, "symbols.sqlite3"))
+
+        start = time.perf_counter()
+        index.upsert_files("bench", [
+            (f"pkg/module_{f}.py", "rev", [
+                {"name": random_name(rng), "type": "function", "parent": None, "start_line": i, "end_line": i + 1}
+                for i in range(SYMBOLS_PER_FILE)
+            ])
+            for f in range(FILES)
+        ])
+        print(f"indexed {index.count()} symbols in {time.perf_counter() - start:.1f}s")
+
+        for mode, query in QUERIES:
+            runs = 50
+            start = time.perf_counter()
+            for _ in range(runs):
+                results = index.search(query, repo="bench", mode=mode)
+            elapsed_ms = (time.perf_counter() - start) / runs * 1000
+            print(f"{mode:>6} {query!r:>16}: {elapsed_ms:6.2f} ms  top={results[0]['name'] if results else None}")
+
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Synthetic source files for the benchmarks. Every language in LANG_MAP has a
+small template "unit" (a class with a method plus a free function, or the
+closest equivalent) that is repeated until the requested size is reached.
+"""
+import os
+import sys
+from typing import Dict, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ast_parser import LANG_MAP
+
+TEMPLATES = {
+    "python": (
+        "import os\n",
+        "class Model{i}:\n"
+        "    def save(self, value):\n"
+        "        if value:\n"
+        "            return helper{i}(value)\n"
+        "        return None\n"
+        "\n"
+        "def helper{i}(x):\n"
+        "    return os.path.join(str(x), 'out')\n"
+        "\n"
+    ),
+    "javascript": (
+        "import fs from 'fs';\n",
+        "class Model{i} {{\n"
+        "  save(value) {{\n"
+        "    if (value) {{\n"
+        "      return helper{i}(value);\n"
+        "    }}\n"
+        "    return null;\n"
+        "  }}\n"
+        "}}\n"
+        "\n"
+        "function helper{i}(x) {{\n"
+        "  return fs.existsSync(x);\n"
+        "}}\n"
+        "\n"
+    ),
+    "typescript": (
+        "import * as fs from 'fs';\n",
+        "class Model{i} {{\n"
+        "  save(value: number): boolean | null {{\n"
+        "    if (value) {{\n"
+        "      return helper{i}(value);\n"
+        "    }}\n"
+        "    return null;\n"
+        "  }}\n"
+        "}}\n"
+        "\n"
+        "function helper{i}(x: number): boolean {{\n"
+        "  return fs.existsSync(String(x));\n"
+        "}}\n"
+        "\n"
+    ),
+    "java": (
+        "import java.util.List;\n",
+        "class Model{i} {{\n"
+        "  int save(int value) {{\n"
+        "    if (value > 0) {{\n"
+        "      return helper(value);\n"
+        "    }}\n"
+        "    return 0;\n"
+        "  }}\n"
+        "\n"
+        "  static int helper(int x) {{\n"
+        "    return Math.abs(x) + 1;\n"
+        "  }}\n"
+        "}}\n"
+        "\n"
+    ),
+    "cpp": (
+        "#include <vector>\n",
+        "class Model{i} {{\n"
+        " public:\n"
+        "  int save(int value) {{\n"
+        "    if (value > 0) {{\n"
+        "      return helper{i}(value);\n"
+        "    }}\n"
+        "    return 0;\n"
+        "  }}\n"
+        "}};\n"
+        "\n"
+        "int helper{i}(int x) {{\n"
+        "  return abs(x) + 1;\n"
+        "}}\n"
+        "\n"
+    ),
+    "c": (
+        "#include <stdlib.h>\n",
+        "struct model{i} {{\n"
+        "  int value;\n"
+        "}};\n"
+        "\n"
+        "int save{i}(struct model{i} *m) {{\n"
+        "  if (m->value > 0) {{\n"
+        "    return helper{i}(m->value);\n"
+        "  }}\n"
+        "  return 0;\n"
+        "}}\n"
+        "\n"
+        "int helper{i}(int x) {{\n"
+        "  return abs(x) + 1;\n"
+        "}}\n"
+        "\n"
+    ),
+}
+
+# One representative extension per language
+LANGUAGE_EXTENSIONS: Dict[str, str] = {}
+for _ext, _lang in LANG_MAP.items():
+    LANGUAGE_EXTENSIONS.setdefault(_lang, _ext)
+
+
+def unit_stats(language: str, parser) -> Tuple[int, int]:
+    """(lines, definitions) contributed by one template unit."""
+    unit = TEMPLATES[language][1].format(i=0)
+    definitions = parser.extract_definitions(unit, "unit" + LANGUAGE_EXTENSIONS[language])
+    return unit.count("\n"), max(1, len(definitions))
+
+
+def make_source(language: str, units: int) -> str:
+    header, unit = TEMPLATES[language]
+    return header + "".join(unit.format(i=i) for i in range(max(1, units)))
+
+
+def make_corpus(language: str, axis: str, size: int, parser) -> str:
+    """
+    Source with roughly `size` lines (axis="lines") or `size` definitions
+    (axis="definitions") for the given language.
+    """
+    unit_lines, unit_definitions = unit_stats(language, parser)
+    per_unit = unit_lines if axis == "lines" else unit_definitions
+    return make_source(language, -(-size // per_unit))
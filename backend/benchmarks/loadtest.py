@@ -0,0 +1,392 @@
+"""
+End-to-end load test for POST /analyze.
+
+Starts a fake GitHub contents API in-process and the real backend as a
+single uvicorn worker in a subprocess, wired to the fake GitHub through
+GITHUB_API_URL and to the offline StubProvider as its LLM. Both stand-ins
+have configurable latency and error rates. The app is then driven with a
+fixed concurrency and a weighted request mix, and latency histograms,
+throughput, per-stage latency (from the app's Server-Timing header) and
+errors per pipeline stage are reported.
+
+Scenarios in the mix:
+    hot-small / hot-huge    a few fixed files, so fetch and lesson caches hit
+    cold-small / cold-huge  a new file per request, so every stage runs
+
+Usage (from backend/):
+    python -m benchmarks.loadtest --concurrency 16 --requests 500
+    python -m benchmarks.loadtest --mix hot-small=6,cold-small=3,cold-huge=1 \\
+        --github-latency 0.05 --github-error-rate 0.01 --llm-latency 0.8
+    python -m benchmarks.loadtest --app-url http://127.0.0.1:8000   # already running app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request, Response
+
+from benchmarks.corpus import make_source
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_URL = "https://github.com/loadtest/fixture"
+SCENARIOS = ["hot-small", "cold-small", "hot-huge", "cold-huge"]
+# Latency histogram bucket upper bounds in seconds
+BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, math.inf]
+
+
+def create_fake_github(latency: float = 0.0, error_rate: float = 0.0, small_lines: int = 200,
+                       huge_lines: int = 20_000, seed: int = 0) -> FastAPI:
+    """
+    A stand-in for the GitHub contents API. File paths look like
+    `<small|huge>/<name>.py`; the content is a synthetic Python file of the
+    requested size, unique per name. ETags are honoured, so revalidations
+    return 304 like the real API.
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = Counter()
+
+    @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+    async def contents(owner: str, repo: str, path: str, request: Request):
+        stats["requests"] += 1
+        if latency:
+            await asyncio.sleep(latency)
+        if error_rate and rng.random() < error_rate:
+            stats["errors"] += 1
+            return Response(status_code=503, content="Injected GitHub failure")
+
+        size, _, name = path.partition("/")
+        lines = huge_lines if size == "huge" else small_lines
+        source = f"# {name}\n" + make_source("python", lines // 9)
+        data = source.encode("utf-8")
+        sha = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+        etag = f'"{sha}"'
+        if request.headers.get("if-none-match") == etag:
+            stats["not_modified"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+
+        body = {"path": path, "sha": sha, "encoding": "base64", "content": base64.b64encode(data).decode("ascii")}
+        return Response(json.dumps(body), media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/_stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class BackgroundServer:
+    """Runs a uvicorn server for `app` on a daemon thread."""
+
+    def __init__(self, app: FastAPI, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def start_backend(port: int, github_url: str, args, workdir: str,
+                  extra_env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "GITHUB_API_URL": github_url,
+        "LLM_PROVIDER": "stub",
+        "LLM_STUB_LATENCY": str(args.llm_latency),
+        "LLM_STUB_ERROR_RATE": str(args.llm_error_rate),
+        "LLM_REQUESTS_PER_MINUTE": str(args.llm_rpm),
+        "LLM_TOKENS_PER_MINUTE": str(args.llm_tpm),
+        "LLM_MAX_RETRIES": str(args.llm_retries),
+        "FETCH_CACHE_DIR": os.path.join(workdir, "github"),
+        "SYMBOL_INDEX_PATH": os.path.join(workdir, "symbols.sqlite3"),
+        "JOBS_DB_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "ARTIFACT_STORE_PATH": os.path.join(workdir, "artifacts.sqlite3"),
+    })
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL if args.quiet_app else None
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{base_url}/cache/stats")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Backend at {base_url} did not become ready")
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario {name!r}; expected one of {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """`fetch;dur=12.5, parse;dur=3.1` -> {"fetch": 0.0125, "parse": 0.0031}"""
+    stages = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                stages[name] = float(value) / 1000
+    return stages
+
+
+def classify(status: int, body: Any) -> Optional[str]:
+    """Maps a response to the pipeline stage that failed, or None on success."""
+    if status == 200:
+        chapters = body.get("chapters") or [{}]
+        # The lesson stage degrades to the fallback lesson instead of failing
+        return "lesson" if chapters[0].get("title") == "AI Unavailable" else None
+    detail = str(body.get("detail", "")) if isinstance(body, dict) else ""
+    if detail.startswith("GitHub API error") or "github" in detail.lower():
+        return "fetch"
+    return "analysis"
+
+
+async def drive(client: httpx.AsyncClient, base_url: str, mix: Dict[str, float], concurrency: int,
+                total: Optional[int], duration: Optional[float], hot_files: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    run_id = f"{int(time.time())}{os.getpid()}"
+    cold_counter = itertools.count()
+    issued = itertools.count()
+    deadline = time.monotonic() + duration if duration else None
+    samples = []
+
+    def next_request() -> Optional[Dict[str, str]]:
+        if total is not None and next(issued) >= total:
+            return None
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        scenario = rng.choices(names, weights)[0]
+        size = scenario.split("-")[1]
+        name = f"hot{rng.randrange(hot_files)}" if scenario.startswith("hot") else f"cold{run_id}_{next(cold_counter)}"
+        return {"scenario": scenario, "file_path": f"{size}/{name}.py"}
+
+    async def worker():
+        while True:
+            job = next_request()
+            if job is None:
+                return
+            start = time.perf_counter()
+            stages = {}
+            try:
+                response = await client.post(f"{base_url}/analyze", json={"repo_url": REPO_URL, "file_path": job["file_path"]})
+                status = response.status_code
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = {}
+                stage = classify(status, body)
+                stages = parse_server_timing(response.headers.get("server-timing"))
+            except httpx.TransportError as e:
+                status, stage = 0, "transport"
+                print(f"Transport error: {e!r}")
+            samples.append({
+                "scenario": job["scenario"],
+                "status": status,
+                "error_stage": stage,
+                "seconds": time.perf_counter() - start,
+                "stages": stages,
+            })
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return samples
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def histogram(values: List[float]) -> List[Dict[str, Any]]:
+    counts = [0] * len(BUCKETS)
+    for value in values:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                counts[i] += 1
+                break
+    return [{"le": bound, "count": count} for bound, count in zip(BUCKETS, counts)]
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Latency percentiles, histogram, throughput and per-stage error rates."""
+    def block(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+        latencies = sorted(s["seconds"] for s in group)
+        errors = Counter(s["error_stage"] for s in group if s["error_stage"])
+        return {
+            "requests": len(group),
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0.0,
+            "errors": dict(errors),
+            "error_rates": {stage: count / len(group) for stage, count in errors.items()},
+            "histogram": histogram(latencies),
+        }
+
+    by_scenario = defaultdict(list)
+    for sample in samples:
+        by_scenario[sample["scenario"]].append(sample)
+
+    overall = block(samples)
+    successes = sum(1 for s in samples if not s["error_stage"])
+    overall["elapsed"] = elapsed
+    overall["throughput"] = len(samples) / elapsed if elapsed else 0.0
+    overall["success_throughput"] = successes / elapsed if elapsed else 0.0
+    by_stage = defaultdict(list)
+    for sample in samples:
+        for name, seconds in sample.get("stages", {}).items():
+            by_stage[name].append(seconds)
+    stages = {}
+    for name, values in by_stage.items():
+        values.sort()
+        stages[name] = {"count": len(values), "p50": percentile(values, 0.50), "p99": percentile(values, 0.99),
+                        "mean": sum(values) / len(values)}
+
+    return {
+        "overall": overall,
+        "scenarios": {name: block(group) for name, group in sorted(by_scenario.items())},
+        "stages": stages,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    overall = report["overall"]
+    print(f"\n{overall['requests']} requests in {overall['elapsed']:.1f}s: "
+          f"{overall['throughput']:.1f} req/s ({overall['success_throughput']:.1f} successful req/s)")
+
+    print(f"\n{'scenario':<12} {'n':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}  errors")
+    rows = list(report["scenarios"].items()) + [("all", overall)]
+    for name, block in rows:
+        errors = ", ".join(f"{stage} {rate:.1%}" for stage, rate in sorted(block["error_rates"].items())) or "-"
+        print(f"{name:<12} {block['requests']:>6} {block['p50'] * 1000:>9.1f} {block['p90'] * 1000:>9.1f} "
+              f"{block['p99'] * 1000:>9.1f} {block['max'] * 1000:>9.1f}  {errors}")
+
+    if report["stages"]:
+        print(f"\n{'stage':<14} {'n':>6} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for name, block in report["stages"].items():
+            print(f"{name:<14} {block['count']:>6} {block['mean'] * 1000:>9.1f} {block['p50'] * 1000:>9.1f} {block['p99'] * 1000:>9.1f}")
+
+    print("\nLatency histogram (all requests):")
+    peak = max([b["count"] for b in overall["histogram"]] + [1])
+    for bucket in overall["histogram"]:
+        label = "+Inf" if bucket["le"] == math.inf else f"{bucket['le'] * 1000:g}ms"
+        print(f"  <= {label:>8} {bucket['count']:>6} {'#' * round(40 * bucket['count'] / peak)}")
+
+    if report.get("github"):
+        print(f"\nFake GitHub: {report['github']}")
+
+
+async def run(args) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        await wait_until_ready(client, args.app_url)
+        start = time.perf_counter()
+        samples = await drive(client, args.app_url, mix, args.concurrency, args.requests,
+                              args.duration, args.hot_files, args.seed)
+        report = summarize(samples, time.perf_counter() - start)
+        if args.github_url:
+            report["github"] = (await client.get(f"{args.github_url}/_stats")).json()
+    report["config"] = {k: v for k, v in vars(args).items() if not k.startswith("_")}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-url", help="drive an already running backend instead of starting one")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, help="run for this many seconds instead of a fixed count")
+    parser.add_argument("--mix", default="hot-small=4,cold-small=4,hot-huge=1,cold-huge=1")
+    parser.add_argument("--hot-files", type=int, default=5, help="distinct files per hot scenario")
+    parser.add_argument("--small-lines", type=int, default=200)
+    parser.add_argument("--huge-lines", type=int, default=20_000)
+    parser.add_argument("--github-latency", type=float, default=0.02, help="seconds per fake GitHub request")
+    parser.add_argument("--github-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-retries", type=int, default=2)
+    parser.add_argument("--llm-rpm", type=float, default=100_000, help="LLM requests/minute given to the app's scheduler")
+    parser.add_argument("--llm-tpm", type=float, default=1e9, help="LLM tokens/minute given to the app's scheduler")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request client timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--quiet-app", action="store_true", help="silence the backend's stdout")
+    args = parser.parse_args(argv)
+    if args.duration:
+        args.requests = None
+    args.github_url = None
+
+    if args.app_url:
+        report = asyncio.run(run(args))
+    else:
+        github = create_fake_github(args.github_latency, args.github_error_rate, args.small_lines, args.huge_lines, args.seed)
+        with BackgroundServer(github, free_port()) as server, tempfile.TemporaryDirectory() as workdir:
+            args.github_url = f"http://127.0.0.1:{server.server.config.port}"
+            port = free_port()
+            backend = start_backend(port, args.github_url, args, workdir)
+            args.app_url = f"http://127.0.0.1:{port}"
+            try:
+                report = asyncio.run(run(args))
+            finally:
+                backend.terminate()
+                backend.wait(timeout=10)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nWrote report to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Microbenchmark suite for the static-analysis stages: parsing, definition and
+import extraction (one query pass), graph building, AnalyzeResponse
+construction and JSON serialization. Runs every language in LANG_MAP over synthetic
+corpora of increasing size and records the best-of-N wall time plus the peak
+Python heap (tracemalloc; memory held inside tree-sitter is not counted).
+
+Results are written as JSON and compared against a stored baseline; the run
+exits with status 1 when any stage regresses past the thresholds.
+
+Usage (from backend/):
+    python -m benchmarks.suite                       # full matrix, compare to baseline
+    python -m benchmarks.suite --quick               # smallest sizes only
+    python -m benchmarks.suite --save-baseline       # record a new baseline
+    python -m benchmarks.suite --time-threshold 0.5 --languages python,java
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agents.architect import Architect
+from benchmarks.corpus import LANGUAGE_EXTENSIONS, make_corpus
+from schemas import AnalyzeResponse, Chapter, QuizQuestion
+from services.ast_parser import AstParser
+from services.responses import encode_json, trusted_dump
+
+SIZES = {
+    "lines": [1_000, 10_000, 100_000],
+    "definitions": [100, 1_000, 10_000],
+}
+STAGES = ["parse", "definitions", "graph", "response", "serialize"]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results.json")
+
+LESSON = {
+    "chapters": [{"title": "Introduction", "content": "x" * 400}] * 3,
+    "quiz": [{"question": "Why?", "options": [{"id": "a", "text": "Because"}], "answer": "a"}] * 2
+}
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Best-of-`repeat` wall time, then one extra run under tracemalloc for the peak."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_bytes": peak}
+
+
+def run_case(parser: AstParser, architect: Architect,
+             language: str, axis: str, size: int, repeat: int) -> List[Dict[str, Any]]:
+    code = make_corpus(language, axis, size, parser)
+    source = code.encode("utf-8")
+
+    # Each stage is timed on the output of the previous one
+    tree = parser.parse_source(source, language)
+    definitions, imports = parser.structure_from_tree(tree, language, source)
+    analysis = {"definitions": definitions, "imports": imports, "source": source}
+    graph = architect.generate_graph(analysis)
+    response = build_response(graph)
+
+    stages = {
+        "parse": lambda: parser.parse_source(source, language),
+        "definitions": lambda: parser.structure_from_tree(tree, language, source),
+        "graph": lambda: architect.generate_graph(analysis),
+        "response": lambda: build_response(graph),
+        "serialize": lambda: encode_json(response),
+    }
+
+    results = []
+    for stage in STAGES:
+        result = {
+            "id": f"{language}/{axis}={size}/{stage}",
+            "language": language,
+            "axis": axis,
+            "size": size,
+            "stage": stage,
+            "lines": code.count("\n"),
+            "definitions": len(definitions),
+        }
+        result.update(measure(stages[stage], repeat))
+        results.append(result)
+    return results
+
+
+def build_response(graph: Dict[str, Any]) -> Dict[str, Any]:
+    """Mirrors the construction done by the /analyze handler."""
+    return trusted_dump(AnalyzeResponse, {
+        "graph": graph,
+        "chapters": [Chapter(**c) for c in LESSON["chapters"]],
+        "quiz": [QuizQuestion(**q) for q in LESSON["quiz"]]
+    })
+
+
+def run_suite(languages: List[str], sizes: Dict[str, List[int]], repeat: int,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    parser = AstParser()
+    architect = Architect()
+
+    results = []
+    for language in languages:
+        for axis, axis_sizes in sizes.items():
+            for size in axis_sizes:
+                for result in run_case(parser, architect, language, axis, size, repeat):
+                    results.append(result)
+                    if progress:
+                        progress(result)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "repeat": repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], time_threshold: float,
+            memory_threshold: float, min_seconds: float = 0.005, min_bytes: int = 64 * 1024) -> List[Dict[str, Any]]:
+    """
+    Returns the regressions of `results` against `baseline`. A stage regresses
+    when it is more than `threshold` (a fraction, 0.25 = 25%) slower or larger
+    than the baseline and the absolute difference exceeds the noise floor.
+    Cases missing from either side are ignored.
+    """
+    previous = {r["id"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results.get("results", []):
+        base = previous.get(result["id"])
+        if not base:
+            continue
+        checks = [
+            ("seconds", time_threshold, min_seconds),
+            ("peak_bytes", memory_threshold, min_bytes),
+        ]
+        for metric, threshold, floor in checks:
+            old, new = base[metric], result[metric]
+            if new - old > floor and new > old * (1 + threshold):
+                regressions.append({
+                    "id": result["id"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "ratio": new / old if old else float("inf"),
+                })
+    return regressions
+
+
+def print_result(result: Dict[str, Any]):
+    print(f"{result['id']:<42} {result['seconds'] * 1000:>10.2f} ms {result['peak_bytes'] / 1024:>10.0f} KiB")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", default=",".join(LANGUAGE_EXTENSIONS), help="comma-separated subset of languages")
+    parser.add_argument("--quick", action="store_true", help="only run the smallest size on each axis")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+    parser.add_argument("--time-threshold", type=float, default=0.25, help="allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25, help="allowed peak-memory growth as a fraction")
+    parser.add_argument("--min-seconds", type=float, default=0.005, help="ignore slowdowns smaller than this (timer noise)")
+    args = parser.parse_args(argv)
+
+    languages = [lang.strip() for lang in args.languages.split(",") if lang.strip()]
+    unknown = [lang for lang in languages if lang not in LANGUAGE_EXTENSIONS]
+    if unknown:
+        parser.error(f"unknown languages: {', '.join(unknown)}")
+    sizes = {axis: values[:1] for axis, values in SIZES.items()} if args.quick else SIZES
+
+    results = run_suite(languages, sizes, args.repeat, progress=print_result)
+
+    target = args.baseline if args.save_baseline else args.output
+    with open(target, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {len(results['results'])} results to {target}")
+    if args.save_baseline:
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.time_threshold, args.memory_threshold, args.min_seconds)
+    for r in regressions:
+        print(f"REGRESSION {r['id']} {r['metric']}: {r['baseline']:.6g} -> {r['current']:.6g} ({r['ratio']:.2f}x)")
+    if regressions:
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
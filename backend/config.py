@@ -5,5 +5,105 @@ load_dotenv()
 
 class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+    # Overridable so tests and load tests can point at a local stand-in
+    GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+    # Concurrency limits for the /analyze pipeline
+    ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", os.cpu_count() or 2))
+    GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS", "20"))
+    GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "15"))
+    REPO_MAX_FILE_BYTES = int(os.getenv("REPO_MAX_FILE_BYTES", str(1024 * 1024)))
+    REPO_MAX_FILES = int(os.getenv("REPO_MAX_FILES", "10000"))
+    BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "30"))
+
+    # GitHub fetch cache (memory LRU + content-addressed disk tier)
+    FETCH_CACHE_MAX_BYTES = int(os.getenv("FETCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    FETCH_CACHE_DIR = os.getenv("FETCH_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "github"))
+    FETCH_CACHE_DISK_MAX_BYTES = int(os.getenv("FETCH_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+    FETCH_CACHE_FRESH_SECONDS = float(os.getenv("FETCH_CACHE_FRESH_SECONDS", "30"))
+
+    # Repos served from local bare mirrors instead of the contents API
+    # (comma-separated repo URLs, or "*" for all); refreshed with git fetch
+    GIT_MIRROR_REPOS = os.getenv("GIT_MIRROR_REPOS", "")
+    GIT_MIRROR_DIR = os.getenv("GIT_MIRROR_DIR", os.path.join(os.path.dirname(__file__), ".cache", "mirrors"))
+    GIT_MIRROR_REFRESH_SECONDS = float(os.getenv("GIT_MIRROR_REFRESH_SECONDS", "300"))
+
+    # Generated lesson cache
+    LESSON_CACHE_MAX_ENTRIES = int(os.getenv("LESSON_CACHE_MAX_ENTRIES", "512"))
+    LESSON_CACHE_TTL_SECONDS = float(os.getenv("LESSON_CACHE_TTL_SECONDS", "3600"))
+    CHUNK_SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("CHUNK_SUMMARY_CACHE_MAX_ENTRIES", "4096"))
+    DEFINITION_CACHE_MAX_ENTRIES = int(os.getenv("DEFINITION_CACHE_MAX_ENTRIES", "20000"))
+
+    # Token budgeting for lesson prompts (estimated at ~4 chars per token)
+    LESSON_TOKEN_BUDGET = int(os.getenv("LESSON_TOKEN_BUDGET", "12000"))
+    LESSON_CHUNK_TOKENS = int(os.getenv("LESSON_CHUNK_TOKENS", "3000"))
+    LESSON_MAX_CHUNKS = int(os.getenv("LESSON_MAX_CHUNKS", "12"))
+    # Definition-explanation LLM calls per incremental lesson; later definitions get a summary
+    LESSON_MAX_DEFINITION_CALLS = int(os.getenv("LESSON_MAX_DEFINITION_CALLS", "8"))
+    LESSON_MAP_CONCURRENCY = int(os.getenv("LESSON_MAP_CONCURRENCY", "4"))
+
+    # Graph level of detail: "full", "summary" (collapsed classes, expanded on
+    # demand) or "auto" (summary from GRAPH_SUMMARY_MIN_DEFINITIONS definitions)
+    GRAPH_DETAIL = os.getenv("GRAPH_DETAIL", "auto")
+    GRAPH_SUMMARY_MIN_DEFINITIONS = int(os.getenv("GRAPH_SUMMARY_MIN_DEFINITIONS", "300"))
+    # Analyses behind summary graphs, kept for /graph/{id}/expand
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "256"))
+    ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+
+    # Analysis artifacts (structure, graphs) keyed by blob SHA, shared by all
+    # worker processes (SQLite, WAL); least recently used evicted past the byte bound
+    ARTIFACT_STORE_PATH = os.getenv("ARTIFACT_STORE_PATH", os.path.join(os.path.dirname(__file__), ".cache", "artifacts.sqlite3"))
+    ARTIFACT_STORE_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    # Previous revisions kept per (repo, path) for incremental re-analysis
+    INCREMENTAL_MAX_FILES = int(os.getenv("INCREMENTAL_MAX_FILES", "256"))
+    # Incremental reparses run in-process, holding the GIL (and so the event
+    # loop) while tree-sitter works; only files up to this size take that
+    # path, larger ones (and every first/full parse) go to the process pool
+    INCREMENTAL_INLINE_MAX_BYTES = int(os.getenv("INCREMENTAL_INLINE_MAX_BYTES", str(256 * 1024)))
+
+    # Persistent symbol index (SQLite + FTS5)
+    SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join(os.path.dirname(__file__), ".cache", "symbols.sqlite3"))
+
+    # LLM admission control (see services.llm_scheduler)
+    LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "1000000"))
+    LLM_OUTPUT_TOKENS_ESTIMATE = int(os.getenv("LLM_OUTPUT_TOKENS_ESTIMATE", "1024"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+    LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+    # Startup prewarming (see services.warmup). "*" = every supported language, "" = none
+    PREWARM_LANGUAGES = os.getenv("PREWARM_LANGUAGES", "*")
+    PREWARM_WORKERS = os.getenv("PREWARM_WORKERS", "true").lower() in ("1", "true", "yes")
+    # Load grammars at import time, for pre-fork servers that import the app once (gunicorn --preload)
+    PREWARM_ON_IMPORT = os.getenv("PREWARM_ON_IMPORT", "false").lower() in ("1", "true", "yes")
+
+    # Background jobs (see services.jobs)
+    JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(os.path.dirname(__file__), ".cache", "jobs.sqlite3"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_MAX_RUNNING_PER_CLIENT = int(os.getenv("JOB_MAX_RUNNING_PER_CLIENT", "1"))
+    JOB_MAX_QUEUED_PER_CLIENT = int(os.getenv("JOB_MAX_QUEUED_PER_CLIENT", "100"))
+    JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+    # Running jobs are claimed by one app worker, which refreshes a heartbeat on
+    # them; jobs whose heartbeat is older than JOB_STALE_SECONDS are requeued
+    JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+    # Worker-pool slots one job may occupy; the rest stay free for interactive requests
+    JOB_PARSE_CONCURRENCY = int(os.getenv("JOB_PARSE_CONCURRENCY", str(max(1, ANALYSIS_WORKERS // 2))))
+
+    # Response encoding for large payloads (see services.responses)
+    RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "4096"))
+    RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "5"))
+    RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+    # LLM backend: gemini | stub | record | replay (see services.llm_providers)
+    LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+    LLM_RECORDINGS_DIR = os.getenv("LLM_RECORDINGS_DIR", os.path.join(os.path.dirname(__file__), ".cache", "llm_recordings"))
+    LLM_STUB_LATENCY = float(os.getenv("LLM_STUB_LATENCY", "0"))
+    LLM_STUB_CHAPTERS = int(os.getenv("LLM_STUB_CHAPTERS", "3"))
+    LLM_STUB_CHAPTER_CHARS = int(os.getenv("LLM_STUB_CHAPTER_CHARS", "400"))
+    LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0"))
 
 config = Config()
@@ -1,15 +1,69 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 
-from schemas import AnalyzeRequest, AnalyzeResponse, GraphData, Chapter, QuizQuestion
-from services.github_loader import fetch_file_content
-from agents.archaeologist import Archaeologist
-from agents.architect import Architect
+from schemas import (
+    AnalyzeRequest, AnalyzeResponse, GraphData, Chapter, QuizQuestion,
+    BatchAnalyzeRequest, BatchAnalyzeResponse, JobRequest, JobStatus, MirrorUpdateRequest,
+    RepoAnalyzeRequest, RepoAnalyzeResponse,
+    ReanalyzeResponse, SymbolResult, SymbolSearchResponse
+)
+from services.github_loader import fetch_file_bytes_async, close_async_client, git_blob_sha, known_blob_sha
+from services.artifact_store import artifact_store, artifact_key
+from services.symbol_index import symbol_index
+from services.analysis_cache import analysis_cache
+from services.fetch_cache import fetch_cache
+from services.git_mirror import mirror_manager
+from services.jobs import job_manager, JobLimitError, FAILED, SUCCEEDED
+from services.lesson_cache import lesson_cache
+from services.llm_scheduler import llm_scheduler
+from services.metrics import MetricsMiddleware, record_stages, registry, stage
+from services.responses import encode_json, encoded_response, json_response, trusted_dump
+from services.warmup import prewarm, prewarm_grammars
+from services.workers import run_in_process, shutdown_pools
+from config import config
+from agents.pipeline import (
+    run_static_analysis, run_repo_analysis, analyze_source, combine_analyses, archaeologist, architect,
+    load_artifacts, save_artifacts, load_structure, GRAPH_DETAILS, ANALYZER_VERSION
+)
 from agents.tutor import Tutor
 
 import traceback
 
-app = FastAPI(title="CodexFlow Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Grammars, worker processes and clients are ready before the worker
+    # reports ready, so the first requests do not pay for them
+    app.state.prewarm = await prewarm()
+    # Resume queued jobs and those whose worker died (see JobManager)
+    job_manager.start()
+    refresh = None
+    if mirror_manager.repos and mirror_manager.refresh_seconds > 0:
+        refresh = asyncio.create_task(mirror_manager.run_refresh_loop())
+    yield
+    if refresh is not None:
+        refresh.cancel()
+    await job_manager.stop()
+    await close_async_client()
+    shutdown_pools()
+    symbol_index.close()
+    job_manager.store.close()
+    mirror_manager.close()
+    artifact_store.close()
+
+if config.PREWARM_ON_IMPORT:
+    # Pre-fork servers import the app once; workers forked afterwards share the grammars
+    prewarm_grammars()
+
+app = FastAPI(title="CodexFlow Backend", lifespan=lifespan)
+
+# Per-stage timings: /metrics histograms and a Server-Timing header per response
+app.add_middleware(MetricsMiddleware)
 
 # Allow CORS for local development
 app.add_middleware(
@@ -21,40 +75,531 @@ app.add_middleware(
 )
 
 # Initialize Agents
-archaeologist = Archaeologist()
-architect = Architect()
+# Archaeologist + Architect mostly run inside the worker pool (see agents.pipeline)
 tutor = Tutor()
 
+async def index_symbols(repo_url: str, file_path: str, revision: str, definitions):
+    """Records a file's definitions in the persistent symbol index."""
+    try:
+        await asyncio.to_thread(symbol_index.upsert_file, repo_url, file_path, revision, definitions)
+    except Exception as e:
+        print(f"Symbol indexing failed for {file_path}: {e}")
+
+def remember_analysis(file_path: str, analysis_data) -> str:
+    """
+    Caches the structure behind a summary graph and returns its graph_id.
+    The id is content-addressed (the artifact store key), so re-analyzing an
+    unchanged file reuses it and other workers can expand it too.
+    """
+    graph_id = artifact_key(analysis_data["revision"], file_path)
+    analysis_cache.put(graph_id, {"definitions": analysis_data["definitions"], "imports": analysis_data["imports"]})
+    return graph_id
+
+def _check_detail(detail: Optional[str]):
+    if detail is not None and detail not in GRAPH_DETAILS:
+        raise HTTPException(status_code=400, detail=f"detail must be one of {', '.join(GRAPH_DETAILS)}")
+
+def _worker_args(source):
+    # A memoryview (e.g. over an mmapped cache blob) cannot be pickled for the worker
+    return source if isinstance(source, bytes) else bytes(source)
+
+def _validated_lesson(lesson_data) -> dict:
+    """LLM output is untrusted, so the lesson is still validated (it is small)."""
+    return {
+        "chapters": [Chapter(**c) for c in lesson_data["chapters"]],
+        "quiz": [QuizQuestion(**q) for q in lesson_data["quiz"]]
+    }
+
+def _no_progress(stage_name: str, done: Optional[int] = None, total: Optional[int] = None):
+    pass
+
+def _recent_revision(repo_url: str, file_path: str) -> Optional[str]:
+    # Without a fetch: from the mirror or fetch cache, else from a fetch any
+    # worker made within the fetch cache's freshness window
+    return known_blob_sha(repo_url, file_path) or artifact_store.path_blob(
+        repo_url, None, file_path, config.FETCH_CACHE_FRESH_SECONDS)
+
+def _store_artifacts(store, *args):
+    # The store is a cache: failing to write it must not fail the analysis
+    try:
+        store(*args)
+    except Exception as e:
+        print(f"Storing analysis artifacts failed: {e}")
+
+async def load_analysis(repo_url: str, file_path: str, detail: Optional[str] = None, progress=_no_progress):
+    """
+    (analysis_data, graph) of a file. When its blob SHA is known without a
+    fetch and another worker (or an earlier run) stored its artifacts, the
+    fetch, parse and layout are all skipped. The analysis always carries
+    "revision" (the blob SHA), and "source" only when the file was fetched.
+    """
+    progress("fetch")
+    with stage("artifacts"):
+        revision = await asyncio.to_thread(_recent_revision, repo_url, file_path)
+        stored = revision and await asyncio.to_thread(load_artifacts, revision, file_path, detail)
+    if stored:
+        return stored
+
+    with stage("fetch"):
+        source = await fetch_file_bytes_async(repo_url, file_path)
+    revision = git_blob_sha(source)
+    await asyncio.to_thread(_store_artifacts, artifact_store.remember_path, repo_url, None, file_path, revision)
+    # The same content may have been stored under another path or repository
+    with stage("artifacts"):
+        stored = await asyncio.to_thread(load_artifacts, revision, file_path, detail)
+    if stored:
+        analysis_data, graph_data_raw = stored
+    else:
+        # Archaeologist Analysis + Architect Graph Generation (CPU-bound, off the event loop)
+        progress("parse")
+        analysis_data, graph_data_raw, timings = await run_in_process(
+            run_static_analysis, _worker_args(source), file_path, detail)
+        record_stages(timings)
+        analysis_data["revision"] = revision
+        await asyncio.to_thread(_store_artifacts, save_artifacts, revision, file_path, analysis_data, graph_data_raw)
+    analysis_data["source"] = source
+    return analysis_data, graph_data_raw
+
+async def ensure_source(repo_url: str, file_path: str, analysis_data):
+    """Stored analyses carry no source; it is fetched only if the lesson is not cached either."""
+    if "source" not in analysis_data and not tutor.has_cached_lesson(analysis_data):
+        with stage("fetch"):
+            analysis_data["source"] = await fetch_file_bytes_async(repo_url, file_path)
+
+async def analyze_file(repo_url: str, file_path: str, progress=_no_progress, detail: Optional[str] = None) -> dict:
+    """
+    The /analyze pipeline, shared with the "analyze" job kind. Returns the
+    AnalyzeResponse content; progress(stage) is called as each stage starts.
+    `detail` selects the full or the summary graph (see pipeline.graph_detail).
+    """
+    # 1-3. Fetch Code, Archaeologist Analysis + Architect Graph Generation
+    # (or none of them, on a shared artifact store hit)
+    print(f"Analyzing {file_path} from {repo_url}...")
+    analysis_data, graph_data_raw = await load_analysis(repo_url, file_path, detail, progress)
+    if graph_data_raw["detail"] == "summary":
+        graph_data_raw["graph_id"] = remember_analysis(file_path, analysis_data)
+    progress("index")
+    with stage("index"):
+        await index_symbols(repo_url, file_path, analysis_data["revision"], analysis_data["definitions"])
+
+    # 4. Tutor Lesson Generation
+    print("Creating lesson content...")
+    progress("lesson")
+    with stage("lesson"):
+        await ensure_source(repo_url, file_path, analysis_data)
+        lesson_data = await tutor.create_lesson_async(analysis_data)
+
+    return {
+        "graph": graph_data_raw,
+        **_validated_lesson(lesson_data)
+    }
+
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze_repo(request: AnalyzeRequest):
+async def analyze_repo(request: AnalyzeRequest, http_request: Request):
+    _check_detail(request.detail)
     try:
-        # 1. Fetch Code
-        print(f"Fetching {request.file_path} from {request.repo_url}...")
-        code = fetch_file_content(request.repo_url, request.file_path)
-        
-        # 2. Archaeologist Analysis
-        print("Analyzing code structure...")
-        analysis_data = archaeologist.analyze_file(code, request.file_path)
-        
-        # 3. Architect Graph Generation
-        print("Generating graph...")
-        graph_data_raw = architect.generate_graph(analysis_data)
-        
-        # 4. Tutor Lesson Generation
-        print("Creating lesson content...")
-        lesson_data = tutor.create_lesson(analysis_data)
+        content = await analyze_file(request.repo_url, request.file_path, detail=request.detail)
+
+        # Assemble Response: the graph was built here, so it is projected onto
+        # the schema without re-validation (see services.responses)
+        with stage("serialize"):
+            return json_response(http_request, AnalyzeResponse, content)
         
-        # Assemble Response
-        return AnalyzeResponse(
-            graph=GraphData(**graph_data_raw),
-            chapters=[Chapter(**c) for c in lesson_data["chapters"]],
-            quiz=[QuizQuestion(**q) for q in lesson_data["quiz"]]
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/reanalyze", response_model=ReanalyzeResponse)
+async def reanalyze_repo(request: AnalyzeRequest, http_request: Request):
+    """
+    Re-analyzes a previously analyzed file. The last parse tree for
+    (repo, path) is reused for small files (full parses run in the process
+    pool), and the graph and lesson are only rebuilt
+    when definitions or imports changed. Lessons have one chapter per
+    definition, so only changed definitions are explained again.
+    """
+    try:
+        snapshot_key = (request.repo_url, request.file_path)
+        with stage("fetch"):
+            source = await fetch_file_bytes_async(request.repo_url, request.file_path)
+
+        # tree-sitter holds the GIL while parsing, so full parses run in the
+        # process pool. Parse trees cannot cross process boundaries, so
+        # incremental reparses of small files stay in-process, where their
+        # cost is proportional to the edit.
+        structure = None
+        if archaeologist.needs_full_parse(snapshot_key, request.file_path, len(source)):
+            parsed = await run_in_process(analyze_source, _worker_args(source), request.file_path)
+            structure = (parsed["definitions"], parsed["imports"])
+        analysis_data = await asyncio.to_thread(
+            archaeologist.reanalyze_file, source, request.file_path, snapshot_key, structure)
+        with stage("index"):
+            await index_symbols(request.repo_url, request.file_path, git_blob_sha(source), analysis_data["definitions"])
+        changes = analysis_data["changes"]
+        artifacts = analysis_data["artifacts"]
+        has_changes = bool(changes["added"] or changes["removed"] or changes["changed"] or changes["imports_changed"])
+
+        graph_data_raw = artifacts.get("graph")
+        if has_changes or graph_data_raw is None:
+            with stage("graph"):
+                graph_data_raw = await asyncio.to_thread(architect.generate_graph, analysis_data)
+
+        previous_lesson = artifacts.get("lesson")
+        lesson_data = previous_lesson
+        if has_changes or lesson_data is None:
+            with stage("lesson"):
+                # Only new or edited definitions reach the LLM; the rest come from the cache
+                lesson_data = await tutor.create_incremental_lesson(analysis_data, request.file_path, previous_lesson)
+
+        archaeologist.store_artifacts(
+            snapshot_key,
+            graph=graph_data_raw,
+            **({"lesson": lesson_data} if tutor.is_complete(lesson_data) else {})
         )
-        
+
+        with stage("serialize"):
+            return json_response(http_request, ReanalyzeResponse, {
+                "graph": graph_data_raw,
+                **_validated_lesson(lesson_data),
+                "changes": changes,
+                "reparse": analysis_data["reparse"]
+            })
+
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def _ndjson_event(event: str, data) -> bytes:
+    return encode_json({"event": event, "data": data}) + b"\n"
+
+@app.post("/analyze/stream")
+async def analyze_repo_stream(request: AnalyzeRequest):
+    """
+    NDJSON variant of /analyze: emits the graph as soon as it is built, then
+    each chapter and quiz question while Gemini is still generating.
+    """
+    _check_detail(request.detail)
+
+    async def events():
+        try:
+            # Stages here run after the headers are sent, so they only reach /metrics
+            analysis_data, graph_data_raw = await load_analysis(request.repo_url, request.file_path, request.detail)
+            if graph_data_raw["detail"] == "summary":
+                graph_data_raw["graph_id"] = remember_analysis(request.file_path, analysis_data)
+            yield _ndjson_event("graph", trusted_dump(GraphData, graph_data_raw))
+
+            with stage("lesson"):
+                await ensure_source(request.repo_url, request.file_path, analysis_data)
+                async for kind, item in tutor.stream_lesson(analysis_data):
+                    model = Chapter if kind == "chapter" else QuizQuestion
+                    try:
+                        yield _ndjson_event(kind, model(**item).model_dump())
+                    except ValidationError as e:
+                        print(f"Skipping malformed {kind}: {e}")
+
+            yield _ndjson_event("done", {})
+            with stage("index"):
+                await index_symbols(request.repo_url, request.file_path, analysis_data["revision"], analysis_data["definitions"])
+
+        except Exception as e:
+            traceback.print_exc()
+            yield _ndjson_event("error", {"detail": str(e)})
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+async def _bounded_gather(coros, limit: int, on_done=None):
+    """gather(return_exceptions=True) with at most `limit` awaiting at once."""
+    semaphore = asyncio.Semaphore(limit)
+    done = 0
+
+    async def run(coro):
+        nonlocal done
+        async with semaphore:
+            try:
+                return await coro
+            finally:
+                done += 1
+                if on_done is not None:
+                    on_done(done)
+
+    return await asyncio.gather(*[run(c) for c in coros], return_exceptions=True)
+
+async def analyze_files(repo_url: str, file_paths, progress=_no_progress, parse_concurrency: Optional[int] = None) -> dict:
+    """
+    The /analyze/batch pipeline, shared with the "batch" job kind. Fetches
+    are bounded by the connection pool size and parsing by
+    `parse_concurrency` worker-pool slots (all of them when None).
+    """
+    paths = list(dict.fromkeys(file_paths))
+    total = len(paths)
+    print(f"Batch analyzing {total} files from {repo_url}...")
+    errors = []
+
+    progress("fetch", 0, total)
+    with stage("fetch"):
+        fetched = await _bounded_gather(
+            [fetch_file_bytes_async(repo_url, path) for path in paths],
+            config.GITHUB_MAX_CONNECTIONS,
+            lambda done: progress("fetch", done, total)
+        )
+    sources = {}
+    for path, result in zip(paths, fetched):
+        if isinstance(result, Exception):
+            errors.append({"path": path, "detail": str(result)})
+        else:
+            sources[path] = _worker_args(result)
+
+    # Files whose blob another worker already parsed come from the artifact store
+    with stage("artifacts"):
+        stored = await asyncio.to_thread(
+            lambda: {path: load_structure(git_blob_sha(source), path) for path, source in sources.items()})
+    to_parse = [path for path in sources if stored[path] is None]
+
+    progress("parse", 0, len(to_parse))
+    with stage("parse"):
+        parsed = await _bounded_gather(
+            [run_in_process(analyze_source, sources[path], path) for path in to_parse],
+            parse_concurrency or len(to_parse) or 1,
+            lambda done: progress("parse", done, len(to_parse))
+        )
+    results = {**stored, **dict(zip(to_parse, parsed))}
+    files = []
+    for path in sources:
+        result = results[path]
+        if isinstance(result, Exception):
+            errors.append({"path": path, "detail": str(result)})
+        else:
+            files.append(result)
+    new_files = [f for f in files if f["path"] in to_parse]
+    await asyncio.to_thread(
+        _store_artifacts, lambda: [save_artifacts(f["revision"], f["path"], f) for f in new_files])
+    if not files:
+        raise Exception("No file in the batch could be analyzed: " + "; ".join(e["detail"] for e in errors))
+
+    progress("graph")
+    with stage("graph"):
+        graph_data_raw = await asyncio.to_thread(architect.generate_repo_graph, {"files": files}, "Batch Analysis")
+    progress("index")
+    with stage("index"):
+        await asyncio.to_thread(
+            symbol_index.upsert_files,
+            repo_url,
+            [(f["path"], f["revision"], f["definitions"]) for f in files]
+        )
+
+    # One lesson (one LLM call within the token budget) for the whole set
+    progress("lesson")
+    with stage("lesson"):
+        lesson_data = await tutor.create_lesson_async(combine_analyses(files, sources))
+
+    return {
+        "graph": graph_data_raw,
+        **_validated_lesson(lesson_data),
+        "files": files,
+        "errors": errors
+    }
+
+@app.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(request: BatchAnalyzeRequest, http_request: Request):
+    """
+    Several files of one repository in one request: fetched concurrently
+    over the shared client, parsed in parallel across the worker pool and
+    merged into one graph (with import edges between the files) and one
+    lesson covering the whole set. Files that fail are reported in `errors`.
+    """
+    paths = list(dict.fromkeys(request.file_paths))
+    if not paths:
+        raise HTTPException(status_code=400, detail="file_paths must not be empty")
+    if len(paths) > config.BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_MAX_FILES} files per batch")
+
+    try:
+        content = await analyze_files(request.repo_url, paths)
+        with stage("serialize"):
+            return json_response(http_request, BatchAnalyzeResponse, content)
+
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def analyze_repository(repo_url: str, ref: Optional[str] = None, progress=_no_progress,
+                             max_in_flight: Optional[int] = None) -> dict:
+    """The /analyze/repo pipeline, shared with the "repo" job kind."""
+    # One tarball download, parsed across the worker pool
+    print(f"Analyzing repository archive {repo_url}@{ref or 'HEAD'}...")
+    loop = asyncio.get_running_loop()
+
+    def report(done, total):
+        # Called from pool threads
+        loop.call_soon_threadsafe(progress, "repo_analysis", done, total)
+
+    progress("repo_analysis")
+    with stage("repo_analysis"):
+        repo_analysis, graph_data_raw = await asyncio.to_thread(run_repo_analysis, repo_url, ref, max_in_flight, report)
+    progress("index")
+    with stage("index"):
+        await asyncio.to_thread(
+            symbol_index.upsert_files,
+            repo_url,
+            [(f["path"], f["revision"], f["definitions"]) for f in repo_analysis["files"]]
+        )
+
+    return {
+        "graph": graph_data_raw,
+        "files": repo_analysis["files"],
+        "file_count": len(repo_analysis["files"]),
+        "definition_count": len(repo_analysis["definitions"])
+    }
+
+@app.post("/analyze/repo", response_model=RepoAnalyzeResponse)
+async def analyze_whole_repo(request: RepoAnalyzeRequest, http_request: Request):
+    try:
+        content = await analyze_repository(request.repo_url, request.ref)
+        with stage("serialize"):
+            return json_response(http_request, RepoAnalyzeResponse, content)
+
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _job_handler(model, run):
+    async def handler(params, progress) -> bytes:
+        content = await run(params, progress)
+        progress("serialize")
+        with stage("serialize"):
+            return encode_json(trusted_dump(model, content))
+    return handler
+
+# Background jobs run the same pipelines, with their share of the worker pool capped
+job_manager.register("analyze", _job_handler(AnalyzeResponse, lambda p, progress: analyze_file(
+    p["repo_url"], p["file_path"], progress, p.get("detail"))))
+job_manager.register("batch", _job_handler(BatchAnalyzeResponse, lambda p, progress: analyze_files(
+    p["repo_url"], p["file_paths"], progress, config.JOB_PARSE_CONCURRENCY)))
+job_manager.register("repo", _job_handler(RepoAnalyzeResponse, lambda p, progress: analyze_repository(
+    p["repo_url"], p.get("ref"), progress, config.JOB_PARSE_CONCURRENCY)))
+
+def _client_id(request) -> str:
+    """Fairness key for jobs: an explicit X-Client-Id, else the peer address."""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(request: JobRequest, http_request: Request):
+    """
+    Queues a long analysis and returns immediately. Poll GET /jobs/{id} or
+    connect to /jobs/{id}/ws for progress, then fetch GET /jobs/{id}/result.
+    """
+    if request.kind == "analyze":
+        if not request.file_path:
+            raise HTTPException(status_code=400, detail="file_path is required for analyze jobs")
+        _check_detail(request.detail)
+        params = {"repo_url": request.repo_url, "file_path": request.file_path, "detail": request.detail}
+    elif request.kind == "batch":
+        paths = list(dict.fromkeys(request.file_paths or []))
+        if not paths or len(paths) > config.REPO_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"batch jobs take 1 to {config.REPO_MAX_FILES} file_paths")
+        params = {"repo_url": request.repo_url, "file_paths": paths}
+    elif request.kind == "repo":
+        params = {"repo_url": request.repo_url, "ref": request.ref}
+    else:
+        raise HTTPException(status_code=400, detail="kind must be 'analyze', 'batch' or 'repo'")
+
+    try:
+        return JobStatus(**await job_manager.submit(request.kind, params, _client_id(http_request)))
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+@app.get("/jobs/stats")
+async def job_stats():
+    return job_manager.stats()
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = await job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return JobStatus(**job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, http_request: Request):
+    """The finished job's response body, as the synchronous endpoint would have returned it."""
+    job = await job_manager.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return encoded_response(http_request, await job_manager.result(job_id))
+
+@app.websocket("/jobs/{job_id}/ws")
+async def watch_job(websocket: WebSocket, job_id: str):
+    """Sends the job's status on connect and after every change, then closes once it finishes."""
+    await websocket.accept()
+    found = False
+    try:
+        async for state in job_manager.watch(job_id):
+            found = True
+            await websocket.send_text(JobStatus(**state).model_dump_json())
+    except WebSocketDisconnect:
+        return
+    await websocket.close(code=1000 if found else 4404)
+
+@app.get("/graph/{graph_id}/expand/{node_id}", response_model=GraphData)
+async def expand_graph_node(graph_id: str, node_id: str, http_request: Request):
+    """
+    Children (nested definitions and their call edges) of a collapsed node of
+    a summary graph, built from the cached analysis: no fetch, no parse.
+    """
+    analysis_data = analysis_cache.get(graph_id)
+    analysis_cache.record("misses" if analysis_data is None else "hits")
+    if analysis_data is None:
+        # Built by another worker, or evicted here: the shared store has the structure too
+        analysis_data = await asyncio.to_thread(artifact_store.get, graph_id, "structure", ANALYZER_VERSION)
+    if analysis_data is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired graph; analyze the file again")
+    try:
+        graph = await asyncio.to_thread(architect.expand_node, analysis_data, node_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown node {node_id}")
+    return json_response(http_request, GraphData, {**graph, "detail": "summary", "graph_id": graph_id})
+
+@app.get("/symbols/search", response_model=SymbolSearchResponse)
+async def search_symbols(q: str, repo_url: Optional[str] = None, mode: str = "prefix",
+                         limit: int = Query(20, ge=1, le=200)):
+    if mode not in ("prefix", "fuzzy"):
+        raise HTTPException(status_code=400, detail="mode must be 'prefix' or 'fuzzy'")
+    results = await asyncio.to_thread(symbol_index.search, q, repo_url, mode, limit)
+    return SymbolSearchResponse(results=[SymbolResult(**r) for r in results])
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "github_fetch": fetch_cache.stats(),
+        "lessons": lesson_cache.stats(),
+        "analyses": analysis_cache.stats(),
+        "mirrors": mirror_manager.stats(),
+        "artifacts": await asyncio.to_thread(artifact_store.stats)
+    }
+
+@app.post("/mirrors/update")
+async def update_mirror(request: MirrorUpdateRequest):
+    """Fetches new revisions into a repo's local mirror (cloning it if needed)."""
+    if not mirror_manager.handles(request.repo_url):
+        raise HTTPException(status_code=404, detail="Repository is not configured for mirroring (GIT_MIRROR_REPOS)")
+    try:
+        return await asyncio.to_thread(mirror_manager.update, request.repo_url)
+    except RuntimeError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+
+@app.get("/llm/stats")
+async def llm_stats():
+    return llm_scheduler.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -4,6 +4,18 @@ from pydantic import BaseModel
 class AnalyzeRequest(BaseModel):
     repo_url: str
     file_path: str
+    detail: Optional[str] = None  # "full" | "summary" | "auto"; defaults to GRAPH_DETAIL
+
+class BatchAnalyzeRequest(BaseModel):
+    repo_url: str
+    file_paths: List[str]
+
+class RepoAnalyzeRequest(BaseModel):
+    repo_url: str
+    ref: Optional[str] = None
+
+class MirrorUpdateRequest(BaseModel):
+    repo_url: str
 
 class GraphNode(BaseModel):
     id: str
@@ -18,10 +30,13 @@ class GraphEdge(BaseModel):
     source: str
     target: str
     label: Optional[str] = None
+    kind: Optional[str] = None  # "contains" | "import" | "call"
 
 class GraphData(BaseModel):
     nodes: List[GraphNode]
     edges: List[GraphEdge]
+    detail: Optional[str] = None  # "full" | "summary"
+    graph_id: Optional[str] = None  # summary graphs: expand nodes via /graph/{graph_id}/expand/{node_id}
 
 class Chapter(BaseModel):
     title: str
@@ -40,3 +55,66 @@ class AnalyzeResponse(BaseModel):
     graph: GraphData
     chapters: List[Chapter]
     quiz: List[QuizQuestion]
+
+class DefinitionChanges(BaseModel):
+    added: List[Dict[str, Any]]
+    removed: List[Dict[str, Any]]
+    changed: List[Dict[str, Any]]
+    imports_changed: bool
+
+class ReanalyzeResponse(AnalyzeResponse):
+    changes: DefinitionChanges
+    reparse: str  # "incremental" | "full" | "unsupported"
+
+class RepoFileAnalysis(BaseModel):
+    path: str
+    revision: Optional[str] = None
+    definitions: List[Dict[str, Any]]
+    imports: List[str]
+
+class RepoAnalyzeResponse(BaseModel):
+    graph: GraphData
+    files: List[RepoFileAnalysis]
+    file_count: int
+    definition_count: int
+
+class BatchFileError(BaseModel):
+    path: str
+    detail: str
+
+class BatchAnalyzeResponse(AnalyzeResponse):
+    files: List[RepoFileAnalysis]
+    errors: List[BatchFileError]
+
+class JobRequest(BaseModel):
+    kind: str  # "analyze" | "batch" | "repo"
+    repo_url: str
+    file_path: Optional[str] = None
+    file_paths: Optional[List[str]] = None
+    ref: Optional[str] = None
+    detail: Optional[str] = None  # analyze jobs: see AnalyzeRequest
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str  # "queued" | "running" | "succeeded" | "failed"
+    stage: Optional[str] = None
+    done: Optional[int] = None
+    total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class SymbolResult(BaseModel):
+    repo: str
+    file: str
+    revision: Optional[str] = None
+    name: str
+    kind: Optional[str] = None
+    parent: Optional[str] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+
+class SymbolSearchResponse(BaseModel):
+    results: List[SymbolResult]
@@ -1,62 +1,231 @@
-import google.generativeai as genai
 from config import config
+import asyncio
+import hashlib
 import json
+import sys
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.lesson_stream import LessonStreamParser
+from services.lesson_cache import chunk_summary_cache
+from services.llm_providers import LLMProvider, MODEL_NAME, create_provider
+from services.llm_scheduler import llm_scheduler
+from services.prompt_builder import (
+    batch_units, build_single_prompt, build_reduce_prompt, chunk_spans, decode_source, definition_label,
+    estimate_tokens, format_units, select_evenly, CHARS_PER_TOKEN, CHUNK_SUMMARY_PROMPT,
+    DEFINITIONS_PROMPT, QUIZ_PROMPT
+)
+
+# Bump whenever _build_prompt changes so cached lessons are invalidated
+PROMPT_VERSION = "2"
+# Same for DEFINITIONS_PROMPT, which keys the per-definition chapter cache
+DEFINITIONS_PROMPT_VERSION = "1"
+QUIZ_MIN_UNIT_TOKENS = 200
 
 class AIService:
-    def __init__(self):
-        if not config.GEMINI_API_KEY:
-            print("Warning: GEMINI_API_KEY not found in environment variables.")
-        else:
-            genai.configure(api_key=config.GEMINI_API_KEY)
-            self.model = genai.GenerativeModel('gemini-2.0-flash')
+    def __init__(self, provider: Optional[LLMProvider] = None):
+        # Built on first use (or by the startup prewarm), not at import time
+        self._provider = provider
+        self._resolved = provider is not None
+
+    @property
+    def provider(self) -> Optional[LLMProvider]:
+        # No provider (e.g. Gemini without an API key) means fallback lessons
+        if not self._resolved:
+            self._provider = create_provider()
+            self._resolved = True
+        return self._provider
+
+    @property
+    def model_name(self) -> str:
+        return self.provider.model_name if self.provider else MODEL_NAME
 
     def generate_lesson_content(self, code_analysis: dict) -> dict:
         """
-        Generates lesson content using Gemini based on the code analysis.
-        Returns a dictionary with 'chapters' and 'quiz'.
+        Generates lesson content with the configured LLM provider based on the code analysis.
+        Returns a dictionary with 'chapters' and 'quiz'. Blocks on the LLM scheduler, so
+        call it from a worker thread (or a script), never from the event loop.
         """
-        if not config.GEMINI_API_KEY:
+        if self.provider is None:
             return self._get_fallback_content()
 
-        prompt = f"""
-        You are an expert coding tutor. Analyze the following code metadata and generate a structured lesson.
-        
-        Code Metadata:
-        {json.dumps(code_analysis, indent=2)}
+        prompt = self._build_prompt(code_analysis)
 
-        Output Format (JSON):
-        {{
-            "chapters": [
-                {{ "title": "Section Title", "content": "Detailed explanation..." }}
-            ],
-            "quiz": [
-                {{
-                    "question": "Question text?",
-                    "options": [
-                        {{ "text": "Option A", "id": "a" }},
-                        {{ "text": "Option B", "id": "b" }}
-                    ],
-                    "answer": "correct_id"
-                }}
-            ]
-        }}
-        
-        Generate 3 chapters (Introduction, detailed logic explanation, best practices) and 2 quiz questions.
-        Ensure the content is specific to the code provided.
+        try:
+            # Blocks this thread until the shared scheduler admits the call
+            with llm_scheduler.slot_sync(self._estimate_call_tokens(prompt)):
+                response = self.provider.generate_sync(prompt)
+            return self._parse_response(response)
+        except Exception as e:
+            print(f"AI Generation failed: {e}")
+            return self._get_fallback_content()
+
+    async def generate_lesson_content_async(self, code_analysis: dict) -> dict:
         """
+        Async variant of generate_lesson_content that awaits the provider instead of
+        blocking the event loop. Files over the token budget go through
+        map-reduce summarisation (see _prepare_prompt).
+        """
+        if self.provider is None:
+            return self._get_fallback_content()
 
         try:
-            response = self.model.generate_content(prompt)
-            # Clean up potential markdown code blocks in response
-            text = response.text.replace("```json", "").replace("```", "")
-            return json.loads(text)
+            prompt = await self._prepare_prompt(code_analysis)
+            return self._parse_response(await self._generate(prompt))
         except Exception as e:
             print(f"AI Generation failed: {e}")
             return self._get_fallback_content()
 
+    async def stream_lesson_content(self, code_analysis: dict) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Streams the lesson from the provider, yielding ("chapter", {...}) and
+        ("quiz", {...}) as soon as each object is complete. If generation
+        fails before anything was produced, yields ("fallback", lesson) once;
+        a failure after that is raised, so the partial lesson is not taken
+        for a complete one.
+        """
+        if self.provider is None:
+            yield "fallback", self._get_fallback_content()
+            return
+
+        parser = LessonStreamParser()
+        emitted = 0
+
+        try:
+            prompt = await self._prepare_prompt(code_analysis)
+            # The admission slot is held until the stream is fully consumed
+            async with llm_scheduler.slot(self._estimate_call_tokens(prompt)):
+                async for chunk in self.provider.stream(prompt):
+                    for event in parser.feed(chunk):
+                        emitted += 1
+                        yield event
+        except Exception as e:
+            print(f"AI Streaming failed: {e}")
+            if emitted:
+                raise
+            yield "fallback", self._get_fallback_content()
+
+    async def explain_definitions(self, units: List[Dict[str, Any]], file_path: str) -> Dict[str, str]:
+        """
+        Chapter content for definition units ({"id", "label", "code"}), keyed
+        by id. Units are batched up to LESSON_CHUNK_TOKENS per LLM call; units
+        whose batch failed are missing from the result.
+        """
+        if self.provider is None or not units:
+            return {}
+        semaphore = asyncio.Semaphore(config.LESSON_MAP_CONCURRENCY)
+
+        async def explain(batch: List[Dict[str, Any]]) -> Dict[str, str]:
+            prompt = DEFINITIONS_PROMPT.format(
+                file_path=file_path, definitions=format_units(batch, config.LESSON_CHUNK_TOKENS)
+            )
+            try:
+                async with semaphore:
+                    parsed = self._parse_response(await self._generate(prompt))
+            except Exception as e:
+                print(f"Definition explanations failed: {e}")
+                return {}
+            wanted = {unit["id"] for unit in batch}
+            return {
+                str(item["id"]): item["content"]
+                for item in parsed.get("explanations", [])
+                if isinstance(item, dict) and str(item.get("id")) in wanted and item.get("content")
+            }
+
+        explanations = {}
+        for result in await asyncio.gather(*[explain(b) for b in batch_units(units, config.LESSON_CHUNK_TOKENS)]):
+            explanations.update(result)
+        return explanations
+
+    async def generate_quiz(self, code_analysis: dict, units: List[Dict[str, Any]], file_path: str) -> Optional[List[dict]]:
+        """Quiz questions focused on `units`; None if generation failed."""
+        if self.provider is None:
+            return None
+        # Each unit gets an equal share of the budget (at least QUIZ_MIN_UNIT_TOKENS);
+        # if there are too many, units spread across the file are kept
+        per_unit = min(config.LESSON_CHUNK_TOKENS, max(QUIZ_MIN_UNIT_TOKENS, config.LESSON_TOKEN_BUDGET // max(1, len(units))))
+        units = select_evenly(units, max(1, config.LESSON_TOKEN_BUDGET // per_unit))
+        labels = "\n".join(definition_label(d) for d in code_analysis.get("definitions", []))
+        prompt = QUIZ_PROMPT.format(
+            file_path=file_path,
+            outline=labels[:config.LESSON_CHUNK_TOKENS * CHARS_PER_TOKEN],
+            definitions=format_units(units, per_unit)
+        )
+        try:
+            return self._parse_response(await self._generate(prompt)).get("quiz", [])
+        except Exception as e:
+            print(f"Quiz generation failed: {e}")
+            return None
+
+    def _build_prompt(self, code_analysis: dict) -> str:
+        return build_single_prompt(code_analysis, config.LESSON_TOKEN_BUDGET)
+
+    async def _prepare_prompt(self, code_analysis: dict) -> str:
+        """
+        Returns the lesson prompt. Within budget it is the single compact
+        prompt; otherwise the file is chunked along definition boundaries,
+        the chunks are summarised concurrently (map) and the lesson is
+        generated from those summaries (reduce).
+        """
+        source = code_analysis.get("source")
+        # The source alone can rule out the single prompt, so huge files are
+        # never decoded (or copied into a prompt) as a whole
+        if not source or len(source) // CHARS_PER_TOKEN <= config.LESSON_TOKEN_BUDGET:
+            # Untruncated single prompt: used as-is when it fits the budget
+            prompt = build_single_prompt(code_analysis, sys.maxsize)
+            if not source or estimate_tokens(prompt) <= config.LESSON_TOKEN_BUDGET:
+                return prompt
+
+        if not isinstance(source, bytes):
+            source = bytes(source)
+        spans = chunk_spans(source, code_analysis.get("definitions", []), config.LESSON_CHUNK_TOKENS)
+        # Bound the map phase so cost tracks the budget, not the file size;
+        # only the selected chunks are decoded
+        spans = select_evenly(spans, config.LESSON_MAX_CHUNKS)
+        summaries = await self._summarize_chunks([decode_source(source[start:end]) for start, end in spans])
+        return build_reduce_prompt(code_analysis, summaries, config.LESSON_TOKEN_BUDGET)
+
+    async def _summarize_chunks(self, chunks: List[str]) -> List[str]:
+        semaphore = asyncio.Semaphore(config.LESSON_MAP_CONCURRENCY)
+
+        async def summarize(chunk: str) -> str:
+            key = hashlib.sha256(f"{PROMPT_VERSION}:{self.model_name}:{chunk}".encode("utf-8")).hexdigest()
+
+            async def compute():
+                async with semaphore:
+                    text = await self._generate(CHUNK_SUMMARY_PROMPT.format(code=chunk))
+                    return {"summary": text.strip()}
+
+            try:
+                result = await chunk_summary_cache.get_or_compute(key, compute, should_cache=lambda r: bool(r["summary"]))
+                return result["summary"]
+            except Exception as e:
+                print(f"Chunk summary failed: {e}")
+                return ""
+
+        return await asyncio.gather(*[summarize(chunk) for chunk in chunks])
+
+    async def _generate(self, prompt: str) -> str:
+        """All non-streaming LLM calls go through the shared scheduler."""
+        return await llm_scheduler.submit(
+            lambda: self.provider.generate(prompt),
+            self._estimate_call_tokens(prompt)
+        )
+
+    def _estimate_call_tokens(self, prompt: str) -> int:
+        return estimate_tokens(prompt) + config.LLM_OUTPUT_TOKENS_ESTIMATE
+
+    def _parse_response(self, text: str) -> dict:
+        # Clean up potential markdown code blocks in response
+        text = text.replace("```json", "").replace("```", "")
+        return json.loads(text)
+
+    def is_fallback(self, lesson: dict) -> bool:
+        return lesson.get("is_fallback", False)
+
     def _get_fallback_content(self):
         """Returns mock data if AI fails or is not configured."""
         return {
+            "is_fallback": True,
             "chapters": [
                 {
                     "title": "AI Unavailable",
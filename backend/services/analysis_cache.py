@@ -0,0 +1,9 @@
+from config import config
+from services.ttl_cache import TTLCache
+
+# Structure (definitions, imports) behind each summary graph, keyed by its
+# graph_id, so expanding a node needs neither a fetch nor a parse
+analysis_cache = TTLCache(
+    max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.ANALYSIS_CACHE_TTL_SECONDS,
+)
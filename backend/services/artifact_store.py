@@ -0,0 +1,189 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Optional
+
+import orjson
+
+from config import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    version TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (key, kind, version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS artifacts_by_access ON artifacts(accessed_at);
+
+CREATE TABLE IF NOT EXISTS paths (
+    repo TEXT NOT NULL,
+    ref TEXT NOT NULL,
+    path TEXT NOT NULL,
+    blob TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (repo, ref, path)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('bytes', 0);
+"""
+
+# Reads refresh an artifact's LRU timestamp at most this often, so hot
+# artifacts do not turn every read into a write
+ACCESS_RESOLUTION_SECONDS = 60
+# Eviction frees down to this fraction of max_bytes, so it runs in batches
+EVICT_TO = 0.9
+EVICT_BATCH = 64
+
+
+def artifact_key(blob_sha: str, file_path: str) -> str:
+    """Artifacts depend on the content and on the language, which the extension selects."""
+    return blob_sha + os.path.splitext(file_path)[1].lower()
+
+
+class ArtifactStore:
+    """
+    Analysis artifacts (definitions and imports, graphs) shared by every
+    worker process and kept across restarts. Entries are keyed by blob SHA
+    plus extension (see artifact_key), artifact kind and analyzer version,
+    stored as zlib-compressed orjson, and evicted least recently used once
+    their total size exceeds `max_bytes`.
+
+    The store also remembers which blob a (repo, ref, path) resolved to, so
+    a worker can find the artifacts of a recently fetched file without
+    fetching it again.
+    """
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.counters = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # Autocommit mode: writes use explicit BEGIN IMMEDIATE so that
+            # concurrent workers serialize on the size accounting
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, kind: str, version: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT data, accessed_at FROM artifacts WHERE key = ? AND kind = ? AND version = ?",
+                (key, kind, version)
+            ).fetchone()
+            if row is not None and now - row[1] > ACCESS_RESOLUTION_SECONDS:
+                conn.execute(
+                    "UPDATE artifacts SET accessed_at = ? WHERE key = ? AND kind = ? AND version = ?",
+                    (now, key, kind, version)
+                )
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return orjson.loads(zlib.decompress(row[0]))
+
+    def put(self, key: str, kind: str, version: str, value: Any):
+        data = zlib.compress(orjson.dumps(value), 1)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT size FROM artifacts WHERE key = ? AND kind = ? AND version = ?", (key, kind, version)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO artifacts (key, kind, version, data, size, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, version, data, len(data), time.time())
+                )
+                total = self._add_bytes(conn, len(data) - (row[0] if row else 0))
+                if total > self.max_bytes:
+                    self._evict(conn, total)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.counters["writes"] += 1
+
+    def remember_path(self, repo: str, ref: Optional[str], path: str, blob_sha: str):
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO paths (repo, ref, path, blob, seen_at) VALUES (?, ?, ?, ?, ?)",
+                (repo, ref or "HEAD", path, blob_sha, time.time())
+            )
+
+    def path_blob(self, repo: str, ref: Optional[str], path: str, max_age: float) -> Optional[str]:
+        """The blob (repo, ref, path) resolved to, if that was seen within max_age seconds."""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT blob FROM paths WHERE repo = ? AND ref = ? AND path = ? AND seen_at >= ?",
+                (repo, ref or "HEAD", path, time.time() - max_age)
+            ).fetchone()
+        return row[0] if row else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            conn = self._connect()
+            entries = conn.execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+            total = conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        return {**self.counters, "entries": entries, "bytes": total}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def forget_connection(self):
+        """After fork: SQLite connections must not be used across processes, so reopen lazily."""
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _add_bytes(self, conn: sqlite3.Connection, delta: int) -> int:
+        conn.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+        return conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+
+    def _evict(self, conn: sqlite3.Connection, total: int):
+        target = self.max_bytes * EVICT_TO
+        while total > target:
+            rows = conn.execute(
+                "SELECT key, kind, version, size FROM artifacts ORDER BY accessed_at LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            freed = 0
+            for key, kind, version, size in rows:
+                if total - freed <= target:
+                    break
+                conn.execute("DELETE FROM artifacts WHERE key = ? AND kind = ? AND version = ?", (key, kind, version))
+                freed += size
+                self.counters["evictions"] += 1
+            total = self._add_bytes(conn, -freed)
+        # Path records only point at artifacts; drop those older than a day
+        conn.execute("DELETE FROM paths WHERE seen_at < ?", (time.time() - 86400,))
+
+
+artifact_store = ArtifactStore(config.ARTIFACT_STORE_PATH, config.ARTIFACT_STORE_MAX_BYTES)
+os.register_at_fork(after_in_child=lambda: artifact_store.forget_connection())
@@ -1,77 +1,395 @@
 from tree_sitter_languages import get_language, get_parser
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 import os
+import time
+
+LANG_MAP = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".c": "c"
+}
+
+SUPPORTED_EXTENSIONS = frozenset(LANG_MAP)
+
+# Tree-sitter queries per language. Every pattern captures the definition node
+# as @definition.class / @definition.function and its identifier as @name.
+DEFINITION_QUERIES = {
+    "python": """
+(class_definition name: (identifier) @name) @definition.class
+(function_definition name: (identifier) @name) @definition.function
+""",
+    "javascript": """
+(class_declaration name: (_) @name) @definition.class
+(class name: (_) @name) @definition.class
+(function_declaration name: (identifier) @name) @definition.function
+(generator_function_declaration name: (identifier) @name) @definition.function
+(method_definition name: (_) @name) @definition.function
+(variable_declarator name: (identifier) @name value: [(arrow_function) (function) (generator_function)]) @definition.function
+(assignment_expression left: (member_expression property: (property_identifier) @name) right: [(arrow_function) (function)]) @definition.function
+(pair key: (property_identifier) @name value: [(arrow_function) (function)]) @definition.function
+""",
+    "typescript": """
+(class_declaration name: (_) @name) @definition.class
+(abstract_class_declaration name: (_) @name) @definition.class
+(interface_declaration name: (_) @name) @definition.class
+(function_declaration name: (identifier) @name) @definition.function
+(generator_function_declaration name: (identifier) @name) @definition.function
+(method_definition name: (_) @name) @definition.function
+(abstract_method_signature name: (_) @name) @definition.function
+(variable_declarator name: (identifier) @name value: [(arrow_function) (function) (generator_function)]) @definition.function
+(public_field_definition name: (_) @name value: [(arrow_function) (function)]) @definition.function
+""",
+    "java": """
+(class_declaration name: (identifier) @name) @definition.class
+(interface_declaration name: (identifier) @name) @definition.class
+(enum_declaration name: (identifier) @name) @definition.class
+(record_declaration name: (identifier) @name) @definition.class
+(method_declaration name: (identifier) @name) @definition.function
+(constructor_declaration name: (identifier) @name) @definition.function
+""",
+    "c": """
+(struct_specifier name: (type_identifier) @name body: (_)) @definition.class
+(function_definition declarator: (function_declarator declarator: (identifier) @name)) @definition.function
+(function_definition declarator: (pointer_declarator declarator: (function_declarator declarator: (identifier) @name))) @definition.function
+""",
+    "cpp": """
+(class_specifier name: (_) @name body: (_)) @definition.class
+(struct_specifier name: (_) @name body: (_)) @definition.class
+(function_definition declarator: (function_declarator declarator: (_) @name)) @definition.function
+(function_definition declarator: (pointer_declarator declarator: (function_declarator declarator: (_) @name))) @definition.function
+(function_definition declarator: (reference_declarator (function_declarator declarator: (_) @name))) @definition.function
+""",
+}
+
+# Call sites, compiled into the same query so definitions and calls are
+# collected in a single pass. @call captures the callee's (last) identifier.
+CALL_QUERIES = {
+    "python": """
+(call function: (identifier) @call)
+(call function: (attribute attribute: (identifier) @call))
+""",
+    "javascript": """
+(call_expression function: (identifier) @call)
+(call_expression function: (member_expression property: (property_identifier) @call))
+(new_expression constructor: (identifier) @call)
+""",
+    "typescript": """
+(call_expression function: (identifier) @call)
+(call_expression function: (member_expression property: (property_identifier) @call))
+(new_expression constructor: (identifier) @call)
+""",
+    "java": """
+(method_invocation name: (identifier) @call)
+(object_creation_expression type: (type_identifier) @call)
+""",
+    "c": """
+(call_expression function: (identifier) @call)
+(call_expression function: (field_expression field: (field_identifier) @call))
+""",
+    "cpp": """
+(call_expression function: (identifier) @call)
+(call_expression function: (field_expression field: (field_identifier) @call))
+(call_expression function: (qualified_identifier name: (identifier) @call))
+""",
+}
+
+# Import statements, captured in the same pass as @import
+IMPORT_QUERIES = {
+    "python": "(import_statement) @import\n(import_from_statement) @import\n(future_import_statement) @import\n",
+    "javascript": "(import_statement) @import\n",
+    "typescript": "(import_statement) @import\n",
+    "java": "(import_declaration) @import\n",
+    "c": "(preproc_include) @import\n",
+    "cpp": "(preproc_include) @import\n",
+}
+
+# Buffers that are not bytes (e.g. an mmapped blob) are fed to tree-sitter in
+# slices of this size instead of being copied whole
+READ_CHUNK_BYTES = 64 * 1024
+
+Source = Union[bytes, memoryview]
+
+# Node types used by the cursor-based fallback when no query is available
+FALLBACK_DEFINITION_TYPES = {
+    "function_definition": "function",
+    "function_declaration": "function",
+    "method_definition": "function",
+    "method_declaration": "function",
+    "class_definition": "class",
+    "class_declaration": "class"
+}
+FALLBACK_CALL_TYPES = {"call", "call_expression", "method_invocation", "new_expression"}
+FALLBACK_IMPORT_TYPES = {"import_statement", "import_from_statement", "future_import_statement", "import_declaration", "preproc_include"}
+# Field holding the callee on a call node / the final segment of a qualified callee
+CALLEE_FIELDS = {"call": "function", "call_expression": "function", "method_invocation": "name", "new_expression": "constructor"}
+MEMBER_NAME_FIELDS = {"attribute": "attribute", "member_expression": "property", "field_expression": "field", "qualified_identifier": "name"}
 
 class AstParser:
     def __init__(self):
         self.parsers = {}
+        self.queries = {}
         
     def _get_parser(self, language_name: str):
         if language_name not in self.parsers:
             language = get_language(language_name)
             parser = get_parser(language_name)
             self.parsers[language_name] = parser
+            self.queries[language_name] = self._compile_query(language, language_name)
         return self.parsers[language_name]
+
+    def prewarm(self, languages: Iterable[str]) -> Dict[str, float]:
+        """
+        Loads grammars and compiles their queries ahead of the first request
+        that needs them. Returns the seconds spent per language (0 if loaded).
+        """
+        timings = {}
+        for language_name in languages:
+            start = time.perf_counter()
+            self._get_parser(language_name)
+            timings[language_name] = time.perf_counter() - start
+        return timings
+
+    def _compile_query(self, language, language_name: str):
+        source = DEFINITION_QUERIES.get(language_name)
+        if not source:
+            return None
+        source += CALL_QUERIES.get(language_name, "") + IMPORT_QUERIES.get(language_name, "")
+        try:
+            return language.query(source)
+        except Exception as e:
+            print(f"Definition query for {language_name} failed to compile, using cursor walk: {e}")
+            return None
     
     def parse_code(self, code: str, file_extension: str):
-        lang_map = {
-            ".py": "python",
-            ".js": "javascript",
-            ".jsx": "javascript",
-            ".ts": "typescript",
-            ".tsx": "typescript",
-            ".java": "java",
-            ".cpp": "cpp",
-            ".c": "c"
-        }
-        
-        lang = lang_map.get(file_extension.lower())
+        lang = LANG_MAP.get(file_extension.lower())
         if not lang:
             return None  # Unsupported language
             
+        return self.parse_source(bytes(code, "utf8"), lang), lang
+
+    def parse_source(self, source: Source, lang: str):
         parser = self._get_parser(lang)
-        tree = parser.parse(bytes(code, "utf8"))
-        return tree, lang
+        if isinstance(source, bytes):
+            return parser.parse(source)
+        return parser.parse(lambda offset, _point: bytes(source[offset:offset + READ_CHUNK_BYTES]))
+
+    def extract_definitions(self, code: Union[str, Source], file_path: str):
+        return self.extract_structure(code, file_path)[0]
 
-    def extract_definitions(self, code: str, file_path: str):
+    def extract_structure(self, code: Union[str, Source], file_path: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Definitions and import statements of a file in one parse and one
+        query pass. `code` is preferably the raw bytes; names and imports are
+        sliced out of it by byte offset.
+        """
         _, ext = os.path.splitext(file_path)
-        result = self.parse_code(code, ext)
-        if not result:
-            return []
-            
-        tree, lang = result
-        root_node = tree.root_node
+        lang = LANG_MAP.get(ext.lower())
+        if not lang:
+            return [], []
+
+        source = code.encode("utf-8") if isinstance(code, str) else code
+        tree = self.parse_source(source, lang)
+        return self.structure_from_tree(tree, lang, source)
+
+    def definitions_from_tree(self, tree, lang: str, source: Optional[Source] = None):
+        return self.structure_from_tree(tree, lang, source)[0]
+
+    def structure_from_tree(self, tree, lang: str, source: Optional[Source] = None):
+        """
+        (definitions, imports) for a parsed tree. `source` is required when the
+        tree was parsed from a buffer rather than bytes (node.text is unset).
+        """
+        query = self.queries.get(lang)
+        if query is not None:
+            return self._definitions_from_query(query, tree.root_node, source)
+        return self._definitions_from_walk(tree.root_node, source)
+
+    def reparse(self, old_tree, old_source: bytes, new_source: bytes, lang: str):
+        """
+        Incrementally reparses new_source: the line diff against old_source is
+        applied to old_tree with tree.edit() so tree-sitter can reuse every
+        untouched subtree. old_tree is mutated and should not be reused.
+        """
+        for edit in compute_line_edits(old_source, new_source):
+            old_tree.edit(**edit)
+        return self._get_parser(lang).parse(new_source, old_tree)
+
+    def _definitions_from_query(self, query, root_node, source: Optional[Source] = None):
         definitions = []
-        
-        # Simple extraction logic based on node types
-        # This is a prototype simplification. Complete queries would be better.
-        
-        def traverse(node, parent_name=None):
-            current_name = parent_name
-            
-            if node.type in ["function_definition", "class_definition", "function_declaration", "class_declaration"]:
-                # Extract name
+        imports = []
+        enclosing_classes = []  # stack of (end_byte, name)
+        open_definitions = []  # stack of (end_byte, definition) used to attribute calls
+        pending = []  # definition captures still waiting for their @name
+
+        # Captures arrive in document order: a definition node, then its name
+        for node, capture in query.captures(root_node):
+            if capture == "call":
+                self._record_call(open_definitions, node.start_byte, _node_bytes(node, source))
+                continue
+            if capture == "import":
+                imports.append(_import_text(node, source))
+                continue
+            if capture != "name":
+                pending.append((node, capture.split(".", 1)[1]))
+                continue
+            for i in range(len(pending) - 1, -1, -1):
+                def_node, def_type = pending[i]
+                if def_node.start_byte <= node.start_byte and node.end_byte <= def_node.end_byte:
+                    del pending[i]
+                    self._add_definition(definitions, enclosing_classes, open_definitions, def_node, node, def_type, source)
+                    break
+
+        return self._finalize_calls(definitions), imports
+
+    def _definitions_from_walk(self, root_node, source: Optional[Source] = None):
+        """
+        Iterative pre-order walk with a TreeCursor; no recursion, and no
+        child lists are materialised.
+        """
+        definitions = []
+        imports = []
+        enclosing_classes = []
+        open_definitions = []
+        cursor = root_node.walk()
+
+        while True:
+            node = cursor.node
+            def_type = FALLBACK_DEFINITION_TYPES.get(node.type)
+            if def_type:
                 name_node = node.child_by_field_name("name")
                 if name_node:
-                    name = code[name_node.start_byte:name_node.end_byte]
-                    
-                    def_type = "class" if "class" in node.type else "function"
-                    
-                    definitions.append({
-                        "type": def_type,
-                        "name": name,
-                        "parent": parent_name,
-                        "start_line": node.start_point[0],
-                        "end_line": node.end_point[0]
-                    })
-                    
-                    # If this is a class, it becomes the parent for its children
-                    if def_type == "class":
-                        current_name = name
-            
-            for child in node.children:
-                traverse(child, current_name)
-                
-        traverse(root_node)
+                    self._add_definition(definitions, enclosing_classes, open_definitions, node, name_node, def_type, source)
+            elif node.type in FALLBACK_CALL_TYPES:
+                callee = self._callee_name_node(node)
+                if callee is not None:
+                    self._record_call(open_definitions, node.start_byte, _node_bytes(callee, source))
+            elif node.type in FALLBACK_IMPORT_TYPES:
+                imports.append(_import_text(node, source))
+
+            if cursor.goto_first_child():
+                continue
+            while not cursor.goto_next_sibling():
+                if not cursor.goto_parent():
+                    return self._finalize_calls(definitions), imports
+
+    def _callee_name_node(self, call_node):
+        callee = call_node.child_by_field_name(CALLEE_FIELDS[call_node.type])
+        if callee is not None and callee.type in MEMBER_NAME_FIELDS:
+            callee = callee.child_by_field_name(MEMBER_NAME_FIELDS[callee.type])
+        if callee is None or callee.type not in ("identifier", "property_identifier", "field_identifier", "type_identifier"):
+            return None
+        return callee
+
+    def _record_call(self, open_definitions, start_byte: int, name: bytes):
+        # The innermost definition still open at this byte is the caller
+        while open_definitions and open_definitions[-1][0] <= start_byte:
+            open_definitions.pop()
+        if open_definitions:
+            open_definitions[-1][1]["calls"].append(name.decode("utf-8", errors="replace"))
+
+    def _finalize_calls(self, definitions):
+        for defn in definitions:
+            defn["calls"] = list(dict.fromkeys(defn["calls"]))
         return definitions
 
+    def _add_definition(self, definitions, enclosing_classes, open_definitions, node, name_node, def_type, source=None):
+        while enclosing_classes and enclosing_classes[-1][0] <= node.start_byte:
+            enclosing_classes.pop()
+        while open_definitions and open_definitions[-1][0] <= node.start_byte:
+            open_definitions.pop()
+        parent_name = enclosing_classes[-1][1] if enclosing_classes else None
+
+        # Decorators belong to the definition they wrap
+        span_node = node.parent if node.parent is not None and node.parent.type == "decorated_definition" else node
+        name = _node_bytes(name_node, source).decode("utf-8", errors="replace")
+
+        definition = {
+            "type": def_type,
+            "name": name,
+            "parent": parent_name,
+            "start_line": span_node.start_point[0],
+            "end_line": span_node.end_point[0],
+            "start_byte": span_node.start_byte,
+            "end_byte": span_node.end_byte,
+            "calls": []
+        }
+        definitions.append(definition)
+        open_definitions.append((node.end_byte, definition))
+
+        # If this is a class, it becomes the parent for its children
+        if def_type == "class":
+            enclosing_classes.append((node.end_byte, name))
+
+def _node_bytes(node, source: Optional[Source]) -> bytes:
+    # Byte offsets index the source directly, so this is correct for any encoding
+    if source is None:
+        return node.text
+    return bytes(source[node.start_byte:node.end_byte])
+
+def _import_text(node, source: Optional[Source]) -> str:
+    """The statement with its whitespace collapsed (multi-line imports become one line)."""
+    return b" ".join(_node_bytes(node, source).split()).decode("utf-8", errors="replace")
+
+def _line_offsets(lines: List[bytes]) -> List[int]:
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+def _point_at(lines: List[bytes], index: int):
+    # Position of the start of line `index` (or end of file when index == len(lines))
+    if index < len(lines) or not lines or lines[-1].endswith(b"\n"):
+        return (index, 0)
+    return (index - 1, len(lines[-1]))
+
+def compute_line_edits(old_source: bytes, new_source: bytes) -> List[Dict[str, Any]]:
+    """
+    Line-level diff between two revisions, returned as tree.edit() keyword
+    arguments ordered from the end of the file backwards so each edit's
+    start position is still valid when it is applied.
+    """
+    old_lines = old_source.splitlines(keepends=True)
+    new_lines = new_source.splitlines(keepends=True)
+    old_offsets = _line_offsets(old_lines)
+    new_offsets = _line_offsets(new_lines)
+
+    # Trim the common head/tail first; SequenceMatcher only sees the changed middle
+    head = 0
+    limit = min(len(old_lines), len(new_lines))
+    while head < limit and old_lines[head] == new_lines[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and old_lines[-1 - tail] == new_lines[-1 - tail]:
+        tail += 1
+
+    edits = []
+    matcher = SequenceMatcher(None, old_lines[head:len(old_lines) - tail], new_lines[head:len(new_lines) - tail], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        i1, i2, j1, j2 = i1 + head, i2 + head, j1 + head, j2 + head
+        start_byte = old_offsets[i1]
+        start_point = _point_at(old_lines, i1)
+        new_end_point = _point_at(new_lines, j2)
+        # Rows are shifted by the edits before this one; later edits are
+        # applied first, so only this edit's own line delta matters here.
+        new_end_point = (new_end_point[0] - j1 + i1, new_end_point[1])
+        edits.append({
+            "start_byte": start_byte,
+            "old_end_byte": old_offsets[i2],
+            "new_end_byte": start_byte + (new_offsets[j2] - new_offsets[j1]),
+            "start_point": start_point,
+            "old_end_point": _point_at(old_lines, i2),
+            "new_end_point": new_end_point
+        })
+
+    edits.reverse()
+    return edits
+
 parser_service = AstParser()
@@ -0,0 +1,220 @@
+import hashlib
+import mmap
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+from config import config
+
+CacheKey = Tuple[str, str, str, str]  # (owner, repo, ref, path)
+Blob = Union[bytes, memoryview]  # raw file bytes; memoryview when mmapped from disk
+
+
+@dataclass
+class CacheEntry:
+    etag: str
+    sha: str
+    content: Blob
+    size: int
+    validated_at: float
+
+
+class FetchCache:
+    """
+    Two-tier cache for GitHub file contents.
+
+    - Memory: LRU keyed by (owner, repo, ref, path), bounded by total bytes.
+    - Disk: content-addressed by blob SHA, plus a tiny per-key record holding
+      the ETag/SHA so entries can still be revalidated after a restart.
+      Bounded by `disk_max_bytes`: the least recently used files (by mtime,
+      refreshed on disk hits) are deleted once the directory grows past it.
+
+    Contents are kept as raw bytes; blobs loaded from disk are mmapped rather
+    than read onto the heap.
+    """
+
+    def __init__(self, max_bytes: int, disk_dir: Optional[str], fresh_seconds: float,
+                 disk_max_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.fresh_seconds = fresh_seconds
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Estimate of the disk tier's size: scanned on the first write, then
+        # kept up to date here (other processes' writes are caught by the
+        # rescan every eviction does)
+        self._disk_bytes: Optional[int] = None
+        self._disk_lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "revalidations": 0, "disk_hits": 0, "evictions": 0,
+                         "disk_evictions": 0}
+
+    # --- lookup -------------------------------------------------------------
+
+    def get(self, key: CacheKey, disk: bool = True) -> Optional[CacheEntry]:
+        """
+        Returns the cached entry for key (memory first, then disk unless
+        disk=False), or None. The disk lookup blocks; async callers try
+        memory first and only hop to a thread on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not disk:
+            return None
+
+        entry = self._load_from_disk(key)
+        if entry is not None:
+            self.counters["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry.validated_at < self.fresh_seconds
+
+    # --- updates ------------------------------------------------------------
+
+    def store(self, key: CacheKey, etag: str, sha: str, content: bytes) -> CacheEntry:
+        entry = CacheEntry(etag=etag, sha=sha, content=content, size=len(content), validated_at=time.time())
+        self._remember(key, entry)
+        self._write_to_disk(key, entry, content)
+        return entry
+
+    def mark_validated(self, key: CacheKey, entry: CacheEntry):
+        entry.validated_at = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+
+    def record(self, counter: str):
+        self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counters, "entries": len(self._entries), "bytes": self._bytes}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # --- internals ----------------------------------------------------------
+
+    def _remember(self, key: CacheKey, entry: CacheEntry):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if entry.size > self.max_bytes:
+                return
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.counters["evictions"] += 1
+
+    def _blob_path(self, sha: str) -> str:
+        return os.path.join(self.disk_dir, "blobs", sha[:2], sha)
+
+    def _ref_path(self, key: CacheKey) -> str:
+        digest = hashlib.sha1("\0".join(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.disk_dir, "refs", digest[:2], digest)
+
+    def _write_to_disk(self, key: CacheKey, entry: CacheEntry, data: bytes):
+        if not self.disk_dir:
+            return
+        try:
+            written = 0
+            blob_path = self._blob_path(entry.sha)
+            if not os.path.exists(blob_path):
+                _atomic_write(blob_path, data)
+                written += len(data)
+            ref = f"{entry.etag}\n{entry.sha}".encode("utf-8")
+            _atomic_write(self._ref_path(key), ref)
+            self._account_disk(written + len(ref))
+        except OSError as e:
+            print(f"Fetch cache write failed: {e}")
+
+    def _account_disk(self, written: int):
+        if self.disk_max_bytes is None:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, _, size in self._disk_files())
+            else:
+                self._disk_bytes += written
+            if self._disk_bytes > self.disk_max_bytes:
+                self._evict_disk()
+
+    def _disk_files(self):
+        """(mtime, path, size) of every blob and ref file."""
+        files = []
+        for tier in ("blobs", "refs"):
+            for root, _, names in os.walk(os.path.join(self.disk_dir, tier)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        info = os.stat(path)
+                    except OSError:
+                        continue  # deleted by another process meanwhile
+                    files.append((info.st_mtime, path, info.st_size))
+        return files
+
+    def _evict_disk(self):
+        # Down to 90% of the budget, so eviction (a directory scan) runs in batches
+        files = sorted(self._disk_files())
+        total = sum(size for _, _, size in files)
+        target = self.disk_max_bytes * 0.9
+        for _, path, size in files:
+            if total <= target:
+                break
+            try:
+                # A ref left without its blob is simply a miss (see _load_from_disk)
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.counters["disk_evictions"] += 1
+        self._disk_bytes = total
+
+    def _load_from_disk(self, key: CacheKey) -> Optional[CacheEntry]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._ref_path(key), "rb") as f:
+                etag, sha = f.read().decode("utf-8").split("\n", 1)
+            with open(self._blob_path(sha), "rb") as f:
+                # The mapping outlives the file object; empty files cannot be mapped
+                size = os.fstat(f.fileno()).st_size
+                data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) if size else b""
+            if self.disk_max_bytes is not None:
+                # Recently used files are evicted last
+                os.utime(self._ref_path(key))
+                os.utime(self._blob_path(sha))
+        except (OSError, ValueError):
+            return None
+        # validated_at=0 forces a conditional request before the entry is served
+        return CacheEntry(etag=etag, sha=sha, content=data, size=size, validated_at=0.0)
+
+
+def _atomic_write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+fetch_cache = FetchCache(
+    max_bytes=config.FETCH_CACHE_MAX_BYTES,
+    disk_dir=config.FETCH_CACHE_DIR,
+    fresh_seconds=config.FETCH_CACHE_FRESH_SECONDS,
+    disk_max_bytes=config.FETCH_CACHE_DISK_MAX_BYTES,
+)
@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import config
+
+# A full commit SHA never moves, so it needs no resolving (or re-resolving after a fetch)
+_HEX = set("0123456789abcdef")
+
+
+class GitMirror:
+    """
+    A local bare mirror of one repository. File contents are read through a
+    single long-lived `git cat-file --batch` process (blob lookups through a
+    `--batch-check` one), so a read is one pipe round trip instead of an
+    HTTP request. Refs are resolved to commit SHAs
+    once (until the next fetch) and paths are read as "<commit>:<path>", so
+    every read is pinned to a revision.
+    """
+
+    def __init__(self, remote: str, path: str):
+        self.remote = remote
+        self.path = path
+        self.fetched_at = 0.0
+        self.counters = {"reads": 0, "fetches": 0, "restarts": 0}
+        self._commits: Dict[str, str] = {}  # ref -> commit SHA, cleared by update()
+        # "--batch" reads contents; "--batch-check" answers SHA/type/size only
+        self._processes: Dict[str, Optional[subprocess.Popen]] = {"--batch": None, "--batch-check": None}
+        self._lock = threading.Lock()  # one request/response on the cat-file pipe at a time
+        self._update_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return os.path.isdir(self.path)
+
+    def ensure(self):
+        """Clones the mirror if it does not exist yet."""
+        with self._update_lock:
+            if self.ready:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Cloned next to the target and renamed, so a failed clone leaves nothing behind
+            partial = f"{self.path}.partial"
+            shutil.rmtree(partial, ignore_errors=True)
+            _git(["clone", "--mirror", "--quiet", "--", self.remote, partial])
+            os.replace(partial, self.path)
+            self.fetched_at = time.time()
+            self.counters["fetches"] += 1
+
+    def update(self):
+        """Incremental `git fetch` of every ref; later reads see the new revisions."""
+        if not self.ready:
+            self.ensure()
+            return
+        with self._update_lock:
+            _git(["fetch", "--prune", "--quiet", "origin"], cwd=self.path)
+            with self._lock:
+                self._commits.clear()
+            self.fetched_at = time.time()
+            self.counters["fetches"] += 1
+
+    def resolve(self, ref: Optional[str] = None) -> str:
+        """The commit SHA `ref` (default: the remote's HEAD) points to."""
+        ref = ref or "HEAD"
+        if len(ref) == 40 and set(ref) <= _HEX:
+            return ref
+        commit = self._commits.get(ref)
+        if commit is None:
+            found = self._request(f"{ref}^{{commit}}")
+            if found is None:
+                raise LookupError(f"Unknown revision {ref!r} in {self.remote}")
+            commit = found[0]
+            self._commits[ref] = commit
+        return commit
+
+    def read(self, file_path: str, ref: Optional[str] = None) -> bytes:
+        commit = self.resolve(ref)
+        found = self._request(f"{commit}:{file_path}")
+        if found is None or found[1] != "blob":
+            raise FileNotFoundError(f"{file_path} not found at {ref or 'HEAD'} in {self.remote}")
+        self.counters["reads"] += 1
+        return found[2]
+
+    def blob_sha(self, file_path: str, ref: Optional[str] = None) -> Optional[str]:
+        """The SHA of the blob at `file_path`, without reading it; None if there is none."""
+        found = self._request(f"{self.resolve(ref)}:{file_path}", check=True)
+        return found[0] if found is not None and found[1] == "blob" else None
+
+    def read_blob(self, sha: str) -> bytes:
+        found = self._request(sha)
+        if found is None:
+            raise FileNotFoundError(f"Blob {sha} not found in {self.remote}")
+        self.counters["reads"] += 1
+        return found[2]
+
+    def list_files(self, ref: Optional[str] = None) -> List[Tuple[str, str, int]]:
+        """(path, blob SHA, size) of every file at `ref`."""
+        commit = self.resolve(ref)
+        output = _git(["ls-tree", "-r", "-l", "-z", "--full-tree", commit], cwd=self.path)
+        files = []
+        for entry in output.split(b"\0"):
+            if not entry:
+                continue
+            meta, path = entry.split(b"\t", 1)
+            _, kind, sha, size = meta.split()
+            if kind == b"blob":
+                files.append((path.decode("utf-8", "surrogateescape"), sha.decode("ascii"), int(size)))
+        return files
+
+    def iter_files(self, extensions: Iterable[str], ref: Optional[str] = None,
+                   max_file_bytes: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+        """Same contract as github_loader.iter_repo_archive, read from the mirror."""
+        extensions = {ext.lower() for ext in extensions}
+        for path, sha, size in self.list_files(ref):
+            if max_file_bytes is not None and size > max_file_bytes:
+                continue
+            if os.path.splitext(path)[1].lower() not in extensions:
+                continue
+            yield path, self.read_blob(sha)
+
+    def close(self):
+        with self._lock:
+            processes = [p for p in self._processes.values() if p is not None]
+            self._processes = dict.fromkeys(self._processes)
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+            process.stdout.close()
+
+    def forget_process(self):
+        """After fork: the pipes belong to the parent, so the child starts its own processes."""
+        self._processes = dict.fromkeys(self._processes)
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+
+    def _request(self, spec: str, check: bool = False) -> Optional[Tuple[str, str, bytes]]:
+        """
+        Sends one object name to cat-file; returns (sha, type, content) or
+        None if missing. With check=True nothing is read and content is b"".
+        """
+        if "\n" in spec:
+            raise ValueError("Object names cannot contain newlines")
+        line = spec.encode("utf-8", "surrogateescape") + b"\n"
+        mode = "--batch-check" if check else "--batch"
+        with self._lock:
+            for attempt in range(2):
+                process = self._start(mode)
+                try:
+                    process.stdin.write(line)
+                    process.stdin.flush()
+                    header = process.stdout.readline()
+                except (BrokenPipeError, OSError):
+                    header = b""
+                if header:
+                    break
+                # The process died (e.g. killed, or the mirror was repacked under it): restart once
+                self._processes[mode] = None
+                self.counters["restarts"] += 1
+            else:
+                raise RuntimeError(f"git cat-file stopped responding for {self.remote}")
+
+            fields = header.split()
+            if len(fields) != 3:
+                return None  # "<spec> missing" or "<spec> ambiguous"
+            sha, kind, size = fields
+            content = b""
+            if not check:
+                content = process.stdout.read(int(size))
+                process.stdout.read(1)  # trailing newline
+        return sha.decode("ascii"), kind.decode("ascii"), content
+
+    def _start(self, mode: str) -> subprocess.Popen:
+        process = self._processes[mode]
+        if process is not None and process.poll() is not None:
+            process = None
+            self.counters["restarts"] += 1
+        if process is None:
+            process = self._processes[mode] = subprocess.Popen(
+                ["git", "cat-file", mode], cwd=self.path,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+        return process
+
+
+# What GIT_MIRROR_REPOS="*" may clone: client URLs must never reach local paths or other transports
+WILDCARD_REPO_URL = re.compile(r"https://github\.com/[A-Za-z0-9][A-Za-z0-9-]*/[A-Za-z0-9_][A-Za-z0-9_.-]*")
+
+
+class MirrorManager:
+    """
+    Serves the repositories listed in GIT_MIRROR_REPOS from local mirrors
+    (created on first use) and refreshes them every `refresh_seconds`
+    while the app runs, or on demand via update(). "*" stands for any
+    https://github.com/<owner>/<repo> URL.
+    """
+
+    def __init__(self, root: str, repos: str, refresh_seconds: float):
+        self.root = root
+        self.repos = {_normalize_url(url) for url in repos.split(",") if url.strip()}
+        self.refresh_seconds = refresh_seconds
+        self._mirrors: Dict[str, GitMirror] = {}
+        self._lock = threading.Lock()
+
+    def handles(self, repo_url: str) -> bool:
+        url = _normalize_url(repo_url)
+        if url in self.repos:
+            return True
+        return "*" in self.repos and WILDCARD_REPO_URL.fullmatch(url) is not None
+
+    def get(self, repo_url: str) -> GitMirror:
+        key = _normalize_url(repo_url)
+        with self._lock:
+            mirror = self._mirrors.get(key)
+            if mirror is None:
+                mirror = self._mirrors[key] = GitMirror(repo_url, self._mirror_path(key))
+        return mirror
+
+    def read(self, repo_url: str, file_path: str, ref: Optional[str] = None) -> bytes:
+        mirror = self.get(repo_url)
+        if not mirror.ready:
+            mirror.ensure()
+        return mirror.read(file_path, ref)
+
+    def update(self, repo_url: str) -> Dict[str, float]:
+        mirror = self.get(repo_url)
+        mirror.update()
+        return {"fetched_at": mirror.fetched_at}
+
+    async def run_refresh_loop(self):
+        """Fetches every mirror in use each `refresh_seconds`; runs until cancelled."""
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            for mirror in list(self._mirrors.values()):
+                if not mirror.ready:
+                    continue
+                try:
+                    await asyncio.to_thread(mirror.update)
+                except Exception as e:
+                    print(f"Mirror refresh failed for {mirror.remote}: {e}")
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            mirror.remote: {**mirror.counters, "fetched_at": mirror.fetched_at}
+            for mirror in list(self._mirrors.values())
+        }
+
+    def close(self):
+        for mirror in list(self._mirrors.values()):
+            mirror.close()
+
+    def forget_processes(self):
+        self._lock = threading.Lock()
+        for mirror in self._mirrors.values():
+            mirror.forget_process()
+
+    def _mirror_path(self, key: str) -> str:
+        name = key.rstrip("/").split("/")[-1] or "repo"
+        return os.path.join(self.root, f"{name}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}.git")
+
+
+def _normalize_url(url: str) -> str:
+    url = url.strip().rstrip("/")
+    return url[:-4] if url.endswith(".git") else url
+
+
+def _git(args: List[str], cwd: Optional[str] = None) -> bytes:
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+mirror_manager = MirrorManager(
+    root=config.GIT_MIRROR_DIR,
+    repos=config.GIT_MIRROR_REPOS,
+    refresh_seconds=config.GIT_MIRROR_REFRESH_SECONDS,
+)
+os.register_at_fork(after_in_child=lambda: mirror_manager.forget_processes())
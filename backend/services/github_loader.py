@@ -1,31 +1,223 @@
+import asyncio
 import requests
+import httpx
 import base64
-from typing import Tuple
+import hashlib
+import os
+import tarfile
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from config import config
+from services.fetch_cache import fetch_cache, Blob, CacheKey
+from services.git_mirror import mirror_manager
 
 GITHUB_TOKEN = ""  # fine-grained or classic --- github token
 
+# Shared keep-alive connection pools (one per client flavour)
+_session = requests.Session()
+_async_client: Optional[httpx.AsyncClient] = None
+
+def _reset_after_fork():
+    # Pooled sockets must not be shared with a forked child (pre-fork server worker)
+    global _session, _async_client
+    _session = requests.Session()
+    _async_client = None
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
 def parse_github_url(url: str) -> Tuple[str, str]:
     parts = url.rstrip("/").split("/")
     owner = parts[-2]
     repo = parts[-1]
     return owner, repo
 
-def fetch_file_content(repo_url: str, file_path: str) -> str:
-    owner, repo = parse_github_url(repo_url)
-    file_path = file_path.replace("blob/main/", "").lstrip("/")
+def _headers() -> Dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    # An empty "Bearer " value is rejected by httpx, so only send it when set
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+    return headers
 
+def _normalize_path(file_path: str) -> str:
     # IMPORTANT: file_path must NOT contain `blob/main`
-    api_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
+    return file_path.replace("blob/main/", "").lstrip("/")
+
+def _build_request(repo_url: str, file_path: str, ref: Optional[str] = None) -> Tuple[str, Dict[str, str], CacheKey]:
+    owner, repo = parse_github_url(repo_url)
+    file_path = _normalize_path(file_path)
+
+    api_url = f"{config.GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}"
+    if ref:
+        api_url += f"?ref={ref}"
 
-    headers = {
-        "Authorization": f"Bearer {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    }
+    headers = _headers()
+    return api_url, headers, (owner, repo, ref or "HEAD", file_path)
 
-    response = requests.get(api_url, headers=headers)
+def git_blob_sha(data: bytes) -> str:
+    """The SHA git (and the GitHub API) assigns to a blob with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def _decode_content(data: Dict) -> bytes:
+    # Raw file bytes; decoding to text is left to whoever needs text
+    return base64.b64decode(data["content"])
+
+def _prepare_conditional(cached, headers: Dict[str, str]) -> bool:
+    """
+    Returns whether the cached entry (or None) can be served as is. Adds
+    If-None-Match when a stale entry can be revalidated.
+    """
+    if cached is None:
+        return False
+    if fetch_cache.is_fresh(cached):
+        return True
+    if cached.etag:
+        headers["If-None-Match"] = cached.etag
+    return False
+
+def _handle_response(key: CacheKey, cached, response) -> Blob:
+    # `response` is either a requests.Response or an httpx.Response
+    if response.status_code == 304 and cached is not None:
+        fetch_cache.record("revalidations")
+        fetch_cache.mark_validated(key, cached)
+        return cached.content
 
     if response.status_code != 200:
         raise Exception(f"GitHub API error {response.status_code}: {response.text}")
 
+    fetch_cache.record("misses")
     data = response.json()
-    return base64.b64decode(data["content"]).decode("utf-8")
+    content = _decode_content(data)
+    fetch_cache.store(key, response.headers.get("ETag", ""), data.get("sha", ""), content)
+    return content
+
+def fetch_file_bytes(repo_url: str, file_path: str, ref: Optional[str] = None) -> Blob:
+    """
+    Returns the file's raw bytes without copying them: the cached buffer
+    itself (an mmapped memoryview when it came from the disk cache).
+    Mirrored repos are read from their local mirror instead.
+    """
+    if mirror_manager.handles(repo_url):
+        return mirror_manager.read(repo_url, _normalize_path(file_path), ref)
+
+    api_url, headers, key = _build_request(repo_url, file_path, ref)
+
+    cached = fetch_cache.get(key)
+    if _prepare_conditional(cached, headers):
+        fetch_cache.record("hits")
+        return cached.content
+
+    response = _session.get(api_url, headers=headers, timeout=config.GITHUB_TIMEOUT)
+    return _handle_response(key, cached, response)
+
+def fetch_file_content(repo_url: str, file_path: str, ref: Optional[str] = None) -> str:
+    return str(fetch_file_bytes(repo_url, file_path, ref), "utf-8")
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async GitHub client, creating it on first use.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=config.GITHUB_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=config.GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=config.GITHUB_MAX_CONNECTIONS,
+            ),
+        )
+    return _async_client
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+async def fetch_file_bytes_async(repo_url: str, file_path: str, ref: Optional[str] = None) -> Blob:
+    if mirror_manager.handles(repo_url):
+        mirror = mirror_manager.get(repo_url)
+        if not mirror.ready:
+            await asyncio.to_thread(mirror.ensure)
+        # Off the event loop: large blobs, and reads waiting on the cat-file
+        # lock (held by repo jobs and fetches), would otherwise stall it
+        return await asyncio.to_thread(mirror.read, _normalize_path(file_path), ref)
+
+    api_url, headers, key = _build_request(repo_url, file_path, ref)
+
+    # Disk lookups (file reads, mmap setup) and writes stay off the event loop
+    cached = fetch_cache.get(key, disk=False)
+    if cached is None:
+        cached = await asyncio.to_thread(fetch_cache.get, key)
+    if _prepare_conditional(cached, headers):
+        fetch_cache.record("hits")
+        return cached.content
+
+    response = await get_async_client().get(api_url, headers=headers)
+    if response.status_code == 200:
+        # Decoding and the disk write happen in a thread
+        return await asyncio.to_thread(_handle_response, key, cached, response)
+    return _handle_response(key, cached, response)
+
+def known_blob_sha(repo_url: str, file_path: str, ref: Optional[str] = None) -> Optional[str]:
+    """
+    The blob SHA of a file when it can be had without downloading it: from
+    a ready mirror, or from a still-fresh fetch cache entry. Blocking.
+    """
+    if mirror_manager.handles(repo_url):
+        mirror = mirror_manager.get(repo_url)
+        if not mirror.ready:
+            return None
+        try:
+            return mirror.blob_sha(_normalize_path(file_path), ref)
+        except LookupError:
+            return None  # an unknown ref; the fetch reports it
+    _, _, key = _build_request(repo_url, file_path, ref)
+    cached = fetch_cache.get(key)
+    if cached is None or not fetch_cache.is_fresh(cached):
+        return None
+    return cached.sha or git_blob_sha(bytes(cached.content))
+
+async def fetch_file_content_async(repo_url: str, file_path: str, ref: Optional[str] = None) -> str:
+    return str(await fetch_file_bytes_async(repo_url, file_path, ref), "utf-8")
+
+def iter_repo_archive(repo_url: str, extensions: Iterable[str], ref: Optional[str] = None,
+                      max_file_bytes: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Downloads the repository tarball once and yields (path, raw bytes) for every
+    file whose extension is in `extensions`. Entries are read straight off the
+    HTTP stream; nothing is extracted to disk. Mirrored repos are listed and
+    read from their local mirror.
+    """
+    max_file_bytes = max_file_bytes or config.REPO_MAX_FILE_BYTES
+    if mirror_manager.handles(repo_url):
+        mirror = mirror_manager.get(repo_url)
+        mirror.ensure()
+        yield from mirror.iter_files(extensions, ref, max_file_bytes)
+        return
+
+    owner, repo = parse_github_url(repo_url)
+    api_url = f"{config.GITHUB_API_URL}/repos/{owner}/{repo}/tarball"
+    if ref:
+        api_url += f"/{ref}"
+
+    headers = _headers()
+
+    extensions = {ext.lower() for ext in extensions}
+
+    response = _session.get(api_url, headers=headers, stream=True, timeout=config.GITHUB_TIMEOUT)
+    try:
+        if response.status_code != 200:
+            raise Exception(f"GitHub API error {response.status_code}: {response.text}")
+
+        with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+            for member in archive:
+                if not member.isfile() or member.size > max_file_bytes:
+                    continue
+                if os.path.splitext(member.name)[1].lower() not in extensions:
+                    continue
+
+                # GitHub prefixes every entry with "<owner>-<repo>-<sha>/"
+                path = member.name.split("/", 1)[-1]
+                yield path, archive.extractfile(member).read()
+    finally:
+        response.close()
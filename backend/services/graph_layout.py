@@ -0,0 +1,85 @@
+import math
+from typing import List, Tuple
+
+NODE_WIDTH = 220
+NODE_HEIGHT = 90
+# Width/height ratio the packer aims for when wrapping a node's children
+TARGET_ASPECT = 1.6
+
+
+def tree_layout(parents: List[int], node_width: float = NODE_WIDTH,
+                node_height: float = NODE_HEIGHT) -> List[Tuple[float, float]]:
+    """
+    Deterministic layered layout for a forest given as a parent index per
+    node (-1 for roots). Returns an (x, y) position per node.
+
+    Every subtree is laid out as a rectangular block: the node sits centred
+    on top and its child blocks are shelf-packed underneath, wrapping into
+    rows so that wide levels grow into a roughly TARGET_ASPECT-shaped grid
+    instead of one very long row or column. Runs in O(N).
+    """
+    count = len(parents)
+    children: List[List[int]] = [[] for _ in range(count)]
+    roots = []
+    for index, parent in enumerate(parents):
+        if 0 <= parent < count and parent != index:
+            children[parent].append(index)
+        else:
+            roots.append(index)
+
+    # Breadth-first order guarantees parents come before their children
+    order = list(roots)
+    for index in order:
+        order.extend(children[index])
+
+    widths = [0.0] * count
+    heights = [0.0] * count
+    offsets = [(0.0, 0.0)] * count  # child block origin relative to parent block origin
+
+    for index in reversed(order):
+        kids = children[index]
+        if not kids:
+            widths[index] = node_width
+            heights[index] = node_height
+            continue
+        packed_width, packed_height = _pack(kids, widths, heights, offsets, node_height)
+        widths[index] = max(node_width, packed_width)
+        heights[index] = node_height + packed_height
+
+    # Roots are packed the same way, as children of a virtual top node
+    root_offsets = [(0.0, 0.0)] * count
+    _pack(roots, widths, heights, root_offsets, 0.0)
+
+    origins = [(0.0, 0.0)] * count
+    for index in roots:
+        origins[index] = root_offsets[index]
+    positions = [(0.0, 0.0)] * count
+    for index in order:
+        ox, oy = origins[index]
+        positions[index] = (ox + (widths[index] - node_width) / 2, oy)
+        for child in children[index]:
+            cx, cy = offsets[child]
+            origins[child] = (ox + cx, oy + cy)
+
+    return positions
+
+
+def _pack(blocks: List[int], widths, heights, offsets, top: float) -> Tuple[float, float]:
+    """
+    Shelf-packs blocks left to right into rows no wider than a target width.
+    Writes each block's offset and returns the packed (width, height).
+    """
+    area = sum(widths[b] * heights[b] for b in blocks)
+    target = max(max(widths[b] for b in blocks), math.sqrt(area * TARGET_ASPECT))
+
+    x = y = row_height = packed_width = 0.0
+    for block in blocks:
+        if x > 0 and x + widths[block] > target:
+            y += row_height
+            x = row_height = 0.0
+        offsets[block] = (x, top + y)
+        x += widths[block]
+        row_height = max(row_height, heights[block])
+        packed_width = max(packed_width, x)
+
+    return packed_width, y + row_height
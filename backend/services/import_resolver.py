@@ -0,0 +1,109 @@
+import posixpath
+import re
+from typing import Dict, Iterable, List, Optional
+
+_AMBIGUOUS = object()
+
+PY_FROM = re.compile(r"^from\s+(\.*)([\w.]*)\s+import\s+(.+)$")
+PY_IMPORT = re.compile(r"^import\s+(.+)$")
+JAVA_IMPORT = re.compile(r"^import\s+(?:static\s+)?([\w.]+)\s*;")
+QUOTED = re.compile(r"""["']([^"']+)["']""")
+C_INCLUDE = re.compile(r"""^#\s*include\s*[<"]([^>"]+)[>"]""")
+
+JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx")
+C_EXTENSIONS = {".c", ".h", ".cpp", ".cc", ".cxx", ".hpp", ".hh", ".hxx"}
+
+
+class ImportResolver:
+    """
+    Maps import statements of a file set onto files of the same set, so the
+    graph can show which analyzed files depend on each other. Imports of
+    anything outside the set (stdlib, packages) resolve to nothing.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = set(paths)
+        # Every dotted suffix of a module path ("src.pkg.mod", "pkg.mod", "mod")
+        # and every path suffix ("pkg/mod.h", "mod.h"); ambiguous keys resolve to nothing
+        self._modules: Dict[str, object] = {}
+        self._suffixes: Dict[str, object] = {}
+        for path in self.paths:
+            root, ext = posixpath.splitext(path)
+            parts = root.split("/")
+            if ext in (".py", ".java"):
+                if parts[-1] == "__init__":
+                    parts = parts[:-1]
+                for i in range(len(parts)):
+                    _index(self._modules, ".".join(parts[i:]), path)
+            path_parts = path.split("/")
+            for i in range(len(path_parts)):
+                _index(self._suffixes, "/".join(path_parts[i:]), path)
+
+    def resolve(self, importer: str, statement: str) -> List[str]:
+        """Paths in the set that `statement` (an import of `importer`) refers to."""
+        ext = posixpath.splitext(importer)[1].lower()
+        if ext == ".py":
+            targets = self._resolve_python(importer, statement)
+        elif ext == ".java":
+            match = JAVA_IMPORT.match(statement)
+            targets = [self._module(match.group(1))] if match else []
+        elif ext in JS_EXTENSIONS:
+            match = QUOTED.search(statement)
+            targets = [self._relative_file(importer, match.group(1))] if match else []
+        elif ext in C_EXTENSIONS:
+            match = C_INCLUDE.match(statement)
+            targets = [self._include(importer, match.group(1))] if match else []
+        else:
+            targets = []
+
+        resolved = []
+        for target in targets:
+            if target and target != importer and target not in resolved:
+                resolved.append(target)
+        return resolved
+
+    def _module(self, name: str) -> Optional[str]:
+        target = self._modules.get(name)
+        return None if target is _AMBIGUOUS else target
+
+    def _resolve_python(self, importer: str, statement: str) -> List[Optional[str]]:
+        match = PY_FROM.match(statement)
+        if match:
+            dots, module, names = match.groups()
+            if dots:
+                base = posixpath.dirname(importer).split("/")
+                base = base[:len(base) - (len(dots) - 1)] if len(dots) > 1 else base
+                module = ".".join([p for p in base if p] + ([module] if module else []))
+            targets = []
+            # "from pkg import mod" may name a submodule rather than a symbol
+            for name in names.strip("() ").split(","):
+                name = name.split()[0] if name.split() else ""
+                if name and name != "*":
+                    targets.append(self._module(f"{module}.{name}" if module else name))
+            if module:
+                targets.append(self._module(module))
+            return targets
+
+        match = PY_IMPORT.match(statement)
+        if not match:
+            return []
+        return [self._module(part.split()[0]) for part in match.group(1).split(",") if part.split()]
+
+    def _relative_file(self, importer: str, specifier: str) -> Optional[str]:
+        if not specifier.startswith("."):
+            return None  # package import
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), specifier))
+        candidates = [base] + [base + ext for ext in JS_EXTENSIONS] + [f"{base}/index{ext}" for ext in JS_EXTENSIONS]
+        return next((c for c in candidates if c in self.paths), None)
+
+    def _include(self, importer: str, header: str) -> Optional[str]:
+        local = posixpath.normpath(posixpath.join(posixpath.dirname(importer), header))
+        if local in self.paths:
+            return local
+        target = self._suffixes.get(posixpath.normpath(header))
+        return None if target is _AMBIGUOUS else target
+
+
+def _index(index: Dict[str, object], key: str, path: str):
+    existing = index.get(key)
+    index[key] = path if existing is None or existing == path else _AMBIGUOUS
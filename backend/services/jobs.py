@@ -0,0 +1,469 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from config import config
+from services.llm_scheduler import llm_scheduler, PRIORITY_BACKGROUND
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    client TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    done INTEGER,
+    total INTEGER,
+    error TEXT,
+    result BLOB,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs(status, created_at);
+"""
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = {SUCCEEDED, FAILED}
+
+STATUS_COLUMNS = ["id", "client", "kind", "status", "stage", "done", "total", "error",
+                  "created_at", "started_at", "finished_at"]
+
+# Progress is broadcast on every update but written to SQLite at most this often
+PERSIST_INTERVAL_SECONDS = 0.5
+# watch() polls SQLite this often for jobs run by another app worker
+WATCH_POLL_SECONDS = 0.5
+
+# progress(stage, done=None, total=None)
+Progress = Callable[..., None]
+JobHandler = Callable[[Dict[str, Any], Progress], Awaitable[bytes]]
+
+
+class JobLimitError(Exception):
+    pass
+
+
+class JobStore:
+    """SQLite persistence for jobs, so queued and interrupted jobs survive a restart."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # Several app workers share the file; wait for their write locks
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            # Databases created before jobs had owners
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._conn = conn
+        return self._conn
+
+    def create(self, job: Dict[str, Any]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, client, kind, params, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job["id"], job["client"], job["kind"], json.dumps(job["params"]), job["status"], job["created_at"])
+                )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's status fields and params (not the result)."""
+        with self._lock:
+            row = self._connect().execute(
+                f"SELECT {', '.join(STATUS_COLUMNS)}, params FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._connect().execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["result"] if row else None
+
+    def update(self, job_id: str, **fields):
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def pending(self, created_before: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Queued jobs (created before `created_before`, if given), oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, client FROM jobs WHERE status = ? AND created_at < ? ORDER BY created_at",
+                (QUEUED, float("inf") if created_before is None else created_before)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Marks a queued job as running by `owner`; False if another worker got it first."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, started_at = ? WHERE id = ? AND status = ?",
+                    (RUNNING, owner, now, now, job_id, QUEUED)
+                )
+        return cursor.rowcount == 1
+
+    def heartbeat(self, owner: str):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status = ?", (time.time(), owner, RUNNING)
+                )
+
+    def requeue_stale(self, stale_before: float) -> List[Dict[str, Any]]:
+        """Requeues running jobs whose owner stopped heartbeating (it died); returns them."""
+        stale = "status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        requeued = []
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                rows = conn.execute(f"SELECT id, client FROM jobs WHERE {stale}", (RUNNING, stale_before)).fetchall()
+                for row in rows:
+                    # Re-checked per row: another worker may requeue (and claim) it concurrently
+                    cursor = conn.execute(
+                        f"UPDATE jobs SET status = ?, stage = NULL, owner = NULL WHERE id = ? AND {stale}",
+                        (QUEUED, row["id"], RUNNING, stale_before)
+                    )
+                    if cursor.rowcount:
+                        requeued.append(dict(row))
+        return requeued
+
+    def release(self, owner: str) -> int:
+        """Requeues the jobs `owner` is running (on shutdown)."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = ?, stage = NULL, owner = NULL WHERE owner = ? AND status = ?",
+                    (QUEUED, owner, RUNNING)
+                )
+        return cursor.rowcount
+
+    def prune(self, older_than: float) -> int:
+        """Deletes finished jobs (and their results) finished before `older_than`."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    f"DELETE FROM jobs WHERE status IN ({', '.join('?' * len(FINISHED))}) AND finished_at < ?",
+                    (*sorted(FINISHED), older_than)
+                )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def forget_connection(self):
+        """After fork: SQLite connections must not be used across processes, so reopen lazily."""
+        self._conn = None
+        self._lock = threading.Lock()
+
+
+class JobManager:
+    """
+    Runs long analyses in the background. A bounded number of worker tasks
+    take jobs round-robin across clients, and each client has at most
+    `max_running_per_client` jobs running, so one client's queue of large
+    jobs cannot starve everyone else. Jobs make their LLM calls at
+    background priority, so interactive requests are admitted first.
+
+    Workers start on first use (or from the app lifespan) in the running
+    event loop. Several app workers may share one database: each job is
+    claimed by exactly one of them, which keeps a heartbeat on it, and jobs
+    whose owner stopped heartbeating (or stopped) are requeued and picked
+    up by the others.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_running_per_client: int,
+                 max_queued_per_client: int, retention_seconds: float,
+                 heartbeat_seconds: float = 10.0, stale_seconds: float = 60.0):
+        self.store = store
+        self.workers = workers
+        self.max_running_per_client = max_running_per_client
+        self.max_queued_per_client = max_queued_per_client
+        self.retention_seconds = retention_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self.handlers: Dict[str, JobHandler] = {}
+        self.owner = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+
+    def register(self, kind: str, handler: JobHandler):
+        """handler(params, progress) runs the job and returns the result body (JSON bytes)."""
+        self.handlers[kind] = handler
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        # Identifies this process's claims; a restarted worker is a new owner
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._pending: "OrderedDict[str, Deque[str]]" = OrderedDict()  # client -> queued job ids
+        self._running: Dict[str, int] = {}
+        self._live: Dict[str, Dict[str, Any]] = {}  # status of running jobs, ahead of SQLite
+        self._persisted_at: Dict[str, float] = {}
+        self._writes: Dict[str, asyncio.Task] = {}  # latest status write per job, chained in order
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._wakeup = asyncio.Event()
+
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        # Also resumes queued and interrupted jobs, off the event loop; later ones are enqueued by submit()
+        self._maintenance = loop.create_task(self._maintain(resume_before=time.time()))
+
+    async def stop(self):
+        """Stops the workers; the jobs they were running are requeued for any worker."""
+        tasks, self._tasks = self._tasks, []
+        if self._maintenance is not None:
+            tasks.append(self._maintenance)
+            self._maintenance = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._loop is not None:
+            await asyncio.gather(*self._writes.values(), return_exceptions=True)
+            await asyncio.to_thread(self.store.release, self.owner)
+        self._loop = None
+
+    async def submit(self, kind: str, params: Dict[str, Any], client: str) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        self.start()
+        if len(self._pending.get(client, ())) >= self.max_queued_per_client:
+            raise JobLimitError(f"At most {self.max_queued_per_client} queued jobs per client")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "client": client,
+            "kind": kind,
+            "params": params,
+            "status": QUEUED,
+            "created_at": time.time(),
+        }
+        await asyncio.to_thread(self.store.create, job)
+        self._enqueue(client, job["id"])
+        return await self.status(job["id"])
+
+    async def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        live = self._live.get(job_id) if self._loop is not None else None
+        if live is not None:
+            return dict(live)
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is not None:
+            job.pop("params")
+        return job
+
+    async def result(self, job_id: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.store.result, job_id)
+
+    async def watch(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yields the job's status now and after every change until it finishes."""
+        self.start()
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        try:
+            state = await self.status(job_id)
+            if state is None:
+                return
+            yield state
+            while state["status"] not in FINISHED:
+                try:
+                    state = await asyncio.wait_for(queue.get(), WATCH_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    if job_id in self._live:
+                        continue
+                    # Queued, or run by another app worker: only SQLite sees its updates
+                    polled = await self.status(job_id)
+                    if polled is None or polled == state:
+                        continue
+                    state = polled
+                yield state
+        finally:
+            subscribers = self._subscribers.get(job_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        if self._loop is None:
+            return {"workers": 0, "queued": 0, "running": 0, "clients": 0}
+        return {
+            "workers": len(self._tasks),
+            "queued": sum(len(q) for q in self._pending.values()),
+            "running": sum(self._running.values()),
+            "clients": len(self._pending),
+        }
+
+    def _enqueue(self, client: str, job_id: str):
+        self._pending.setdefault(client, deque()).append(job_id)
+        self._wakeup.set()
+
+    def _next_job(self):
+        # Round-robin: the first client with a free slot is served and moves to the back
+        for client in list(self._pending):
+            if self._running.get(client, 0) >= self.max_running_per_client:
+                continue
+            queue = self._pending.pop(client)
+            job_id = queue.popleft()
+            if queue:
+                self._pending[client] = queue
+            return client, job_id
+        return None
+
+    async def _maintain(self, resume_before: float):
+        """
+        Resumes queued and interrupted jobs, then heartbeats this worker's
+        jobs and adopts jobs orphaned by dead workers.
+        """
+        try:
+            pruned = await asyncio.to_thread(self.store.prune, time.time() - self.retention_seconds)
+            requeued = await asyncio.to_thread(self.store.requeue_stale, time.time() - self.stale_seconds)
+            pending = await asyncio.to_thread(self.store.pending, resume_before)
+            if pending or pruned:
+                print(f"Job queue: resuming {len(pending)} jobs ({len(requeued)} interrupted), pruned {pruned} finished jobs")
+            self._adopt(pending)
+        except sqlite3.Error as e:
+            print(f"Job queue resume failed: {e}")
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                await asyncio.to_thread(self.store.heartbeat, self.owner)
+                await asyncio.to_thread(self.store.requeue_stale, time.time() - self.stale_seconds)
+                # Queued jobs of a worker that died before claiming them; claim() settles races
+                self._adopt(await asyncio.to_thread(self.store.pending, time.time() - self.stale_seconds))
+            except sqlite3.Error as e:
+                print(f"Job queue maintenance failed: {e}")
+
+    def _adopt(self, jobs: List[Dict[str, Any]]):
+        queued = {job_id for queue in self._pending.values() for job_id in queue}
+        for job in jobs:
+            if job["id"] not in queued:
+                self._enqueue(job["client"], job["id"])
+
+    async def _worker(self):
+        while True:
+            picked = self._next_job()
+            if picked is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._run(*picked)
+            except Exception:
+                # e.g. the database was unavailable; the job is retried once it is requeued
+                traceback.print_exc()
+
+    async def _run(self, client: str, job_id: str):
+        if not await asyncio.to_thread(self.store.claim, job_id, self.owner):
+            return  # finished, or claimed by another app worker
+        self._running[client] = self._running.get(client, 0) + 1
+        try:
+            job = await asyncio.to_thread(self.store.get, job_id)
+            params = job.pop("params")
+            self._live[job_id] = job
+            self._publish(job_id, persist=True, status=RUNNING, started_at=time.time())
+
+            def progress(stage: str, done: Optional[int] = None, total: Optional[int] = None):
+                state = self._live.get(job_id)
+                if state is not None:
+                    self._publish(job_id, persist=stage != state.get("stage"), stage=stage, done=done, total=total)
+
+            with llm_scheduler.priority(PRIORITY_BACKGROUND):
+                result = await self.handlers[job["kind"]](params, progress)
+        except asyncio.CancelledError:
+            # Shutdown: stop() requeues the job in SQLite for any worker
+            self._live.pop(job_id, None)
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            if job_id in self._live:
+                await self._finish(job_id, status=FAILED, error=str(e))
+        else:
+            await asyncio.to_thread(self.store.update, job_id, result=result)
+            await self._finish(job_id, status=SUCCEEDED)
+        finally:
+            self._running[client] -= 1
+            if not self._running[client]:
+                del self._running[client]
+            self._wakeup.set()
+
+    async def _finish(self, job_id: str, **fields):
+        self._publish(job_id, persist=True, finished_at=time.time(), **fields)
+        # The job stays live (status() answers from memory) until SQLite has its final state;
+        # shielded so that stop() cancelling the worker does not drop that write
+        await asyncio.shield(self._writes[job_id])
+        self._live.pop(job_id, None)
+        self._persisted_at.pop(job_id, None)
+        self._writes.pop(job_id, None)
+
+    def _publish(self, job_id: str, persist: bool, **fields):
+        state = self._live[job_id]
+        state.update(fields)
+        now = time.monotonic()
+        if persist or now - self._persisted_at.get(job_id, 0) >= PERSIST_INTERVAL_SECONDS:
+            self._persisted_at[job_id] = now
+            snapshot = {k: state.get(k) for k in STATUS_COLUMNS if k not in ("id", "client", "kind", "created_at")}
+            self._writes[job_id] = self._loop.create_task(self._write(job_id, snapshot, self._writes.get(job_id)))
+        for queue in self._subscribers.get(job_id, ()):
+            queue.put_nowait(dict(state))
+
+    async def _write(self, job_id: str, fields: Dict[str, Any], previous: Optional[asyncio.Task]):
+        # Writes of one job land in order, so a late progress update never overwrites the final state
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await asyncio.to_thread(self.store.update, job_id, **fields)
+        except sqlite3.Error as e:
+            print(f"Persisting job {job_id} failed: {e}")
+
+
+job_manager = JobManager(
+    JobStore(config.JOBS_DB_PATH),
+    workers=config.JOB_WORKERS,
+    max_running_per_client=config.JOB_MAX_RUNNING_PER_CLIENT,
+    max_queued_per_client=config.JOB_MAX_QUEUED_PER_CLIENT,
+    retention_seconds=config.JOB_RETENTION_SECONDS,
+    heartbeat_seconds=config.JOB_HEARTBEAT_SECONDS,
+    stale_seconds=config.JOB_STALE_SECONDS,
+)
+os.register_at_fork(after_in_child=lambda: job_manager.store.forget_connection())
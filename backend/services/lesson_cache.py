@@ -0,0 +1,44 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+from config import config
+from services.ttl_cache import TTLCache
+
+
+class LessonCache(TTLCache):
+    """
+    TTLCache for generated lessons (and per-chunk / per-definition lesson
+    content), with the key derivation lessons share.
+    """
+
+    @staticmethod
+    def make_key(analysis_data: Dict[str, Any], prompt_version: str, model_name: str) -> str:
+        # A blob SHA identifies the content too, and is known before the source is fetched
+        code_hash = analysis_data.get("revision") or hashlib.sha256(analysis_data.get("source", b"")).hexdigest()
+        payload = json.dumps({
+            "code": code_hash,
+            "definitions": analysis_data.get("definitions", []),
+            "imports": analysis_data.get("imports", []),
+            "prompt_version": prompt_version,
+            "model": model_name
+        }, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+lesson_cache = LessonCache(
+    max_entries=config.LESSON_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.LESSON_CACHE_TTL_SECONDS,
+)
+
+# Map-phase summaries for large files, keyed by chunk content hash
+chunk_summary_cache = LessonCache(
+    max_entries=config.CHUNK_SUMMARY_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.LESSON_CACHE_TTL_SECONDS,
+)
+
+# Per-definition chapter content, keyed by the definition's content digest
+definition_cache = LessonCache(
+    max_entries=config.DEFINITION_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.LESSON_CACHE_TTL_SECONDS,
+)
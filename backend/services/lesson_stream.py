@@ -0,0 +1,69 @@
+import json
+from typing import List, Tuple
+
+STREAMED_ARRAYS = {"chapters": "chapter", "quiz": "quiz"}
+
+
+class LessonStreamParser:
+    """
+    Incrementally scans a streamed lesson JSON document and emits each
+    chapter / quiz object as soon as its closing brace arrives, without
+    waiting for the whole document. Text before the first '{' (e.g. a
+    ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        # Each frame: (bracket, key in parent object, start offset)
+        self._stack: List[Tuple[str, str, int]] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._current_key = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, dict]]:
+        self._text += chunk
+        events = []
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:i]
+                continue
+
+            if not self._stack and ch != "{":
+                continue  # preamble before the root object
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ":":
+                self._current_key = self._last_string
+            elif ch == ",":
+                self._current_key = None
+            elif ch in "{[":
+                self._stack.append((ch, self._current_key, i))
+                self._current_key = None
+            elif ch in "}]" and self._stack:
+                bracket, _, start = self._stack.pop()
+                # root "{" -> "chapters"/"quiz" "[" -> item "{"
+                if bracket == "{" and len(self._stack) == 2 and self._stack[1][0] == "[":
+                    event = STREAMED_ARRAYS.get(self._stack[1][1])
+                    if event:
+                        try:
+                            events.append((event, json.loads(text[start:i + 1])))
+                        except json.JSONDecodeError:
+                            pass
+
+        self._pos = len(text)
+        return events
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import AsyncIterator, Optional
+
+from config import config
+
+MODEL_NAME = "gemini-2.0-flash"
+
+
+class LLMProvider:
+    """
+    Minimal text-in/text-out interface AIService talks to. Prompt building,
+    caching, scheduling and response parsing all stay in AIService.
+    """
+    name = "base"
+    model_name = "unknown"
+
+    def generate_sync(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def generate(self, prompt: str) -> str:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        # Providers without native streaming emit the whole response at once
+        yield await self.generate(prompt)
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str, model_name: str = MODEL_NAME):
+        # Imported here: the SDK takes longer to import than the rest of the app
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name)
+
+    def generate_sync(self, prompt: str) -> str:
+        return self.model.generate_content(prompt).text
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+
+class ProviderError(Exception):
+    """Raised by providers with an HTTP-style status so the scheduler can classify it."""
+
+    def __init__(self, message: str, code: int):
+        super().__init__(message)
+        self.code = code
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider for development, tests and load tests.
+    The same prompt always yields the same text; latency, output size and an
+    injected error rate are configurable so it can stand in for a real model
+    under load.
+    """
+    name = "stub"
+    model_name = "stub"
+
+    def __init__(self, latency: float = 0.0, chapters: int = 3, chapter_chars: int = 400,
+                 stream_chunks: int = 8, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.chapters = max(1, chapters)
+        self.chapter_chars = max(1, chapter_chars)
+        self.stream_chunks = max(1, stream_chunks)
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def _maybe_fail(self):
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise ProviderError("Injected stub failure", 503)
+
+    def render(self, prompt: str) -> str:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        # Prompts asking for JSON get their shape back: per-definition
+        # explanations, full lessons or quizzes. Everything else (chunk
+        # summaries) gets plain prose
+        if '"explanations"' in prompt:
+            # Definitions are listed as "[id] label" lines (see prompt_builder.format_units)
+            ids = re.findall(r"^\[([^\]\s]+)\] \S+: ", prompt, re.MULTILINE)
+            return json.dumps({"explanations": [
+                {"id": unit_id, "content": _filler(f"Definition {unit_id} ({digest[:6]}). ", self.chapter_chars)}
+                for unit_id in ids
+            ]})
+        if '"chapters"' in prompt:
+            chapters = [
+                {"title": f"Chapter {i + 1} ({digest[i:i + 6]})", "content": _filler(f"Part {i + 1}. ", self.chapter_chars)}
+                for i in range(self.chapters)
+            ]
+            return json.dumps({"chapters": chapters, "quiz": _quiz(digest)})
+        if '"quiz"' in prompt:
+            return json.dumps({"quiz": _quiz(digest)})
+        return _filler(f"Summary {digest[:8]}: ", self.chapter_chars)
+
+    def generate_sync(self, prompt: str) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail()
+        return self.render(prompt)
+
+    async def generate(self, prompt: str) -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return self.render(prompt)
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self._maybe_fail()
+        text = self.render(prompt)
+        size = -(-len(text) // self.stream_chunks)
+        for start in range(0, len(text), size):
+            if self.latency:
+                await asyncio.sleep(self.latency / self.stream_chunks)
+            yield text[start:start + size]
+
+
+class RecordReplayProvider(LLMProvider):
+    """
+    Records responses from an inner provider to disk keyed by a hash of the
+    model and prompt, and serves them back on later calls. Without an inner
+    provider it is replay-only and a missing recording raises LookupError,
+    which AIService turns into the fallback lesson.
+    """
+    name = "replay"
+
+    def __init__(self, directory: str, inner: Optional[LLMProvider] = None, model_name: Optional[str] = None):
+        self.directory = directory
+        self.inner = inner
+        # Replays stand in for the recorded model, so they share its cache keys
+        self.model_name = model_name or (inner.model_name if inner else MODEL_NAME)
+
+    def _path(self, prompt: str) -> str:
+        key = hashlib.sha256(f"{self.model_name}\0{prompt}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _load(self, prompt: str) -> Optional[str]:
+        try:
+            with open(self._path(prompt), "r", encoding="utf-8") as f:
+                return json.load(f)["text"]
+        except FileNotFoundError:
+            return None
+
+    def _save(self, prompt: str, text: str):
+        path = self._path(prompt)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "prompt": prompt, "text": text}, f)
+        os.replace(tmp, path)
+
+    def _miss(self, prompt: str) -> LookupError:
+        return LookupError(f"No recorded response for prompt {os.path.basename(self._path(prompt))}")
+
+    def generate_sync(self, prompt: str) -> str:
+        text = self._load(prompt)
+        if text is None:
+            if self.inner is None:
+                raise self._miss(prompt)
+            text = self.inner.generate_sync(prompt)
+            self._save(prompt, text)
+        return text
+
+    async def generate(self, prompt: str) -> str:
+        text = self._load(prompt)
+        if text is None:
+            if self.inner is None:
+                raise self._miss(prompt)
+            text = await self.inner.generate(prompt)
+            self._save(prompt, text)
+        return text
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        text = self._load(prompt)
+        if text is not None:
+            yield text
+            return
+        if self.inner is None:
+            raise self._miss(prompt)
+
+        parts = []
+        async for chunk in self.inner.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        # Only complete streams are recorded
+        self._save(prompt, "".join(parts))
+
+
+def _quiz(digest: str):
+    return [
+        {
+            "question": f"Question {i + 1} about {digest[:8]}?",
+            "options": [{"text": f"Option {option.upper()}", "id": option} for option in "abcd"],
+            "answer": "abcd"[int(digest[i], 16) % 4]
+        }
+        for i in range(2)
+    ]
+
+
+def _filler(prefix: str, size: int) -> str:
+    text = prefix + "Lorem ipsum dolor sit amet. " * (size // 28 + 1)
+    return text[:max(size, len(prefix))]
+
+
+def create_provider(name: Optional[str] = None) -> Optional[LLMProvider]:
+    """
+    Builds the provider selected by LLM_PROVIDER. Returns None when the
+    Gemini-backed providers have no API key, which puts AIService into
+    fallback mode.
+    """
+    name = (name or config.LLM_PROVIDER).lower()
+    if name == "stub":
+        return StubProvider(
+            latency=config.LLM_STUB_LATENCY,
+            chapters=config.LLM_STUB_CHAPTERS,
+            chapter_chars=config.LLM_STUB_CHAPTER_CHARS,
+            error_rate=config.LLM_STUB_ERROR_RATE
+        )
+    if name == "replay":
+        return RecordReplayProvider(config.LLM_RECORDINGS_DIR)
+    if name not in ("gemini", "record"):
+        raise ValueError(f"Unknown LLM provider: {name}")
+
+    if not config.GEMINI_API_KEY:
+        print("Warning: GEMINI_API_KEY not found in environment variables.")
+        return None
+    gemini = GeminiProvider(config.GEMINI_API_KEY)
+    if name == "record":
+        return RecordReplayProvider(config.LLM_RECORDINGS_DIR, inner=gemini)
+    return gemini
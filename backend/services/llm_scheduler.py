@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from config import config
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Priority of LLM calls made from the current task (inherited by child tasks)
+current_priority: ContextVar[int] = ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+RETRYABLE_NAMES = {"ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+                   "BadGateway", "GatewayTimeout", "DeadlineExceeded"}
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = getattr(exc, "code", None)
+    if not isinstance(code, int):
+        code = getattr(exc, "status_code", None)
+    return code in RETRYABLE_STATUS or type(exc).__name__ in RETRYABLE_NAMES
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `rate_per_minute` is also its capacity."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """
+    Admission control in front of the LLM: at most `max_in_flight` calls,
+    request- and token-per-minute buckets, a priority queue (lower value
+    first, FIFO within a priority) and jittered exponential backoff on
+    429/5xx errors.
+    """
+
+    def __init__(self, max_in_flight: int, requests_per_minute: float, tokens_per_minute: float,
+                 max_retries: int, backoff_base: float, backoff_max: float):
+        self.max_in_flight = max_in_flight
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue = []  # heap of (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # where the async callers wait
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0, "retries": 0,
+                         "wait_seconds_total": 0.0, "wait_seconds_max": 0.0, "max_queue_depth": 0}
+
+    @contextmanager
+    def priority(self, value: int):
+        token = current_priority.set(value)
+        try:
+            yield
+        finally:
+            current_priority.reset(token)
+
+    async def submit(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0,
+                     priority: Optional[int] = None) -> T:
+        """Runs call() once admitted, retrying transient failures."""
+        priority = current_priority.get() if priority is None else priority
+        self.counters["submitted"] += 1
+
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, estimated_tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    self.counters["failed"] += 1
+                    raise
+                self.counters["retries"] += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                print(f"LLM call failed ({e}), retrying in {delay:.1f}s")
+            else:
+                self.counters["completed"] += 1
+                return result
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0, priority: Optional[int] = None):
+        """Holds one admission slot for the duration of a (streaming) call."""
+        priority = current_priority.get() if priority is None else priority
+        self.counters["submitted"] += 1
+        await self._acquire(priority, estimated_tokens)
+        try:
+            yield
+            self.counters["completed"] += 1
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self._release()
+
+    @contextmanager
+    def slot_sync(self, estimated_tokens: int = 0, priority: Optional[int] = None):
+        """
+        Blocking slot() for synchronous callers in worker threads; they queue
+        on the app's event loop together with the async callers.
+        """
+        priority = current_priority.get() if priority is None else priority
+        if _running_loop() is not None:
+            raise RuntimeError("slot_sync() would block the event loop; use slot()")
+        self.counters["submitted"] += 1
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._acquire(priority, estimated_tokens), loop).result()
+            release = lambda: loop.call_soon_threadsafe(self._release)
+        else:
+            # No async caller has used the scheduler (scripts): wait on a private loop
+            asyncio.run(self._acquire(priority, estimated_tokens, bind=False))
+            release = lambda: asyncio.run(self._release_async())
+        try:
+            yield
+            self.counters["completed"] += 1
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            release()
+
+    async def _acquire(self, priority: int, estimated_tokens: int, bind: bool = True):
+        loop = asyncio.get_running_loop()
+        if bind:
+            self._loop = loop
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), estimated_tokens, future))
+        self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], len(self._queue))
+        enqueued = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # Admitted just as the waiter was cancelled: give the slot back
+                self._release()
+            raise
+        waited = time.monotonic() - enqueued
+        self.counters["wait_seconds_total"] += waited
+        self.counters["wait_seconds_max"] = max(self.counters["wait_seconds_max"], waited)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    async def _release_async(self):
+        self._release()
+
+    def _dispatch(self):
+        while self._queue and self._in_flight < self.max_in_flight:
+            _, _, estimated_tokens, future = self._queue[0]
+            if future.done():  # waiter was cancelled
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.requests.time_until(1), self.tokens.time_until(estimated_tokens))
+            if wait > 0:
+                self._schedule_wakeup(wait)
+                return
+            heapq.heappop(self._queue)
+            self.requests.consume(1)
+            self.tokens.consume(estimated_tokens)
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            self._wakeup.cancel()
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.call_later(delay, self._dispatch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "queue_depth": len(self._queue),
+            "in_flight": self._in_flight,
+            "wait_seconds_avg": self.counters["wait_seconds_total"] / max(1, self.counters["submitted"]),
+        }
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+llm_scheduler = LLMScheduler(
+    max_in_flight=config.LLM_MAX_IN_FLIGHT,
+    requests_per_minute=config.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=config.LLM_TOKENS_PER_MINUTE,
+    max_retries=config.LLM_MAX_RETRIES,
+    backoff_base=config.LLM_BACKOFF_BASE,
+    backoff_max=config.LLM_BACKOFF_MAX,
+)
@@ -0,0 +1,246 @@
+import json
+from typing import Any, Dict, List, Tuple, Union
+
+# Rough chars-per-token ratio for code and English; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+LESSON_OUTPUT_FORMAT = """
+        Output Format (JSON):
+        {
+            "chapters": [
+                { "title": "Section Title", "content": "Detailed explanation..." }
+            ],
+            "quiz": [
+                {
+                    "question": "Question text?",
+                    "options": [
+                        { "text": "Option A", "id": "a" },
+                        { "text": "Option B", "id": "b" }
+                    ],
+                    "answer": "correct_id"
+                }
+            ]
+        }
+        
+        Generate 3 chapters (Introduction, detailed logic explanation, best practices) and 2 quiz questions.
+        Ensure the content is specific to the code provided.
+"""
+
+CHUNK_SUMMARY_PROMPT = """
+        You are an expert coding tutor. Summarize the following fragment of a larger source file
+        for a student: what it defines, what each part does and any notable logic or patterns.
+        Answer in plain prose, at most 150 words.
+
+        Code:
+        {code}
+"""
+
+
+DEFINITIONS_PROMPT = """
+        You are an expert coding tutor. Explain each of the following definitions from {file_path}
+        to a student: what it does, how it works and any notable logic or patterns. Nested
+        definitions appear as "..." and are explained separately.
+
+        Output Format (JSON):
+        {{
+            "explanations": [
+                {{ "id": "definition id", "content": "Explanation..." }}
+            ]
+        }}
+
+        Return one explanation per id, at most 150 words each.
+
+        Definitions:
+{definitions}
+"""
+
+QUIZ_PROMPT = """
+        You are an expert coding tutor. Write 2 quiz questions for a student studying {file_path},
+        focusing on the definitions below.
+
+        Outline of the file:
+        {outline}
+
+        Definitions:
+{definitions}
+
+        Output Format (JSON):
+        {{
+            "quiz": [
+                {{
+                    "question": "Question text?",
+                    "options": [
+                        {{ "text": "Option A", "id": "a" }},
+                        {{ "text": "Option B", "id": "b" }}
+                    ],
+                    "answer": "correct_id"
+                }}
+            ]
+        }}
+"""
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def decode_source(source: Union[bytes, memoryview, str]) -> str:
+    # Slices may cut a multi-byte character at either end; drop it instead of failing
+    return source if isinstance(source, str) else str(source, "utf-8", "replace")
+
+
+def compact_json(data: Any) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def outline(definitions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Definitions without the byte offsets, which are useless to the model."""
+    return [
+        {k: v for k, v in defn.items() if k not in ("start_byte", "end_byte") and v not in (None, [])}
+        for defn in definitions
+    ]
+
+
+def build_single_prompt(code_analysis: Dict[str, Any], budget_tokens: int) -> str:
+    """
+    The whole analysis in one prompt: compact JSON metadata plus the source
+    as a plain block (no JSON escaping). If it exceeds the budget the outline
+    is trimmed to half of it and the source is truncated to the rest;
+    callers that can afford extra LLM calls should prefer map-reduce.
+    """
+    extra = {k: v for k, v in code_analysis.items() if k not in ("definitions", "imports", "source")}
+    metadata = _fit_metadata(code_analysis, extra, "", budget_tokens // 2)
+
+    source = code_analysis.get("source")
+    if source is None:
+        return _lesson_prompt(metadata)
+
+    # Only the part that fits is decoded; a byte is at most one character
+    room = max(0, budget_tokens - estimate_tokens(_lesson_prompt(metadata, source=" "))) * CHARS_PER_TOKEN
+    if len(source) > room:
+        return _lesson_prompt(metadata, source=decode_source(source[:room]) + "\n... (truncated)")
+    return _lesson_prompt(metadata, source=decode_source(source))
+
+
+def build_reduce_prompt(code_analysis: Dict[str, Any], summaries: List[str], budget_tokens: int) -> str:
+    """
+    Final (reduce) prompt built from per-chunk summaries instead of the raw
+    code. The definition outline is trimmed to whatever budget remains.
+    """
+    summary_text = "\n\n".join(f"Part {i + 1}: {s}" for i, s in enumerate(summaries) if s)
+    metadata = _fit_metadata(code_analysis, {}, summary_text, budget_tokens)
+    return _lesson_prompt(metadata, summaries=summary_text)
+
+
+def _fit_metadata(code_analysis: Dict[str, Any], extra: Dict[str, Any], summaries: str, budget_tokens: int) -> str:
+    definitions = outline(code_analysis.get("definitions", []))
+    imports = code_analysis.get("imports", [])
+
+    while True:
+        metadata = compact_json({"definitions": definitions, "imports": imports, **extra})
+        if estimate_tokens(_lesson_prompt(metadata, summaries=summaries)) <= budget_tokens or not definitions:
+            return metadata
+        # Drop the tail of the outline (and call lists) until it fits
+        definitions = [{k: v for k, v in d.items() if k != "calls"} for d in definitions[: len(definitions) * 3 // 4]]
+
+
+def chunk_spans(source: bytes, definitions: List[Dict[str, Any]], max_tokens: int) -> List[Tuple[int, int]]:
+    """
+    Splits the file into (start, end) byte spans of at most max_tokens,
+    cutting only at the line of a top-level definition (a single oversized
+    definition is split at newlines). Nothing is decoded, so callers only
+    pay for the chunks they actually use. Linear in the file size.
+    """
+    max_bytes = max_tokens * CHARS_PER_TOKEN
+
+    # Top-level definition starts, i.e. definitions not nested in a previous one
+    boundaries = [0]
+    covered_until = -1
+    for defn in definitions:
+        start, end = defn.get("start_byte", 0), defn.get("end_byte", 0)
+        if start > covered_until:
+            line_start = source.rfind(b"\n", 0, start) + 1
+            if line_start > boundaries[-1]:
+                boundaries.append(line_start)
+            covered_until = end
+    boundaries.append(len(source))
+
+    spans = []
+    chunk_start = 0
+    for seg_start, seg_end in zip(boundaries, boundaries[1:]):
+        if seg_start > chunk_start and seg_end - chunk_start > max_bytes:
+            spans.append((chunk_start, seg_start))
+            chunk_start = seg_start
+        while seg_end - chunk_start > max_bytes:
+            cut = source.rfind(b"\n", chunk_start, chunk_start + max_bytes) + 1
+            if cut <= chunk_start:
+                cut = chunk_start + max_bytes
+            spans.append((chunk_start, cut))
+            chunk_start = cut
+    if chunk_start < len(source):
+        spans.append((chunk_start, len(source)))
+    return spans
+
+
+def chunk_by_definitions(source: Union[bytes, str], definitions: List[Dict[str, Any]], max_tokens: int) -> List[str]:
+    """chunk_spans, decoded."""
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    return [decode_source(source[start:end]) for start, end in chunk_spans(source, definitions, max_tokens)]
+
+
+def select_evenly(items: List[Any], limit: int) -> List[Any]:
+    """Picks at most `limit` items spread across the whole list."""
+    if len(items) <= limit:
+        return items
+    step = len(items) / limit
+    return [items[int(i * step)] for i in range(limit)]
+
+
+def _lesson_prompt(metadata: str, summaries: str = "", source: str = "") -> str:
+    extra = ""
+    if summaries:
+        extra += f"""
+        Summaries of the code, part by part:
+        {summaries}
+"""
+    if source:
+        extra += f"""
+        Source code:
+{source}
+"""
+    return f"""
+        You are an expert coding tutor. Analyze the following code metadata and generate a structured lesson.
+        
+        Code Metadata:
+        {metadata}
+{extra}{LESSON_OUTPUT_FORMAT}"""
+
+
+def definition_label(defn: Dict[str, Any]) -> str:
+    name = f"{defn['parent']}.{defn['name']}" if defn.get("parent") else defn.get("name", "")
+    return f"{defn.get('type', 'definition')}: {name}"
+
+
+def format_units(units: List[Dict[str, Any]], max_tokens: int) -> str:
+    """Definition units ({"id", "label", "code"}) as prompt text, each truncated to max_tokens."""
+    blocks = []
+    for unit in units:
+        code = decode_source(unit["code"][:max_tokens * CHARS_PER_TOKEN])
+        blocks.append(f"[{unit['id']}] {unit['label']}\n{code}")
+    return "\n\n".join(blocks)
+
+
+def batch_units(units: List[Dict[str, Any]], max_tokens: int) -> List[List[Dict[str, Any]]]:
+    """Groups units into batches of at most max_tokens of code (a larger unit is its own batch)."""
+    batches, current, current_tokens = [], [], 0
+    for unit in units:
+        tokens = min(len(unit["code"]) // CHARS_PER_TOKEN + 1, max_tokens)
+        if current and current_tokens + tokens > max_tokens:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,168 @@
+import difflib
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    repo TEXT NOT NULL,
+    file TEXT NOT NULL,
+    revision TEXT,
+    name TEXT NOT NULL COLLATE NOCASE,
+    kind TEXT,
+    parent TEXT,
+    start_line INTEGER,
+    end_line INTEGER
+);
+CREATE INDEX IF NOT EXISTS symbols_by_file ON symbols(repo, file);
+CREATE INDEX IF NOT EXISTS symbols_by_repo_name ON symbols(repo, name);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols(name);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS symbols_fts USING fts5(
+    name, content='symbols', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS symbols_ai AFTER INSERT ON symbols BEGIN
+    INSERT INTO symbols_fts(rowid, name) VALUES (new.id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS symbols_ad AFTER DELETE ON symbols BEGIN
+    INSERT INTO symbols_fts(symbols_fts, rowid, name) VALUES ('delete', old.id, old.name);
+END;
+"""
+
+FUZZY_CANDIDATES_PER_GRAM = 500
+
+COLUMNS = "s.repo, s.file, s.revision, s.name, s.kind, s.parent, s.start_line, s.end_line"
+
+
+class SymbolIndex:
+    """
+    Persistent repo-wide symbol index backed by SQLite.
+
+    Exact/prefix lookups use a NOCASE b-tree index; fuzzy lookups use an FTS5
+    trigram index for candidates and re-rank them by similarity.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def upsert_file(self, repo: str, file_path: str, revision: Optional[str], definitions: List[Dict[str, Any]]):
+        """Replaces every symbol of one file in a single transaction."""
+        self.upsert_files(repo, [(file_path, revision, definitions)])
+
+    def upsert_files(self, repo: str, files: Iterable[Tuple[str, Optional[str], List[Dict[str, Any]]]]):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for file_path, revision, definitions in files:
+                    conn.execute("DELETE FROM symbols WHERE repo = ? AND file = ?", (repo, file_path))
+                    conn.executemany(
+                        "INSERT INTO symbols (repo, file, revision, name, kind, parent, start_line, end_line) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [
+                            (repo, file_path, revision, d.get("name"), d.get("type"), d.get("parent"),
+                             d.get("start_line"), d.get("end_line"))
+                            for d in definitions
+                        ]
+                    )
+
+    def search(self, query: str, repo: Optional[str] = None, mode: str = "prefix", limit: int = 20) -> List[Dict[str, Any]]:
+        if not query:
+            return []
+        if mode == "fuzzy" and len(query) >= 3:
+            return self._search_fuzzy(query, repo, limit)
+        return self._search_prefix(query, repo, limit)
+
+    def _search_prefix(self, query: str, repo: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        # Range scan on the NOCASE index instead of LIKE, so "_" and "%" in
+        # symbol names are not treated as wildcards.
+        sql = f"SELECT {COLUMNS} FROM symbols s WHERE s.name >= ? AND s.name < ?"
+        params: List[Any] = [query, query + "￿"]
+        if repo:
+            sql += " AND s.repo = ?"
+            params.append(repo)
+        sql += " ORDER BY s.name LIMIT ?"
+        params.append(limit)
+        return self._fetch(sql, params)
+
+    def _search_fuzzy(self, query: str, repo: Optional[str], limit: int) -> List[Dict[str, Any]]:
+        lowered = query.lower()
+        # Ranking FTS matches with bm25 is expensive for common substrings,
+        # so candidates are gathered with cheap unranked lookups and
+        # re-ranked in Python.
+        candidate_ids = self._match_ids(_fts_phrase(lowered), repo, limit * 10)
+
+        if len(candidate_ids) < limit and len(lowered) >= 4:
+            # Typo tolerance: symbols sharing the most 4-character substrings
+            overlap = Counter()
+            for i in range(len(lowered) - 3):
+                overlap.update(self._match_ids(_fts_phrase(lowered[i:i + 4]), repo, FUZZY_CANDIDATES_PER_GRAM))
+            for symbol_id, _ in overlap.most_common(limit * 10):
+                if symbol_id not in candidate_ids:
+                    candidate_ids.append(symbol_id)
+
+        if not candidate_ids:
+            return []
+        placeholders = ",".join("?" * len(candidate_ids))
+        candidates = self._fetch(f"SELECT {COLUMNS} FROM symbols s WHERE s.id IN ({placeholders})", candidate_ids)
+        candidates.sort(key=lambda r: (-difflib.SequenceMatcher(None, lowered, r["name"].lower()).ratio(), r["name"]))
+        return candidates[:limit]
+
+    def _match_ids(self, match: str, repo: Optional[str], limit: int) -> List[int]:
+        # CROSS JOIN pins the FTS table as the outer loop; otherwise the
+        # planner may scan every symbol of the repo and probe FTS per row.
+        sql = "SELECT s.id FROM symbols_fts CROSS JOIN symbols s ON s.id = symbols_fts.rowid WHERE symbols_fts MATCH ?"
+        params: List[Any] = [match]
+        if repo:
+            sql += " AND s.repo = ?"
+            params.append(repo)
+        sql += " LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [row[0] for row in self._connect().execute(sql, params)]
+
+    def _fetch(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+        keys = ("repo", "file", "revision", "name", "kind", "parent", "start_line", "end_line")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connect().execute("SELECT count(*) FROM symbols").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def forget_connection(self):
+        """After fork: SQLite connections must not be used across processes, so reopen lazily."""
+        self._conn = None
+        self._lock = threading.Lock()
+
+
+def _fts_phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+symbol_index = SymbolIndex(config.SYMBOL_INDEX_PATH)
+os.register_at_fork(after_in_child=symbol_index.forget_connection)
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """
+    In-memory TTL + LRU cache with single-flight de-duplication: concurrent
+    get_or_compute calls for the same key share one in-flight computation.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        stored_at, value = item
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             should_cache: Callable[[Any], bool] = lambda _: True) -> Any:
+        cached = self.get(key)
+        if cached is not None:
+            self.counters["hits"] += 1
+            return cached
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+
+            def _on_done(done: asyncio.Future):
+                self._inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None and should_cache(done.result()):
+                    self.put(key, done.result())
+
+            task.add_done_callback(_on_done)
+
+        # shield: one waiter disconnecting must not cancel the shared computation
+        return await asyncio.shield(task)
+
+    def record(self, counter: str):
+        self.counters[counter] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.counters, "entries": len(self._entries), "inflight": len(self._inflight)}
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional
+
+from config import config
+from services.ai_service import ai_service
+from services.ast_parser import parser_service, LANG_MAP
+from services.github_loader import get_async_client
+from services.workers import get_process_pool
+
+
+def configured_languages() -> List[str]:
+    spec = config.PREWARM_LANGUAGES.strip()
+    if spec == "*":
+        return sorted(set(LANG_MAP.values()))
+    return [language.strip() for language in spec.split(",") if language.strip()]
+
+
+def prewarm_grammars(languages: Optional[List[str]] = None) -> Dict[str, float]:
+    """
+    Loads grammars and compiles their queries. Fork-safe (no threads,
+    sockets or files are left open), so it can run before a pre-fork server
+    or the process pool forks; children then share the loaded grammars
+    copy-on-write instead of each loading their own.
+    """
+    return parser_service.prewarm(configured_languages() if languages is None else languages)
+
+
+def warm_worker(languages: List[str]) -> int:
+    # In a forked pool process the grammars are inherited and this is a no-op
+    prewarm_grammars(languages)
+    return os.getpid()
+
+
+async def warm_process_pool(languages: List[str]) -> int:
+    """Starts every pool process now instead of on the first requests. Returns how many answered."""
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    # Submitted together, so no worker is idle and the pool spawns all of them
+    pids = await asyncio.gather(*[
+        loop.run_in_executor(pool, warm_worker, languages) for _ in range(config.ANALYSIS_WORKERS)
+    ])
+    return len(set(pids))
+
+
+async def prewarm() -> Dict[str, float]:
+    """
+    Startup work that would otherwise land on the first requests: grammars
+    (before the pool forks), the process pool, the GitHub client and the
+    LLM provider. Returns seconds per step.
+    """
+    timings = {}
+    languages = configured_languages()
+
+    start = time.perf_counter()
+    prewarm_grammars(languages)
+    timings["grammars"] = time.perf_counter() - start
+
+    if config.PREWARM_WORKERS:
+        start = time.perf_counter()
+        workers = await warm_process_pool(languages)
+        timings["workers"] = time.perf_counter() - start
+    else:
+        workers = 0
+
+    start = time.perf_counter()
+    get_async_client()
+    ai_service.provider
+    timings["clients"] = time.perf_counter() - start
+
+    summary = ", ".join(f"{step} {seconds * 1000:.0f} ms" for step, seconds in timings.items())
+    print(f"Prewarmed {len(languages)} grammars and {workers} workers: {summary}")
+    return timings
@@ -0,0 +1,43 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from config import config
+
+# Tree-sitter holds the GIL while parsing, so CPU-bound stages run in a
+# separate process instead of a thread to keep the event loop responsive.
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=config.ANALYSIS_WORKERS)
+    return _process_pool
+
+
+async def run_in_process(func, *args, **kwargs):
+    """
+    Runs a picklable, module-level function in the bounded process pool
+    without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), functools.partial(func, *args, **kwargs))
+
+
+def _reset_after_fork():
+    # A forked child (e.g. a pre-fork server worker) starts its own pool on first use
+    global _process_pool
+    _process_pool = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def shutdown_pools():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -5,6 +5,17 @@ import pytest
 # Add backend root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from services.artifact_store import artifact_store
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_store(tmp_path, monkeypatch):
+    # The store is shared across processes and runs, so every test gets its own
+    artifact_store.close()
+    monkeypatch.setattr(artifact_store, "db_path", str(tmp_path / "artifacts.sqlite3"))
+    yield artifact_store
+    artifact_store.close()
+
 @pytest.fixture
 def mock_code_analysis():
     return {
@@ -14,5 +25,5 @@ def mock_code_analysis():
             {"name": "helper_func", "type": "function", "parent": None}
         ],
         "imports": ["os", "sys"],
-        "raw_code": "class TestClass:\n    def test_method(self): pass\n\ndef helper_func(): pass"
+        "source": b"class TestClass:\n    def test_method(self): pass\n\ndef helper_func(): pass"
     }
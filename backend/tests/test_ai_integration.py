@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 import unittest
 from unittest.mock import patch, MagicMock
 
@@ -7,6 +8,8 @@ from unittest.mock import patch, MagicMock
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from services.ai_service import AIService
+from services.lesson_cache import chunk_summary_cache
+from services.llm_scheduler import llm_scheduler
 from config import config
 
 class TestAIService(unittest.TestCase):
@@ -43,9 +46,56 @@ class TestAIService(unittest.TestCase):
             mock_model_instance.generate_content.return_value = mock_response
             
             service = AIService()
+            submitted = llm_scheduler.counters["submitted"]
             result = service.generate_lesson_content({"code": "print('hello')"})
             
             self.assertEqual(result["chapters"][0]["title"], "Test Chapter")
+            # The blocking path is admitted by the shared scheduler too
+            self.assertEqual(llm_scheduler.counters["submitted"], submitted + 1)
+
+    @patch('google.generativeai.GenerativeModel')
+    def test_large_file_uses_bounded_map_reduce(self, mock_model_class):
+        """Oversized files are summarised chunk by chunk, then reduced into one lesson."""
+        prompts = []
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fake_generate(prompt, **kwargs):
+            nonlocal in_flight, max_in_flight
+            prompts.append(prompt)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            response = MagicMock()
+            if "Summarize the following fragment" in prompt:
+                response.text = "This part defines helpers."
+            else:
+                response.text = '{"chapters": [{"title": "Big", "content": "..."}], "quiz": []}'
+            return response
+
+        code = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(3000))
+        analysis = {
+            "definitions": [{"name": f"f{i}", "type": "function", "parent": None, "start_line": i * 3, "end_line": i * 3 + 1} for i in range(3000)],
+            "imports": [],
+            "source": code.encode("utf-8")
+        }
+
+        with patch.object(config, 'GEMINI_API_KEY', 'fake_key'), \
+             patch.object(config, 'LESSON_TOKEN_BUDGET', 2000), \
+             patch.object(config, 'LESSON_CHUNK_TOKENS', 500), \
+             patch.object(config, 'LESSON_MAX_CHUNKS', 6), \
+             patch.object(config, 'LESSON_MAP_CONCURRENCY', 2):
+            mock_model_class.return_value.generate_content_async = fake_generate
+            chunk_summary_cache.clear()
+            result = asyncio.run(AIService().generate_lesson_content_async(analysis))
+
+        self.assertEqual(result["chapters"][0]["title"], "Big")
+        # 6 map calls + 1 reduce call, regardless of the file size
+        self.assertEqual(len(prompts), 7)
+        self.assertLessEqual(max_in_flight, 2)
+        self.assertIn("This part defines helpers.", prompts[-1])
+        self.assertNotIn("def f2999", prompts[-1])
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,5 @@
 import pytest
-from agents.archaeologist import Archaeologist
+from agents.archaeologist import Archaeologist, definition_units
 
 @pytest.fixture
 def archaeologist():
@@ -50,3 +50,96 @@ class JSClass {
             assert any(d["name"] == "jsFunc" for d in result["definitions"])
     except Exception:
         pytest.skip("JS Parser might not be initialized")
+
+def test_reanalyze_reports_definition_changes(archaeologist):
+    key = ("https://github.com/o/r", "svc.py")
+    v1 = "import os\n\nclass Service:\n    def start(self):\n        return 1\n\n    def stop(self):\n        return 0\n"
+    v2 = "import os\n\nclass Service:\n    def start(self):\n        return 2\n\n    def restart(self):\n        return 0\n"
+
+    first = archaeologist.reanalyze_file(v1, "svc.py", key)
+    second = archaeologist.reanalyze_file(v2, "svc.py", key)
+
+    assert first["reparse"] == "full"
+    assert second["reparse"] == "incremental"
+    assert [d["name"] for d in second["changes"]["added"]] == ["restart"]
+    assert [d["name"] for d in second["changes"]["removed"]] == ["stop"]
+    assert [d["name"] for d in second["changes"]["changed"]] == ["Service", "start"]
+    assert second["changes"]["imports_changed"] is False
+
+
+def test_reanalyze_returns_stored_artifacts(archaeologist):
+    key = ("https://github.com/o/r", "a.py")
+    code = "def f():\n    pass\n"
+
+    archaeologist.reanalyze_file(code, "a.py", key)
+    archaeologist.store_artifacts(key, graph={"nodes": [], "edges": []})
+    again = archaeologist.reanalyze_file(code + "# comment\n", "a.py", key)
+
+    assert again["artifacts"]["graph"] == {"nodes": [], "edges": []}
+    assert not any(again["changes"][k] for k in ("added", "removed", "changed"))
+
+
+def test_full_parses_can_be_done_elsewhere(archaeologist, monkeypatch):
+    key = ("https://github.com/o/r", "big.py")
+    v1 = b"def f():\n    return 1\n"
+    v2 = b"def f():\n    return 2\n"
+    assert archaeologist.needs_full_parse(key, "big.py", len(v1))
+
+    parsed = archaeologist.analyze_file(v1, "big.py")
+    first = archaeologist.reanalyze_file(v1, "big.py", key, (parsed["definitions"], parsed["imports"]))
+    assert first["reparse"] == "full"
+
+    # The snapshot has no tree; a small revision rebuilds it and reparses incrementally
+    assert not archaeologist.needs_full_parse(key, "big.py", len(v2))
+    second = archaeologist.reanalyze_file(v2, "big.py", key)
+    assert second["reparse"] == "incremental"
+    assert [d["name"] for d in second["changes"]["changed"]] == ["f"]
+
+    monkeypatch.setattr("agents.archaeologist.config.INCREMENTAL_INLINE_MAX_BYTES", len(v2) - 1)
+    assert archaeologist.needs_full_parse(key, "big.py", len(v2))
+    assert not archaeologist.needs_full_parse(key, "notes.txt", len(v2))
+
+
+def test_analyze_bytes_takes_imports_from_the_ast(archaeologist):
+    source = "import os\nfrom typing import (\n    Any,\n    Dict)\ns = 'import fake'\ndef naïve():\n    pass\n".encode("utf-8")
+
+    result = archaeologist.analyze_file(memoryview(source), "mod.py")
+
+    assert result["imports"] == ["import os", "from typing import ( Any, Dict)"]
+    assert [d["name"] for d in result["definitions"]] == ["naïve"]
+    assert bytes(result["source"]) == source
+
+    c_result = archaeologist.analyze_file(b"#include <stdio.h>\nint main() { return 0; }\n", "main.c")
+    assert c_result["imports"] == ["#include <stdio.h>"]
+
+
+def test_large_file_analysis_does_not_copy_the_source(archaeologist):
+    import tracemalloc
+
+    # ~8 MB, mostly comments, so any decode or copy of the file would dominate the peak
+    source = b"import os\n" + b"# padding padding padding padding padding padding\n" * 160_000 + b"def tail():\n    pass\n"
+
+    tracemalloc.start()
+    try:
+        result = archaeologist.analyze_file(source, "big.py")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert [d["name"] for d in result["definitions"]] == ["tail"]
+    assert result["imports"] == ["import os"]
+    assert result["source"] is source
+    assert peak < len(source) // 10
+
+
+def test_definition_units_elide_nested_definitions(archaeologist):
+    v1 = b"class Service:\n    name = 'svc'\n\n    def start(self):\n        return 1\n"
+    v2 = b"class Service:\n    name = 'svc'\n\n    def start(self):\n        return 2\n"
+
+    first = definition_units(archaeologist.analyze_file(v1, "svc.py")["definitions"], v1)
+    second = definition_units(archaeologist.analyze_file(v2, "svc.py")["definitions"], v2)
+
+    assert first[0]["code"] == b"class Service:\n    name = 'svc'\n\n    ..."
+    # Editing the method changes only the method's digest
+    assert first[0]["digest"] == second[0]["digest"]
+    assert first[1]["digest"] != second[1]["digest"]
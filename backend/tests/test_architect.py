@@ -41,3 +41,84 @@ def test_graph_styling(architect, mock_code_analysis):
     
     # Check distinct styles
     assert class_node["style"]["background"] != method_node["style"]["background"]
+
+def test_call_edges_have_distinct_kind(architect):
+    analysis = {
+        "definitions": [
+            {"name": "Repo", "type": "class", "parent": None, "calls": []},
+            {"name": "save", "type": "function", "parent": "Repo", "calls": ["validate", "print"]},
+            {"name": "validate", "type": "function", "parent": "Repo", "calls": []},
+            {"name": "main", "type": "function", "parent": None, "calls": ["save", "main"]},
+        ],
+        "imports": []
+    }
+    graph = architect.generate_graph(analysis)
+
+    call_edges = {(e["source"], e["target"]) for e in graph["edges"] if e["kind"] == "call"}
+    assert call_edges == {("def_1", "def_2"), ("def_3", "def_1")}
+    assert all(e["kind"] in ("contains", "import", "call") for e in graph["edges"])
+
+
+def test_repo_graph_links_unique_names_across_files(architect):
+    repo_analysis = {"files": [
+        {"path": "a.py", "definitions": [{"name": "run", "type": "function", "parent": None, "calls": ["helper"]}]},
+        {"path": "b.py", "definitions": [{"name": "helper", "type": "function", "parent": None, "calls": []}]},
+    ]}
+    graph = architect.generate_repo_graph(repo_analysis)
+
+    call_edges = [(e["source"], e["target"]) for e in graph["edges"] if e["kind"] == "call"]
+    assert call_edges == [("file_0_def_0", "file_1_def_0")]
+
+
+def test_repo_graph_links_files_that_import_each_other(architect):
+    repo_analysis = {"files": [
+        {"path": "app/main.py", "definitions": [], "imports": ["from app.models import User", "import os"]},
+        {"path": "app/models.py", "definitions": [], "imports": []},
+    ]}
+    graph = architect.generate_repo_graph(repo_analysis, root_label="Batch Analysis")
+
+    import_edges = [(e["source"], e["target"]) for e in graph["edges"] if e["kind"] == "import"]
+    assert import_edges == [("file_0", "file_1")]
+    assert graph["nodes"][0]["data"]["label"] == "Batch Analysis"
+
+
+LAYERED = {
+    "definitions": [
+        {"type": "class", "name": "Repo", "parent": None, "calls": []},
+        {"type": "function", "name": "load", "parent": "Repo", "calls": ["parse"]},
+        {"type": "function", "name": "save", "parent": "Repo", "calls": ["load"]},
+        {"type": "class", "name": "Parser", "parent": None, "calls": []},
+        {"type": "function", "name": "parse", "parent": "Parser", "calls": []},
+        {"type": "function", "name": "main", "parent": None, "calls": ["save"]},
+    ],
+    "imports": ["import os"],
+}
+
+
+def test_summary_graph_collapses_classes(architect):
+    graph = architect.generate_summary_graph(LAYERED)
+
+    nodes = {n["id"]: n for n in graph["nodes"]}
+    assert set(nodes) == {"file_main", "imp_0", "def_0", "def_3", "def_5"}
+    assert nodes["def_0"]["data"]["childCount"] == 2 and nodes["def_0"]["data"]["collapsed"]
+    assert nodes["def_5"]["data"]["childCount"] == 0 and not nodes["def_5"]["data"]["collapsed"]
+    # Calls between hidden methods are drawn between their classes
+    calls = {(e["source"], e["target"]) for e in graph["edges"] if e["kind"] == "call"}
+    assert calls == {("def_0", "def_3"), ("def_5", "def_0")}
+
+
+def test_expand_node_matches_full_graph(architect):
+    full = architect.generate_graph(LAYERED)
+    expanded = architect.expand_node(LAYERED, "def_0")
+
+    assert [n["id"] for n in expanded["nodes"]] == ["def_1", "def_2"]
+    assert all(n["position"]["y"] > 0 for n in expanded["nodes"])
+    full_edges = {e["id"] for e in full["edges"]}
+    assert {e["id"] for e in expanded["edges"]} <= full_edges
+    calls = {(e["source"], e["target"]) for e in expanded["edges"] if e["kind"] == "call"}
+    assert calls == {("def_1", "def_4"), ("def_2", "def_1"), ("def_5", "def_2")}
+
+    with pytest.raises(KeyError):
+        architect.expand_node(LAYERED, "def_99")
+    with pytest.raises(KeyError):
+        architect.expand_node(LAYERED, "file_main")
@@ -0,0 +1,56 @@
+import time
+
+from services.artifact_store import ArtifactStore, artifact_key
+
+
+def test_round_trip_is_keyed_by_kind_and_version(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts.sqlite3"), max_bytes=1024 * 1024)
+    key = artifact_key("ab" * 20, "pkg/Model.PY")
+    structure = {"definitions": [{"name": "run", "type": "function"}], "imports": ["import os"]}
+
+    store.put(key, "structure", "1", structure)
+
+    assert key == "ab" * 20 + ".py"
+    assert store.get(key, "structure", "1") == structure
+    assert store.get(key, "structure", "2") is None
+    assert store.get(key, "graph:full", "1") is None
+    assert store.stats()["hits"] == 1
+    store.close()
+
+
+def test_other_connections_see_stored_artifacts(tmp_path):
+    path = str(tmp_path / "artifacts.sqlite3")
+    writer, reader = ArtifactStore(path, 1024 * 1024), ArtifactStore(path, 1024 * 1024)
+
+    writer.put("k.py", "structure", "1", {"definitions": [], "imports": []})
+
+    assert reader.get("k.py", "structure", "1") == {"definitions": [], "imports": []}
+    writer.close()
+    reader.close()
+
+
+def test_eviction_keeps_the_store_within_its_bound(tmp_path):
+    store = ArtifactStore(str(tmp_path / "artifacts.sqlite3"), max_bytes=8 * 1024)
+    # Incompressible-ish payloads of roughly 1 KiB each
+    for i in range(40):
+        store.put(f"{i:040x}.py", "structure", "1", {"data": [str(j * 7919 + i) for j in range(150)]})
+
+    stats = store.stats()
+    assert stats["bytes"] <= 8 * 1024
+    assert stats["evictions"] > 0
+    assert store.get(f"{39:040x}.py", "structure", "1") is not None
+    assert store.get(f"{0:040x}.py", "structure", "1") is None
+    store.close()
+
+
+def test_path_blobs_expire(tmp_path, monkeypatch):
+    store = ArtifactStore(str(tmp_path / "artifacts.sqlite3"), max_bytes=1024 * 1024)
+    store.remember_path("https://github.com/o/r", None, "a.py", "f" * 40)
+
+    assert store.path_blob("https://github.com/o/r", "HEAD", "a.py", max_age=30) == "f" * 40
+    assert store.path_blob("https://github.com/o/r", "main", "a.py", max_age=30) is None
+
+    later = time.time() + 60
+    monkeypatch.setattr("services.artifact_store.time.time", lambda: later)
+    assert store.path_blob("https://github.com/o/r", None, "a.py", max_age=30) is None
+    store.close()
@@ -0,0 +1,135 @@
+import pytest
+
+from services.ast_parser import AstParser
+
+
+@pytest.fixture
+def parser():
+    return AstParser()
+
+
+def _names(definitions):
+    return [(d["type"], d["name"], d["parent"]) for d in definitions]
+
+
+def test_python_decorated_definitions_include_decorator(parser):
+    code = "class A:\n    @property\n    def value(self):\n        return 1\n"
+    definitions = parser.extract_definitions(code, "a.py")
+
+    assert _names(definitions) == [("class", "A", None), ("function", "value", "A")]
+    assert definitions[1]["start_line"] == 1
+
+
+def test_javascript_arrow_functions_and_methods(parser):
+    code = (
+        "const add = (a, b) => a + b;\n"
+        "class Cart {\n"
+        "  total() { return 0; }\n"
+        "}\n"
+        "function main() {}\n"
+    )
+    names = _names(parser.extract_definitions(code, "cart.js"))
+
+    assert names == [
+        ("function", "add", None),
+        ("class", "Cart", None),
+        ("function", "total", "Cart"),
+        ("function", "main", None),
+    ]
+
+
+def test_typescript_methods(parser):
+    code = "class Repo {\n  find(id: string): number { return 1; }\n}\n"
+    names = _names(parser.extract_definitions(code, "repo.ts"))
+
+    assert names == [("class", "Repo", None), ("function", "find", "Repo")]
+
+
+def test_java_methods_and_constructors(parser):
+    code = "class Shop {\n  Shop() {}\n  int price() { return 1; }\n}\n"
+    names = _names(parser.extract_definitions(code, "Shop.java"))
+
+    assert names == [("class", "Shop", None), ("function", "Shop", "Shop"), ("function", "price", "Shop")]
+
+
+def test_c_functions_are_found(parser):
+    code = "int add(int a, int b) { return a + b; }\nchar *name(void) { return 0; }\n"
+    names = _names(parser.extract_definitions(code, "math.c"))
+
+    assert names == [("function", "add", None), ("function", "name", None)]
+
+
+def test_non_ascii_names_use_byte_offsets(parser):
+    code = "# héllo wörld\ndef grüße():\n    pass\n"
+    names = _names(parser.extract_definitions(code, "a.py"))
+
+    assert names == [("function", "grüße", None)]
+
+
+def test_cursor_fallback_matches_query_results(parser):
+    code = "import os\nclass A:\n    def m(self):\n        def inner():\n            pass\n\ndef f():\n    pass\n"
+    tree, _ = parser.parse_code(code, ".py")
+
+    from_query, query_imports = parser._definitions_from_query(parser.queries["python"], tree.root_node)
+    from_walk, walk_imports = parser._definitions_from_walk(tree.root_node)
+
+    assert from_query == from_walk
+    assert query_imports == walk_imports == ["import os"]
+    assert _names(from_walk)[2] == ("function", "inner", "A")
+
+
+def test_deeply_nested_code_does_not_recurse(parser):
+    depth = 3000
+    code = "x = " + "[" * depth + "]" * depth + "\ndef f():\n    pass\n"
+    tree, _ = parser.parse_code(code, ".py")
+
+    assert _names(parser._definitions_from_walk(tree.root_node)[0]) == [("function", "f", None)]
+
+
+@pytest.mark.parametrize("new_code", [
+    "class A:\n    def m(self):\n        return 2\n\ndef f():\n    pass\n",
+    "import sys\nclass A:\n    def m(self):\n        return 1\n",
+    "class A:\n    def m(self):\n        return 1\n\ndef f():\n    pass\ndef g(): pass",
+    "",
+])
+def test_incremental_reparse_matches_fresh_parse(parser, new_code):
+    old_code = "class A:\n    def m(self):\n        return 1\n\ndef f():\n    pass\n"
+    old_tree, lang = parser.parse_code(old_code, ".py")
+
+    new_tree = parser.reparse(old_tree, old_code.encode(), new_code.encode(), lang)
+    fresh_tree, _ = parser.parse_code(new_code, ".py")
+
+    assert new_tree.root_node.sexp() == fresh_tree.root_node.sexp()
+    assert parser.definitions_from_tree(new_tree, lang) == parser.definitions_from_tree(fresh_tree, lang)
+
+
+def test_calls_are_attributed_to_innermost_definition(parser):
+    code = (
+        "class Service:\n"
+        "    def start(self):\n"
+        "        self.load()\n"
+        "        helper()\n"
+        "        helper()\n"
+        "    def load(self):\n"
+        "        return read()\n"
+        "\n"
+        "def helper():\n"
+        "    print('x')\n"
+        "setup()\n"
+    )
+    calls = {d["name"]: d["calls"] for d in parser.extract_definitions(code, "svc.py")}
+
+    assert calls == {"Service": [], "start": ["load", "helper"], "load": ["read"], "helper": ["print"]}
+
+
+@pytest.mark.parametrize("file_path, code, expected", [
+    ("a.js", "function a() { b(); obj.c(); new D(); }", ["b", "c", "D"]),
+    ("a.ts", "const a = () => { b(); this.c(); };", ["b", "c"]),
+    ("A.java", "class A { void a() { b(); x.c(); new D(); } }", ["b", "c", "D"]),
+    ("a.c", "int a(void) { b(); s->c(); return 0; }", ["b", "c"]),
+])
+def test_calls_for_other_languages(parser, file_path, code, expected):
+    definitions = parser.extract_definitions(code, file_path)
+    caller = next(d for d in definitions if d["name"] == "a")
+
+    assert caller["calls"] == expected
@@ -0,0 +1,37 @@
+from benchmarks.corpus import LANGUAGE_EXTENSIONS, make_corpus
+from benchmarks.suite import compare, run_suite
+from services.ast_parser import LANG_MAP, parser_service
+
+
+def test_corpus_covers_every_language_and_size_axis():
+    assert set(LANGUAGE_EXTENSIONS) == set(LANG_MAP.values())
+    for language, ext in LANGUAGE_EXTENSIONS.items():
+        by_lines = make_corpus(language, "lines", 200, parser_service)
+        by_definitions = make_corpus(language, "definitions", 30, parser_service)
+        assert by_lines.count("\n") >= 200
+        assert len(parser_service.extract_definitions(by_definitions, "x" + ext)) >= 30
+
+
+def test_run_suite_records_every_stage():
+    report = run_suite(["python"], {"definitions": [30]}, repeat=1)
+    stages = [r["stage"] for r in report["results"]]
+    assert stages == ["parse", "definitions", "graph", "response", "serialize"]
+    assert all(r["seconds"] >= 0 and r["peak_bytes"] >= 0 for r in report["results"])
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = {"results": [
+        {"id": "a", "seconds": 0.100, "peak_bytes": 1_000_000},
+        {"id": "b", "seconds": 0.100, "peak_bytes": 1_000_000},
+        {"id": "c", "seconds": 0.0001, "peak_bytes": 1000},
+    ]}
+    current = {"results": [
+        {"id": "a", "seconds": 0.120, "peak_bytes": 1_100_000},   # within 25%
+        {"id": "b", "seconds": 0.200, "peak_bytes": 3_000_000},   # both regress
+        {"id": "c", "seconds": 0.004, "peak_bytes": 5000},        # below the noise floor
+        {"id": "d", "seconds": 9.0, "peak_bytes": 9},             # not in the baseline
+    ]}
+
+    regressions = compare(current, baseline, time_threshold=0.25, memory_threshold=0.25)
+    assert [(r["id"], r["metric"]) for r in regressions] == [("b", "seconds"), ("b", "peak_bytes")]
+    assert compare(current, baseline, time_threshold=1.5, memory_threshold=2.5) == []
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from services.fetch_cache import FetchCache
+
+KEY_A = ("octo", "demo", "HEAD", "a.py")
+KEY_B = ("octo", "demo", "HEAD", "b.py")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FetchCache(max_bytes=10, disk_dir=str(tmp_path), fresh_seconds=30)
+
+
+def test_lru_evicts_by_bytes(cache):
+    cache.store(KEY_A, '"a"', "sha_a", b"aaaaaa")
+    cache.store(KEY_B, '"b"', "sha_b", b"bbbbbb")
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == 6
+    assert stats["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(cache, tmp_path):
+    cache.store(KEY_A, '"a"', "sha_a", b"aaaaaa")
+
+    restarted = FetchCache(max_bytes=10, disk_dir=str(tmp_path), fresh_seconds=30)
+    entry = restarted.get(KEY_A)
+
+    assert entry.content == b"aaaaaa"
+    assert entry.etag == '"a"'
+    # Entries loaded from disk must be revalidated before being trusted
+    assert not restarted.is_fresh(entry)
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_blobs_are_content_addressed(cache, tmp_path):
+    cache.store(KEY_A, '"a"', "same_sha", b"shared")
+    cache.store(KEY_B, '"b"', "same_sha", b"shared")
+
+    blobs = list((tmp_path / "blobs").rglob("*"))
+    assert [p.name for p in blobs if p.is_file()] == ["same_sha"]
+
+
+def test_disk_tier_evicts_least_recently_used_files(tmp_path):
+    cache = FetchCache(max_bytes=10, disk_dir=str(tmp_path), fresh_seconds=30, disk_max_bytes=300)
+    keys = [("octo", "demo", "HEAD", f"{i}.py") for i in range(3)]
+    for i, key in enumerate(keys[:2]):
+        cache.store(key, f'"{i}"', f"sha_{i}", bytes([65 + i]) * 100)
+    # Make the first file the most recently used one
+    for path in (tmp_path / "blobs").rglob("sha_1"):
+        os.utime(path, (1, 1))
+    cache.clear()
+    assert cache.get(keys[0]) is not None
+
+    cache.store(keys[2], '"2"', "sha_2", b"C" * 100)
+
+    blobs = sorted(p.name for p in (tmp_path / "blobs").rglob("*") if p.is_file())
+    assert blobs == ["sha_0", "sha_2"]
+    assert cache.stats()["disk_evictions"] >= 1
+    total = sum(p.stat().st_size for p in tmp_path.rglob("*") if p.is_file())
+    assert total <= 300
+    cache.clear()
+    assert cache.get(keys[1]) is None
+    assert bytes(cache.get(keys[0]).content) == b"A" * 100
@@ -0,0 +1,128 @@
+import asyncio
+import subprocess
+
+import pytest
+
+from services import github_loader
+from services.git_mirror import GitMirror, MirrorManager
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=cwd, check=True, capture_output=True
+    ).stdout.decode().strip()
+
+
+def _commit(repo, files, message):
+    for name, content in files.items():
+        path = repo / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", message)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture
+def upstream(tmp_path):
+    repo = tmp_path / "upstream"
+    repo.mkdir()
+    _git(repo, "init", "-q", "-b", "main")
+    first = _commit(repo, {"app.py": b"def run():\n    return 1\n", "pkg/util.py": b"X = 1\n",
+                           "README.md": b"# readme\n"}, "first")
+    return repo, first
+
+
+@pytest.fixture
+def mirror(upstream, tmp_path):
+    repo, _ = upstream
+    mirror = GitMirror(str(repo), str(tmp_path / "mirrors" / "upstream.git"))
+    mirror.ensure()
+    yield mirror
+    mirror.close()
+
+
+def test_reads_files_pinned_to_a_revision(upstream, mirror):
+    repo, first = upstream
+    second = _commit(repo, {"app.py": b"def run():\n    return 2\n"}, "second")
+    mirror.update()
+
+    assert mirror.read("app.py") == b"def run():\n    return 2\n"
+    assert mirror.read("app.py", first) == b"def run():\n    return 1\n"
+    assert mirror.read("pkg/util.py", "main") == b"X = 1\n"
+    assert mirror.resolve("main") == second
+    with pytest.raises(FileNotFoundError):
+        mirror.read("missing.py")
+    with pytest.raises(FileNotFoundError):
+        mirror.read("pkg")  # a tree, not a file
+    with pytest.raises(LookupError):
+        mirror.read("app.py", "no-such-branch")
+    assert mirror.blob_sha("app.py", first) == github_loader.git_blob_sha(b"def run():\n    return 1\n")
+    assert mirror.blob_sha("pkg") is None
+
+
+def test_refs_move_only_on_update(upstream, mirror):
+    repo, first = upstream
+    assert mirror.resolve() == first
+
+    _commit(repo, {"app.py": b"changed\n"}, "second")
+    assert mirror.read("app.py") == b"def run():\n    return 1\n"
+
+    mirror.update()
+    assert mirror.read("app.py") == b"changed\n"
+    assert mirror.counters["fetches"] == 2
+
+
+def test_one_cat_file_process_is_reused_and_restarted(mirror):
+    mirror.read("app.py")
+    process = mirror._processes["--batch"]
+    mirror.read("pkg/util.py")
+    assert mirror._processes["--batch"] is process
+
+    process.kill()
+    process.wait()
+    assert mirror.read("app.py") == b"def run():\n    return 1\n"
+    assert mirror.counters["restarts"] == 1
+
+
+def test_iter_files_filters_extensions_and_size(upstream, mirror):
+    repo, _ = upstream
+    _commit(repo, {"big.py": b"#" * 2048 + b"\n"}, "big")
+    mirror.update()
+
+    files = dict(mirror.iter_files([".py"], max_file_bytes=1024))
+
+    assert files == {"app.py": b"def run():\n    return 1\n", "pkg/util.py": b"X = 1\n"}
+
+
+def test_github_loader_serves_mirrored_repos_without_http(upstream, tmp_path, monkeypatch):
+    repo, _ = upstream
+    manager = MirrorManager(str(tmp_path / "mirrors"), repos=str(repo), refresh_seconds=0)
+    monkeypatch.setattr(github_loader, "mirror_manager", manager)
+
+    def no_http(*args, **kwargs):
+        raise AssertionError("mirrored repos must not hit the contents API")
+
+    monkeypatch.setattr(github_loader, "get_async_client", no_http)
+    monkeypatch.setattr(github_loader._session, "get", no_http)
+
+    try:
+        assert asyncio.run(github_loader.fetch_file_bytes_async(str(repo), "/app.py")) == b"def run():\n    return 1\n"
+        assert github_loader.fetch_file_content(str(repo) + "/", "pkg/util.py") == "X = 1\n"
+        assert sorted(p for p, _ in github_loader.iter_repo_archive(str(repo), [".py"])) == ["app.py", "pkg/util.py"]
+        assert not manager.handles("https://github.com/o/other")
+        assert manager.stats()[str(repo)]["reads"] == 4
+    finally:
+        manager.close()
+
+
+def test_wildcard_only_mirrors_github_repositories(tmp_path):
+    manager = MirrorManager(str(tmp_path / "mirrors"), repos="*", refresh_seconds=0)
+
+    assert manager.handles("https://github.com/owner/repo")
+    assert manager.handles("https://github.com/owner/repo.git/")
+    for url in ["/etc/passwd", "file:///etc", "ext::sh -c touch% /tmp/pwned", "-oProxyCommand=touch /tmp/pwned",
+                "http://github.com/owner/repo", "https://github.com.evil.com/owner/repo",
+                "https://github.com/owner/repo/extra", "https://github.com/../repo", "ssh://git@github.com/owner/repo"]:
+        assert not manager.handles(url), url
@@ -0,0 +1,82 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+from services import github_loader
+from services.fetch_cache import FetchCache
+
+
+def _contents_payload(text: str) -> dict:
+    return {"content": base64.b64encode(text.encode("utf-8")).decode("ascii")}
+
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = FetchCache(max_bytes=1024 * 1024, disk_dir=str(tmp_path), fresh_seconds=0)
+    monkeypatch.setattr(github_loader, "fetch_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def mock_github(monkeypatch, cache):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("missing.py"):
+            return httpx.Response(404, text="Not Found")
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        payload = {**_contents_payload("print('hi')\n"), "sha": "abc123"}
+        return httpx.Response(200, json=payload, headers={"ETag": '"v1"'})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(github_loader, "_async_client", client)
+    yield calls
+    asyncio.run(client.aclose())
+
+
+def test_fetch_file_content_async_decodes(mock_github):
+    code = asyncio.run(github_loader.fetch_file_content_async("https://github.com/octo/demo", "blob/main/src/app.py"))
+
+    assert code == "print('hi')\n"
+    assert mock_github == ["/repos/octo/demo/contents/src/app.py"]
+
+
+def test_fetch_file_content_async_raises_on_error(mock_github):
+    with pytest.raises(Exception, match="GitHub API error 404"):
+        asyncio.run(github_loader.fetch_file_content_async("https://github.com/octo/demo", "missing.py"))
+
+
+def test_unchanged_file_is_revalidated_with_etag(mock_github, cache):
+    fetch = github_loader.fetch_file_content_async
+    first = asyncio.run(fetch("https://github.com/octo/demo", "src/app.py"))
+    second = asyncio.run(fetch("https://github.com/octo/demo", "src/app.py"))
+
+    assert first == second == "print('hi')\n"
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["revalidations"] == 1
+
+
+def test_fresh_entry_skips_network(mock_github, cache):
+    cache.fresh_seconds = 60
+    fetch = github_loader.fetch_file_content_async
+    asyncio.run(fetch("https://github.com/octo/demo", "src/app.py"))
+    asyncio.run(fetch("https://github.com/octo/demo", "src/app.py"))
+
+    assert len(mock_github) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_async_client_is_reused():
+    async def get_twice():
+        first = github_loader.get_async_client()
+        second = github_loader.get_async_client()
+        await github_loader.close_async_client()
+        return first, second
+
+    first, second = asyncio.run(get_twice())
+    assert first is second
@@ -0,0 +1,65 @@
+import time
+
+from agents.architect import Architect
+from services.graph_layout import tree_layout, NODE_WIDTH, NODE_HEIGHT
+
+
+def _make_definitions(classes: int, methods_per_class: int, functions: int):
+    definitions = []
+    for c in range(classes):
+        definitions.append({"type": "class", "name": f"C{c}", "parent": None})
+        definitions.extend({"type": "function", "name": f"m{m}", "parent": f"C{c}"} for m in range(methods_per_class))
+    definitions.extend({"type": "function", "name": f"f{f}", "parent": None} for f in range(functions))
+    return definitions
+
+
+def test_nodes_do_not_overlap_and_children_sit_below_parents():
+    parents = [-1] + [0] * 5 + [1] * 4 + [2] * 3
+    positions = tree_layout(parents)
+
+    cells = {(x // NODE_WIDTH, y // NODE_HEIGHT) for x, y in positions}
+    assert len(cells) == len(positions)
+    for child, parent in enumerate(parents):
+        if parent >= 0:
+            assert positions[child][1] > positions[parent][1]
+
+
+def test_layout_is_deterministic():
+    parents = [-1] + [0] * 50 + [i % 50 + 1 for i in range(500)]
+
+    assert tree_layout(parents) == tree_layout(list(parents))
+
+
+def test_wide_levels_wrap_into_a_grid():
+    positions = tree_layout([-1] + [0] * 400)
+
+    xs = [x for x, _ in positions]
+    ys = [y for _, y in positions]
+    width, height = max(xs) - min(xs), max(ys) - min(ys)
+    # Neither a single 400-node row nor a single column
+    assert width < 400 * NODE_WIDTH / 4
+    assert height < 400 * NODE_HEIGHT / 4
+
+
+def test_architect_resolves_duplicate_class_names_to_nearest():
+    analysis = {"definitions": [
+        {"type": "class", "name": "Dup", "parent": None},
+        {"type": "class", "name": "Dup", "parent": None},
+        {"type": "function", "name": "m", "parent": "Dup"},
+    ], "imports": []}
+
+    graph = Architect().generate_graph(analysis)
+
+    assert {"def_1"} == {e["source"] for e in graph["edges"] if e["target"] == "def_2"}
+
+
+def test_ten_thousand_node_graph_is_fast():
+    analysis = {"definitions": _make_definitions(classes=1000, methods_per_class=8, functions=1000), "imports": []}
+
+    start = time.perf_counter()
+    graph = Architect().generate_graph(analysis)
+    elapsed = time.perf_counter() - start
+
+    assert len(graph["nodes"]) == 10001
+    assert all(set(n["position"]) == {"x", "y"} for n in graph["nodes"])
+    assert elapsed < 1.0
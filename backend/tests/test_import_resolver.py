@@ -0,0 +1,33 @@
+from services.import_resolver import ImportResolver
+
+
+def test_python_imports_resolve_absolute_relative_and_submodules():
+    resolver = ImportResolver(["app/main.py", "app/models.py", "app/util/__init__.py", "app/util/text.py"])
+
+    assert resolver.resolve("app/main.py", "from app.models import User") == ["app/models.py"]
+    assert resolver.resolve("app/main.py", "from .util import text") == ["app/util/text.py", "app/util/__init__.py"]
+    assert resolver.resolve("app/util/text.py", "from ..models import User") == ["app/models.py"]
+    assert resolver.resolve("app/main.py", "import os, app.util.text as t") == ["app/util/text.py"]
+    assert resolver.resolve("app/main.py", "from typing import Any") == []
+
+
+def test_other_languages():
+    resolver = ImportResolver([
+        "web/app.ts", "web/api/index.ts", "web/util.js",
+        "src/main/java/com/acme/Service.java", "src/main/java/com/acme/Repo.java",
+        "lib/core.c", "include/core.h",
+    ])
+
+    assert resolver.resolve("web/app.ts", "import { get } from './api';") == ["web/api/index.ts"]
+    assert resolver.resolve("web/app.ts", "import u from \"./util\";") == ["web/util.js"]
+    assert resolver.resolve("web/app.ts", "import React from 'react';") == []
+    assert resolver.resolve("src/main/java/com/acme/Service.java", "import com.acme.Repo;") == ["src/main/java/com/acme/Repo.java"]
+    assert resolver.resolve("lib/core.c", '#include "core.h"') == ["include/core.h"]
+    assert resolver.resolve("lib/core.c", "#include <stdio.h>") == []
+
+
+def test_ambiguous_module_names_resolve_to_nothing():
+    resolver = ImportResolver(["a/utils.py", "b/utils.py", "main.py"])
+
+    assert resolver.resolve("main.py", "import utils") == []
+    assert resolver.resolve("main.py", "import a.utils") == ["a/utils.py"]
@@ -0,0 +1,245 @@
+import asyncio
+
+import pytest
+
+from services.jobs import JobLimitError, JobManager, JobStore, FAILED, QUEUED, RUNNING, SUCCEEDED
+from services.llm_scheduler import current_priority, PRIORITY_BACKGROUND
+
+
+def _manager(tmp_path, **overrides) -> JobManager:
+    options = {"workers": 1, "max_running_per_client": 1, "max_queued_per_client": 100, "retention_seconds": 3600}
+    options.update(overrides)
+    return JobManager(JobStore(str(tmp_path / "jobs.sqlite3")), **options)
+
+
+async def _wait_finished(manager: JobManager, job_id: str):
+    async for state in manager.watch(job_id):
+        last = state
+    return last
+
+
+def test_job_runs_in_background_with_progress(tmp_path):
+    manager = _manager(tmp_path)
+    priorities = []
+
+    async def handler(params, progress):
+        priorities.append(current_priority.get())
+        for done in range(1, 4):
+            progress("parse", done, 3)
+            await asyncio.sleep(0)
+        return b'{"value": %d}' % params["value"]
+
+    manager.register("work", handler)
+
+    async def scenario():
+        job = await manager.submit("work", {"value": 7}, "alice")
+        assert job["status"] == QUEUED
+        states = [state async for state in manager.watch(job["id"])]
+        await manager.stop()
+        return job, states
+
+    job, states = asyncio.run(scenario())
+
+    assert [s["status"] for s in states][-1] == SUCCEEDED
+    assert {"stage": "parse", "done": 3, "total": 3}.items() <= states[-1].items()
+    assert any(s["status"] == RUNNING and s.get("done") == 1 for s in states)
+    assert asyncio.run(manager.result(job["id"])) == b'{"value": 7}'
+    assert asyncio.run(manager.status(job["id"]))["status"] == SUCCEEDED
+    assert priorities == [PRIORITY_BACKGROUND]
+
+
+def test_failed_job_records_the_error(tmp_path):
+    manager = _manager(tmp_path)
+
+    async def handler(params, progress):
+        raise RuntimeError("GitHub API error 404")
+
+    manager.register("work", handler)
+
+    async def scenario():
+        job = await manager.submit("work", {}, "alice")
+        state = await _wait_finished(manager, job["id"])
+        await manager.stop()
+        return state
+
+    state = asyncio.run(scenario())
+
+    assert state["status"] == FAILED
+    assert state["error"] == "GitHub API error 404"
+
+
+def test_clients_are_served_round_robin(tmp_path):
+    manager = _manager(tmp_path)
+    order = []
+    submitted = asyncio.Event()
+
+    async def handler(params, progress):
+        order.append(params["name"])
+        await submitted.wait()
+        return b"{}"
+
+    manager.register("work", handler)
+
+    async def scenario():
+        # Keeps the only worker busy until every job is queued
+        first = await manager.submit("work", {"name": "first"}, "other")
+        bulk = [await manager.submit("work", {"name": f"bulk{i}"}, "bulk") for i in range(5)]
+        interactive = await manager.submit("work", {"name": "interactive"}, "interactive")
+        submitted.set()
+        for job in [first] + bulk + [interactive]:
+            await _wait_finished(manager, job["id"])
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+    # The late client's job runs right after the first bulk job, not after the whole bulk queue
+    assert order[:3] == ["first", "bulk0", "interactive"]
+    assert sorted(order) == sorted(["first"] + [f"bulk{i}" for i in range(5)] + ["interactive"])
+
+
+def test_per_client_queue_limit(tmp_path):
+    manager = _manager(tmp_path, max_queued_per_client=2)
+
+    async def handler(params, progress):
+        await asyncio.sleep(1)
+        return b"{}"
+
+    manager.register("work", handler)
+
+    async def scenario():
+        await manager.submit("work", {}, "alice")  # picked up by the worker
+        await asyncio.sleep(0)
+        await manager.submit("work", {}, "alice")
+        await manager.submit("work", {}, "alice")
+        with pytest.raises(JobLimitError):
+            await manager.submit("work", {}, "alice")
+        await manager.submit("work", {}, "bob")
+        await manager.stop()
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_jobs_resume_after_restart(tmp_path):
+    async def hang(params, progress):
+        progress("fetch")
+        await asyncio.sleep(60)
+
+    async def finish(params, progress):
+        return b'{"ok": true}'
+
+    first = _manager(tmp_path)
+    first.register("work", hang)
+
+    async def crash():
+        job = await first.submit("work", {}, "alice")
+        queued = await first.submit("work", {}, "bob")
+        await asyncio.sleep(0.05)
+        assert (await first.status(job["id"]))["status"] == RUNNING
+        await first.stop()  # as if the process died mid-job
+        return job, queued
+
+    job, queued = asyncio.run(crash())
+    first.store.close()
+
+    second = _manager(tmp_path)
+    second.register("work", finish)
+
+    async def resume():
+        second.start()
+        states = [await _wait_finished(second, job["id"]), await _wait_finished(second, queued["id"])]
+        await second.stop()
+        return states
+
+    assert [s["status"] for s in asyncio.run(resume())] == [SUCCEEDED, SUCCEEDED]
+    assert asyncio.run(second.result(job["id"])) == b'{"ok": true}'
+
+
+def test_workers_sharing_a_database_run_each_job_once(tmp_path):
+    runs = []
+
+    async def handler(params, progress):
+        runs.append(params["name"])
+        progress("parse", 1, 2)
+        await asyncio.sleep(0.3)
+        return b"{}"
+
+    first, second = _manager(tmp_path), _manager(tmp_path)
+    for manager in (first, second):
+        manager.register("work", handler)
+
+    async def scenario():
+        job = await first.submit("work", {"name": "A"}, "alice")
+        await asyncio.sleep(0.05)
+        second.start()  # another app worker booting while the job runs
+        # A websocket served by the worker that does not run the job still follows it
+        states = [state async for state in second.watch(job["id"])]
+        await first.stop()
+        await second.stop()
+        return states
+
+    states = asyncio.run(scenario())
+
+    assert runs == ["A"]
+    assert states[0]["status"] == RUNNING
+    assert states[-1]["status"] == SUCCEEDED
+
+
+def test_jobs_of_a_dead_worker_are_requeued(tmp_path):
+    async def finish(params, progress):
+        return b'{"ok": true}'
+
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    store.create({"id": "j1", "client": "alice", "kind": "work", "params": {}, "status": QUEUED, "created_at": 0.0})
+    assert store.claim("j1", "dead-worker")
+    assert not store.claim("j1", "other-worker")
+    store.update("j1", heartbeat_at=0.0)  # its owner stopped heartbeating long ago
+    store.close()
+
+    manager = _manager(tmp_path)
+    manager.register("work", finish)
+
+    async def scenario():
+        manager.start()
+        state = await _wait_finished(manager, "j1")
+        await manager.stop()
+        return state
+
+    assert asyncio.run(scenario())["status"] == SUCCEEDED
+
+
+def test_a_failing_publish_does_not_block_the_client(tmp_path):
+    manager = _manager(tmp_path)
+    publish = manager._publish
+
+    def flaky_publish(job_id, persist, **fields):
+        if fields.get("status") == RUNNING and not calls:
+            calls.append(job_id)
+            raise RuntimeError("subscriber queue broke")
+        publish(job_id, persist, **fields)
+
+    calls = []
+    manager._publish = flaky_publish
+
+    async def handler(params, progress):
+        return b"{}"
+
+    manager.register("work", handler)
+
+    async def scenario():
+        failed = await manager.submit("work", {}, "alice")
+        state = await _wait_finished(manager, failed["id"])
+        # The client's running slot was released, so its next job still runs
+        job = await manager.submit("work", {}, "alice")
+        states = [state, await _wait_finished(manager, job["id"])]
+        await manager.stop()
+        return states
+
+    states = asyncio.run(scenario())
+
+    assert [s["status"] for s in states] == [FAILED, SUCCEEDED]
+
+
+def test_store_waits_for_locks(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    assert store._connect().execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    store.close()
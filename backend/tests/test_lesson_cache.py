@@ -0,0 +1,9 @@
+from services.lesson_cache import LessonCache
+
+
+def test_key_changes_with_prompt_version(mock_code_analysis):
+    first = LessonCache.make_key(mock_code_analysis, "1", "gemini")
+    second = LessonCache.make_key(mock_code_analysis, "2", "gemini")
+
+    assert first != second
+    assert first == LessonCache.make_key(dict(mock_code_analysis), "1", "gemini")
@@ -0,0 +1,37 @@
+import json
+
+from services.lesson_stream import LessonStreamParser
+
+LESSON_TEXT = "```json\n" + json.dumps({
+    "chapters": [
+        {"title": "Intro", "content": 'Braces { and quotes " inside strings'},
+        {"title": "Logic", "content": "Details"}
+    ],
+    "quiz": [
+        {"question": "Q?", "options": [{"text": "A", "id": "a"}], "answer": "a"}
+    ]
+}) + "\n```"
+
+
+def test_emits_items_as_they_complete():
+    parser = LessonStreamParser()
+    events = []
+    first_chapter_at = None
+
+    for i, ch in enumerate(LESSON_TEXT):
+        events.extend(parser.feed(ch))
+        if events and first_chapter_at is None:
+            first_chapter_at = i
+
+    assert [kind for kind, _ in events] == ["chapter", "chapter", "quiz"]
+    assert events[0][1]["content"] == 'Braces { and quotes " inside strings'
+    assert events[2][1]["options"] == [{"text": "A", "id": "a"}]
+    # The first chapter is available long before the document ends
+    assert first_chapter_at < len(LESSON_TEXT) // 2
+
+
+def test_nested_objects_are_not_emitted_separately():
+    parser = LessonStreamParser()
+    events = parser.feed(LESSON_TEXT)
+
+    assert len(events) == 3
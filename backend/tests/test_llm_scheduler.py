@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.llm_scheduler import LLMScheduler, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, is_retryable
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+def _scheduler(**overrides):
+    options = dict(max_in_flight=2, requests_per_minute=6000, tokens_per_minute=10 ** 9,
+                   max_retries=3, backoff_base=0.001, backoff_max=0.01)
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+def test_in_flight_limit_is_respected():
+    scheduler = _scheduler(max_in_flight=2)
+    running = 0
+    peak = 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "ok"
+
+    async def run():
+        return await asyncio.gather(*[scheduler.submit(call) for _ in range(10)])
+
+    assert asyncio.run(run()) == ["ok"] * 10
+    assert peak == 2
+    assert scheduler.stats()["max_queue_depth"] >= 8
+
+
+def test_interactive_requests_jump_the_queue():
+    scheduler = _scheduler(max_in_flight=1)
+    order = []
+
+    def make_call(label):
+        async def call():
+            order.append(label)
+            await asyncio.sleep(0.01)
+        return call
+
+    async def run():
+        first = asyncio.ensure_future(scheduler.submit(make_call("first")))
+        await asyncio.sleep(0)  # "first" now holds the only slot
+        background = [asyncio.ensure_future(scheduler.submit(make_call(f"bg{i}"), priority=PRIORITY_BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0)
+        with scheduler.priority(PRIORITY_INTERACTIVE):
+            interactive = asyncio.ensure_future(scheduler.submit(make_call("interactive")))
+        await asyncio.gather(first, interactive, *background)
+
+    asyncio.run(run())
+    assert order == ["first", "interactive", "bg0", "bg1", "bg2"]
+
+
+def test_quota_errors_are_retried_with_backoff():
+    scheduler = _scheduler()
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise QuotaError("429 quota exceeded")
+        return "done"
+
+    assert asyncio.run(scheduler.submit(flaky)) == "done"
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_non_retryable_errors_fail_fast():
+    scheduler = _scheduler()
+    attempts = 0
+
+    async def broken():
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scheduler.submit(broken))
+    assert attempts == 1
+    assert scheduler.stats()["failed"] == 1
+
+
+def test_requests_per_minute_bucket_paces_calls():
+    scheduler = _scheduler(max_in_flight=10, requests_per_minute=1200)  # 20 per second
+    scheduler.requests.tokens = 0
+
+    async def call():
+        return None
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[scheduler.submit(call) for _ in range(4)])
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_is_retryable():
+    assert is_retryable(QuotaError())
+    assert not is_retryable(ValueError())
+
+
+def test_sync_callers_share_the_in_flight_limit():
+    scheduler = _scheduler(max_in_flight=1)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def blocking_call():
+        nonlocal running, peak
+        with scheduler.slot_sync():
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+
+    async def async_call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def run():
+        first = asyncio.ensure_future(scheduler.submit(async_call))
+        await asyncio.sleep(0)  # the loop's caller holds the slot; the threads queue behind it
+        await asyncio.gather(
+            first,
+            *[asyncio.to_thread(blocking_call) for _ in range(3)],
+            *[scheduler.submit(async_call) for _ in range(2)],
+        )
+
+    asyncio.run(run())
+    assert peak == 1
+    assert scheduler.stats()["completed"] == 6
+    assert scheduler.stats()["in_flight"] == 0
+
+
+def test_sync_slot_without_a_loop_and_never_on_one():
+    scheduler = _scheduler()
+    with scheduler.slot_sync():
+        assert scheduler.stats()["in_flight"] == 1
+    assert scheduler.stats()["in_flight"] == 0
+
+    async def on_the_loop():
+        with scheduler.slot_sync():
+            pass
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(on_the_loop())
@@ -0,0 +1,57 @@
+import asyncio
+
+import httpx
+
+from benchmarks.loadtest import classify, create_fake_github, parse_mix, parse_server_timing, percentile, summarize
+from services.github_loader import _decode_content
+
+
+def test_fake_github_serves_contents_and_honours_etags():
+    app = create_fake_github(small_lines=90, huge_lines=900)
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://github") as client:
+            url = "/repos/o/r/contents/small/a.py"
+            first = await client.get(url)
+            revalidated = await client.get(url, headers={"If-None-Match": first.headers["ETag"]})
+            huge = await client.get("/repos/o/r/contents/huge/a.py")
+            stats = (await client.get("/_stats")).json()
+            return first, revalidated, huge, stats
+
+    first, revalidated, huge, stats = asyncio.run(scenario())
+    source = _decode_content(first.json()).decode("utf-8")
+    assert source.startswith("# a.py\n") and "class Model0" in source
+    assert revalidated.status_code == 304
+    assert _decode_content(huge.json()).count(b"\n") > 9 * source.count("\n")
+    assert stats == {"requests": 3, "not_modified": 1}
+
+
+def test_fake_github_error_injection():
+    app = create_fake_github(error_rate=1.0)
+
+    async def fetch():
+        async with httpx.AsyncClient(app=app, base_url="http://github") as client:
+            return await client.get("/repos/o/r/contents/small/a.py")
+
+    assert asyncio.run(fetch()).status_code == 503
+
+
+def test_classify_and_summarize():
+    assert classify(200, {"chapters": [{"title": "Intro"}]}) is None
+    assert classify(200, {"chapters": [{"title": "AI Unavailable"}]}) == "lesson"
+    assert classify(500, {"detail": "GitHub API error 503: boom"}) == "fetch"
+    assert classify(500, {"detail": "bad tree"}) == "analysis"
+
+    samples = [{"scenario": "hot-small", "seconds": i / 100, "error_stage": None} for i in range(1, 100)]
+    samples.append({"scenario": "cold-huge", "seconds": 2.0, "error_stage": "fetch",
+                    "stages": parse_server_timing("fetch;dur=1500.0, total;dur=2000.0")})
+    report = summarize(samples, elapsed=10.0)
+
+    assert report["overall"]["requests"] == 100
+    assert report["overall"]["throughput"] == 10.0
+    assert report["overall"]["error_rates"] == {"fetch": 0.01}
+    assert report["scenarios"]["hot-small"]["p50"] == 0.5
+    assert sum(b["count"] for b in report["overall"]["histogram"]) == 100
+    assert report["stages"]["fetch"]["p50"] == 1.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 0.99) == 4.0
+    assert parse_mix("hot-small=3,cold-huge") == {"hot-small": 3.0, "cold-huge": 1.0}
@@ -0,0 +1,369 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+import main
+from services.symbol_index import SymbolIndex
+
+SAMPLE_CODE = b"class A:\n    def run(self):\n        pass\n"
+LESSON = {"chapters": [{"title": "Intro", "content": "..."}], "quiz": []}
+
+
+async def _slow_fetch(repo_url, file_path):
+    await asyncio.sleep(0.3)
+    return SAMPLE_CODE
+
+
+async def _slow_lesson(analysis_data):
+    await asyncio.sleep(0.3)
+    return LESSON
+
+
+@pytest.fixture
+def patched_pipeline(tmp_path):
+    index = SymbolIndex(str(tmp_path / "symbols.sqlite3"))
+    with patch.object(main, "fetch_file_bytes_async", _slow_fetch), \
+         patch.object(main.tutor, "create_lesson_async", _slow_lesson), \
+         patch.object(main, "symbol_index", index):
+        yield
+    index.close()
+
+
+def test_analyze_returns_graph_and_lesson(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+
+    response = asyncio.run(call())
+
+    assert response.status_code == 200
+    body = response.json()
+    labels = [n["data"]["label"] for n in body["graph"]["nodes"]]
+    assert "class: A" in labels
+    assert body["chapters"][0]["title"] == "Intro"
+
+
+def test_concurrent_requests_overlap(patched_pipeline):
+    async def call_many(n):
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            # Warm the worker pool so process start-up is not measured
+            await client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+            start = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+                for _ in range(n)
+            ])
+            return time.perf_counter() - start, responses
+
+    elapsed, responses = asyncio.run(call_many(5))
+
+    assert all(r.status_code == 200 for r in responses)
+    # Serially this would take 5 * 0.6s; overlapping requests finish in roughly one round
+    assert elapsed < 1.5
+
+
+def test_stream_emits_graph_before_lesson(patched_pipeline):
+    async def fake_stream(analysis_data):
+        yield "chapter", {"title": "Intro", "content": "..."}
+        yield "quiz", {"question": "Q?", "options": [{"text": "A", "id": "a"}], "answer": "a"}
+
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze/stream", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+
+    with patch.object(main.tutor, "stream_lesson", fake_stream):
+        response = asyncio.run(call())
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["graph", "chapter", "quiz", "done"]
+    assert events[0]["data"]["nodes"]
+
+
+def test_stream_reports_an_error_instead_of_done_when_the_lesson_fails(patched_pipeline):
+    async def failing_stream(analysis_data):
+        yield "chapter", {"title": "Intro", "content": "..."}
+        raise RuntimeError("connection reset")
+
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze/stream", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+
+    with patch.object(main.tutor, "stream_lesson", failing_stream):
+        response = asyncio.run(call())
+
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["graph", "chapter", "error"]
+
+
+def test_reanalyze_reuses_artifacts_when_unchanged(patched_pipeline):
+    lesson_calls = 0
+
+    async def counting_lesson(analysis_data, file_path, previous=None):
+        nonlocal lesson_calls
+        lesson_calls += 1
+        return LESSON
+
+    async def call_twice():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            payload = {"repo_url": "https://github.com/o/r", "file_path": "reanalyze.py"}
+            first = await client.post("/reanalyze", json=payload)
+            second = await client.post("/reanalyze", json=payload)
+            return first, second
+
+    with patch.object(main.tutor, "create_incremental_lesson", counting_lesson):
+        first, second = asyncio.run(call_twice())
+
+    assert first.json()["reparse"] == "full"
+    assert second.json()["reparse"] == "incremental"
+    assert second.json()["changes"]["changed"] == []
+    assert lesson_calls == 1
+
+
+def test_reanalyze_runs_full_parses_in_the_pool(patched_pipeline):
+    pooled = []
+    run_in_process = main.run_in_process
+
+    async def recording_run_in_process(func, *args):
+        pooled.append(func.__name__)
+        return await run_in_process(func, *args)
+
+    async def lesson(analysis_data, file_path, previous=None):
+        return LESSON
+
+    async def call_twice():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            payload = {"repo_url": "https://github.com/o/r", "file_path": "pooled.py"}
+            first = await client.post("/reanalyze", json=payload)
+            parsed_after_first = list(pooled)
+            second = await client.post("/reanalyze", json=payload)
+            return first, parsed_after_first, second
+
+    with patch.object(main, "run_in_process", recording_run_in_process), \
+         patch.object(main.tutor, "create_incremental_lesson", lesson):
+        first, parsed_after_first, second = asyncio.run(call_twice())
+
+    # First parse in the pool; the (empty) edit after it reparses in-process
+    assert first.json()["reparse"] == "full"
+    assert parsed_after_first == ["analyze_source"]
+    assert second.json()["reparse"] == "incremental"
+    assert pooled == ["analyze_source"]
+
+
+def test_analyzed_symbols_are_searchable(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            await client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+            return await client.get("/symbols/search", params={"q": "ru", "repo_url": "https://github.com/o/r"})
+
+    response = asyncio.run(call())
+
+    results = response.json()["results"]
+    assert [(r["name"], r["parent"], r["file"]) for r in results] == [("run", "A", "a.py")]
+
+
+def test_symbol_search_rejects_out_of_range_limits(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return [
+                (await client.get("/symbols/search", params={"q": "ru", "limit": limit})).status_code
+                for limit in (-1, 0, 201, 200)
+            ]
+
+    # LIMIT -1 would return the whole index
+    assert asyncio.run(call()) == [422, 422, 422, 200]
+
+
+def test_analyze_reports_stage_timings(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            response = await client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "a.py"})
+            scrape = await client.get("/metrics")
+            return response, scrape
+
+    response, scrape = asyncio.run(call())
+
+    timings = dict(entry.split(";dur=") for entry in response.headers["server-timing"].split(", "))
+    for stage in ("fetch", "parse", "graph", "index", "lesson", "serialize", "total"):
+        assert stage in timings
+    assert float(timings["fetch"]) >= 300  # _slow_fetch sleeps 0.3s
+    assert scrape.headers["content-type"].startswith("text/plain")
+    assert 'codexflow_stage_duration_seconds_count{stage="lesson"}' in scrape.text
+    assert 'codexflow_requests_total{method="POST",route="/analyze",status="200"}' in scrape.text
+
+
+def test_stored_artifacts_skip_fetch_and_parse(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze", json={"repo_url": "https://github.com/o/r", "file_path": "stored.py"})
+
+    first = asyncio.run(call())
+
+    async def no_fetch(*args):
+        raise AssertionError("a stored analysis of a fresh revision needs no fetch")
+
+    async def no_parse(*args):
+        raise AssertionError("a stored analysis needs no parse")
+
+    # As seen by another worker: nothing cached in memory, the lesson already is
+    with patch.object(main, "fetch_file_bytes_async", no_fetch), \
+         patch.object(main, "run_in_process", no_parse), \
+         patch.object(main.tutor, "has_cached_lesson", lambda analysis_data: True):
+        second = asyncio.run(call())
+
+    assert second.status_code == 200
+    assert second.json()["graph"] == first.json()["graph"]
+
+
+def test_batch_analyze_merges_files_with_one_lesson(patched_pipeline):
+    sources = {
+        "pkg/app.py": b"from pkg.models import Model\n\ndef run():\n    Model().save()\n",
+        "pkg/models.py": b"class Model:\n    def save(self):\n        pass\n",
+    }
+    lessons = []
+
+    async def fetch(repo_url, file_path):
+        if file_path not in sources:
+            raise Exception("GitHub API error 404")
+        return sources[file_path]
+
+    async def lesson(analysis_data):
+        lessons.append(analysis_data)
+        return LESSON
+
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze/batch", json={
+                "repo_url": "https://github.com/o/r",
+                "file_paths": ["pkg/app.py", "pkg/models.py", "pkg/missing.py", "pkg/app.py"]
+            })
+
+    with patch.object(main, "fetch_file_bytes_async", fetch), \
+         patch.object(main.tutor, "create_lesson_async", lesson):
+        response = asyncio.run(call())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [f["path"] for f in body["files"]] == ["pkg/app.py", "pkg/models.py"]
+    assert body["errors"] == [{"path": "pkg/missing.py", "detail": "GitHub API error 404"}]
+    nodes = {n["id"]: n["data"]["label"] for n in body["graph"]["nodes"]}
+    import_edges = [(nodes[e["source"]], nodes[e["target"]]) for e in body["graph"]["edges"] if e["kind"] == "import"]
+    assert import_edges == [("pkg/app.py", "pkg/models.py")]
+    assert len(lessons) == 1 and lessons[0]["files"] == ["pkg/app.py", "pkg/models.py"]
+    assert body["chapters"][0]["title"] == "Intro"
+
+
+def test_batch_analyze_rejects_oversized_batches(patched_pipeline):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/analyze/batch", json={
+                "repo_url": "https://github.com/o/r",
+                "file_paths": [f"f{i}.py" for i in range(main.config.BATCH_MAX_FILES + 1)]
+            })
+
+    assert asyncio.run(call()).status_code == 400
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    from services.jobs import JobStore
+    store = JobStore(str(tmp_path / "jobs.sqlite3"))
+    with patch.object(main.job_manager, "store", store):
+        yield store
+    store.close()
+
+
+def test_analyze_job_reports_progress_and_result(patched_pipeline, job_store):
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            submitted = await client.post("/jobs", json={
+                "kind": "analyze", "repo_url": "https://github.com/o/r", "file_path": "a.py"
+            }, headers={"X-Client-Id": "alice"})
+            early = await client.get(f"/jobs/{submitted.json()['id']}/result")
+            seen = set()
+            while True:
+                status = (await client.get(f"/jobs/{submitted.json()['id']}")).json()
+                seen.add(status["stage"])
+                if status["status"] in ("succeeded", "failed"):
+                    break
+                await asyncio.sleep(0.02)
+            result = await client.get(f"/jobs/{submitted.json()['id']}/result")
+        await main.job_manager.stop()
+        return submitted, early, status, seen, result
+
+    submitted, early, status, seen, result = asyncio.run(call())
+
+    assert submitted.status_code == 202
+    assert submitted.json()["status"] == "queued"
+    assert early.status_code == 409
+    assert status["status"] == "succeeded"
+    assert {"fetch", "lesson"} <= seen
+    labels = [n["data"]["label"] for n in result.json()["graph"]["nodes"]]
+    assert "class: A" in labels
+    assert result.json()["chapters"][0]["title"] == "Intro"
+
+
+def test_job_websocket_streams_until_finished(patched_pipeline, job_store):
+    from starlette.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        job = client.post("/jobs", json={
+            "kind": "batch", "repo_url": "https://github.com/o/r", "file_paths": ["a.py", "b.py"]
+        }).json()
+        with client.websocket_connect(f"/jobs/{job['id']}/ws") as websocket:
+            states = []
+            while not states or states[-1]["status"] not in ("succeeded", "failed"):
+                states.append(websocket.receive_json())
+
+        unknown = client.get("/jobs/missing")
+        invalid = client.post("/jobs", json={"kind": "analyze", "repo_url": "https://github.com/o/r"})
+
+    assert states[-1]["status"] == "succeeded"
+    assert any(s["stage"] == "parse" and s["total"] == 2 for s in states)
+    assert unknown.status_code == 404
+    assert invalid.status_code == 400
+
+
+def test_mirror_update_rejects_unconfigured_repos():
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            return await client.post("/mirrors/update", json={"repo_url": "https://github.com/o/not-mirrored"})
+
+    with patch.object(main.mirror_manager, "repos", set()):
+        response = asyncio.run(call())
+
+    assert response.status_code == 404
+
+
+def test_summary_graph_nodes_expand_from_the_cached_analysis(patched_pipeline):
+    fetches = 0
+
+    async def counting_fetch(repo_url, file_path):
+        nonlocal fetches
+        fetches += 1
+        return SAMPLE_CODE
+
+    async def call():
+        async with httpx.AsyncClient(app=main.app, base_url="http://test") as client:
+            payload = {"repo_url": "https://github.com/o/r", "file_path": "a.py", "detail": "summary"}
+            analyzed = await client.post("/analyze", json=payload)
+            graph = analyzed.json()["graph"]
+            expanded = await client.get(f"/graph/{graph['graph_id']}/expand/def_0")
+            missing = await client.get(f"/graph/{graph['graph_id']}/expand/def_9")
+            invalid = await client.post("/analyze", json={**payload, "detail": "huge"})
+            return graph, expanded, missing, invalid
+
+    with patch.object(main, "fetch_file_bytes_async", counting_fetch):
+        graph, expanded, missing, invalid = asyncio.run(call())
+
+    assert graph["detail"] == "summary"
+    class_node = next(n for n in graph["nodes"] if n["id"] == "def_0")
+    assert class_node["data"]["childCount"] == 1
+    assert "def_1" not in {n["id"] for n in graph["nodes"]}
+    assert [n["data"]["label"] for n in expanded.json()["nodes"]] == ["function: run"]
+    assert fetches == 1
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
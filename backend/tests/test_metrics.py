@@ -0,0 +1,34 @@
+import pytest
+
+from services.metrics import Counter, Histogram, Registry, collect_stages, stage, stage_errors
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("demo_seconds", "Demo.", ["stage"], buckets=(0.1, 1)))
+    counter = registry.register(Counter("demo_total", "Demo.", ["stage"]))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, stage="parse")
+    counter.inc(stage='a"b')
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="parse",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{stage="parse"} 5.55' in text
+    assert 'demo_seconds_count{stage="parse"} 3' in text
+    assert 'demo_total{stage="a\\"b"} 1' in text
+    assert "# TYPE demo_seconds histogram" in text
+
+
+def test_stages_are_collected_and_errors_counted():
+    before = stage_errors.value(stage="unit-fail")
+    with collect_stages() as timings:
+        with stage("unit-ok"):
+            pass
+        with pytest.raises(ValueError):
+            with stage("unit-fail"):
+                raise ValueError("boom")
+
+    assert set(timings) == {"unit-ok", "unit-fail"}
+    assert stage_errors.value(stage="unit-fail") == before + 1
@@ -0,0 +1,115 @@
+import io
+import tarfile
+
+import pytest
+
+from agents import pipeline
+from services import github_loader
+
+
+class FakeStreamResponse:
+    def __init__(self, payload: bytes):
+        self.status_code = 200
+        self.raw = io.BytesIO(payload)
+        self.text = ""
+
+    def close(self):
+        pass
+
+
+def _make_tarball(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, text in files.items():
+            data = text.encode("utf-8")
+            info = tarfile.TarInfo(f"octo-demo-abc123/{name}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def fake_archive(monkeypatch):
+    tarball = _make_tarball({
+        "pkg/models.py": "class Model:\n    def save(self):\n        pass\n",
+        "pkg/util.py": "import os\n\ndef helper():\n    return 1\n",
+        "README.md": "# not code\n",
+    })
+    requested = []
+
+    def fake_get(url, **kwargs):
+        requested.append(url)
+        return FakeStreamResponse(tarball)
+
+    monkeypatch.setattr(github_loader._session, "get", fake_get)
+    return requested
+
+
+def test_iter_repo_archive_filters_supported_files(fake_archive):
+    entries = dict(github_loader.iter_repo_archive("https://github.com/octo/demo", {".py"}))
+
+    assert sorted(entries) == ["pkg/models.py", "pkg/util.py"]
+    assert fake_archive == ["https://api.github.com/repos/octo/demo/tarball"]
+
+
+def test_run_repo_analysis_merges_files(fake_archive):
+    repo_analysis, graph = pipeline.run_repo_analysis("https://github.com/octo/demo")
+
+    assert [f["path"] for f in repo_analysis["files"]] == ["pkg/models.py", "pkg/util.py"]
+    names = {(d["file"], d["name"]) for d in repo_analysis["definitions"]}
+    assert names == {("pkg/models.py", "Model"), ("pkg/models.py", "save"), ("pkg/util.py", "helper")}
+    assert repo_analysis["imports"] == ["import os"]
+
+    labels = [n["data"]["label"] for n in graph["nodes"]]
+    assert "pkg/models.py" in labels
+    assert "function: save" in labels
+    assert len(fake_archive) == 1
+
+
+def test_combine_analyses_shifts_offsets_into_the_combined_source():
+    sources = {"a.py": b"def run():\n    pass\n", "b.py": b"class B:\n    pass\n"}
+    files = [pipeline.analyze_source(source, path) for path, source in sources.items()]
+
+    combined = pipeline.combine_analyses(files, sources)
+
+    assert combined["files"] == ["a.py", "b.py"]
+    for defn in combined["definitions"]:
+        body = sources[defn["file"]]
+        assert combined["source"][defn["start_byte"]:defn["end_byte"]] in body
+    assert [d["name"] for d in combined["definitions"]] == ["run", "B"]
+    assert combined["source"][combined["definitions"][1]["start_byte"]:].startswith(b"class B:")
+
+
+def test_run_static_analysis_summarizes_large_files(monkeypatch):
+    monkeypatch.setattr(pipeline.config, "GRAPH_SUMMARY_MIN_DEFINITIONS", 3)
+    code = b"class A:\n    def a(self): pass\n    def b(self): pass\n"
+
+    _, small, _ = pipeline.run_static_analysis(b"def f(): pass\n", "f.py", "auto")
+    _, large, _ = pipeline.run_static_analysis(code, "a.py", "auto")
+    _, forced, _ = pipeline.run_static_analysis(code, "a.py", "full")
+
+    assert small["detail"] == "full"
+    assert large["detail"] == "summary"
+    assert [n["id"] for n in large["nodes"]] == ["file_main", "def_0"]
+    assert len(forced["nodes"]) == 4
+    with pytest.raises(ValueError):
+        pipeline.graph_detail("huge", 1)
+
+
+def test_stored_artifacts_skip_parsing(fake_archive, monkeypatch):
+    pipeline.run_repo_analysis("https://github.com/octo/demo")
+
+    def no_parse(*args, **kwargs):
+        raise AssertionError("stored blobs must not be parsed again")
+
+    monkeypatch.setattr(pipeline.archaeologist, "analyze_file", no_parse)
+    monkeypatch.setattr(pipeline, "get_process_pool", lambda: None)
+    repo_analysis, _ = pipeline.run_repo_analysis("https://github.com/octo/demo")
+    assert [f["path"] for f in repo_analysis["files"]] == ["pkg/models.py", "pkg/util.py"]
+
+    revision = github_loader.git_blob_sha(b"class Model:\n    def save(self):\n        pass\n")
+    analysis_data, graph = pipeline.load_artifacts(revision, "other/models.py", "full")
+    assert analysis_data["revision"] == revision
+    assert [d["name"] for d in analysis_data["definitions"]] == ["Model", "save"]
+    assert graph["detail"] == "full"
+    assert pipeline.load_artifacts("0" * 40, "a.py", "full") is None
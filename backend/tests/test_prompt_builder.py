@@ -0,0 +1,60 @@
+from services.ast_parser import AstParser
+from services.prompt_builder import (
+    build_single_prompt, build_reduce_prompt, chunk_by_definitions, estimate_tokens, select_evenly
+)
+
+
+def _big_module(functions: int) -> str:
+    return "import os\n\n" + "".join(
+        f"def func_{i}(x):\n    total = x\n    for j in range(10):\n        total += j * {i}\n    return total\n\n"
+        for i in range(functions)
+    )
+
+
+def test_chunks_respect_budget_and_definition_boundaries():
+    code = _big_module(200)
+    definitions = AstParser().extract_definitions(code, "big.py")
+
+    chunks = chunk_by_definitions(code, definitions, max_tokens=500)
+
+    assert "".join(chunks) == code
+    assert all(estimate_tokens(c) <= 500 for c in chunks)
+    # Every chunk after the first starts exactly at a definition
+    assert all(c.startswith("def func_") for c in chunks[1:])
+
+
+def test_oversized_definition_is_split_by_lines():
+    code = "def huge():\n" + "    x = 1\n" * 1000
+    definitions = AstParser().extract_definitions(code, "huge.py")
+
+    chunks = chunk_by_definitions(code, definitions, max_tokens=200)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == code
+
+
+def test_single_prompt_is_compact_and_truncated_to_budget():
+    code = _big_module(2000)
+    analysis = {"definitions": AstParser().extract_definitions(code, "big.py"), "imports": ["import os"], "source": code.encode("utf-8")}
+
+    prompt = build_single_prompt(analysis, budget_tokens=150_000)
+
+    assert '": ' not in prompt.split("Code Metadata:")[1].split("Source code:")[0]
+    assert "start_byte" not in prompt
+    assert estimate_tokens(build_single_prompt(analysis, budget_tokens=4000)) < 4000 + 500
+
+
+def test_reduce_prompt_fits_budget():
+    code = _big_module(3000)
+    analysis = {"definitions": AstParser().extract_definitions(code, "big.py"), "imports": [], "source": code.encode("utf-8")}
+
+    prompt = build_reduce_prompt(analysis, ["summary one", "summary two"], budget_tokens=3000)
+
+    assert estimate_tokens(prompt) <= 3000
+    assert "Part 2: summary two" in prompt
+    assert code[-200:] not in prompt
+
+
+def test_select_evenly_covers_whole_list():
+    assert select_evenly(list(range(100)), 4) == [0, 25, 50, 75]
+    assert select_evenly([1, 2], 4) == [1, 2]
@@ -0,0 +1,55 @@
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+
+from agents.pipeline import run_static_analysis
+from schemas import AnalyzeResponse, GraphData
+from services.responses import choose_encoding, json_response, trusted_dump
+
+CODE = "import os\n\nclass A:\n    def run(self):\n        helper()\n\ndef helper():\n    pass\n"
+LESSON = {
+    "chapters": [{"title": "Intro", "content": "..."}],
+    "quiz": [{"question": "Q?", "options": [{"text": "A", "id": "a"}], "answer": "a"}]
+}
+
+
+def _request(accept_encoding: str = "") -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+def test_trusted_dump_matches_validated_dump():
+    _, graph, _ = run_static_analysis(CODE, "a.py")
+    content = {"graph": graph, **LESSON}
+
+    # Architect adds presentation keys (style, animated) the schema drops
+    assert "style" in graph["nodes"][1]
+    assert trusted_dump(AnalyzeResponse, content) == AnalyzeResponse(**content).model_dump()
+
+
+def test_trusted_dump_requires_required_fields():
+    with pytest.raises(KeyError):
+        trusted_dump(GraphData, {"nodes": []})
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("") is None
+
+
+def test_json_response_compresses_large_bodies_only():
+    _, graph, _ = run_static_analysis(CODE * 200, "a.py")
+    content = {"graph": graph, **LESSON}
+
+    compressed = json_response(_request("gzip"), AnalyzeResponse, content)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(compressed.body)) == AnalyzeResponse(**content).model_dump()
+
+    plain = json_response(_request(), AnalyzeResponse, content)
+    assert "content-encoding" not in plain.headers
+
+    small = json_response(_request("gzip"), AnalyzeResponse, {"graph": {"nodes": [], "edges": []}, "chapters": [], "quiz": []})
+    assert "content-encoding" not in small.headers
@@ -0,0 +1,56 @@
+import pytest
+
+from services.symbol_index import SymbolIndex
+
+REPO = "https://github.com/octo/demo"
+
+
+def _defn(name, kind="function", parent=None, line=0):
+    return {"name": name, "type": kind, "parent": parent, "start_line": line, "end_line": line + 2}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SymbolIndex(str(tmp_path / "symbols.sqlite3"))
+    index.upsert_file(REPO, "app/models.py", "sha1", [
+        _defn("UserModel", "class"), _defn("get_user", parent="UserModel", line=3), _defn("get_user_by_email")
+    ])
+    index.upsert_file(REPO, "app/views.py", "sha2", [_defn("render_user"), _defn("get_order")])
+    yield index
+    index.close()
+
+
+def test_prefix_search_is_case_insensitive(index):
+    results = index.search("get_user", repo=REPO)
+
+    assert [r["name"] for r in results] == ["get_user", "get_user_by_email"]
+    assert results[0]["parent"] == "UserModel"
+    assert results[0]["file"] == "app/models.py"
+    assert index.search("usermodel")[0]["kind"] == "class"
+
+
+def test_underscore_is_not_a_wildcard(index):
+    assert index.search("get_u", repo=REPO)
+    assert not index.search("getXu", repo=REPO)
+
+
+def test_fuzzy_search_tolerates_typos(index):
+    results = index.search("get_usr", repo=REPO, mode="fuzzy")
+
+    assert results[0]["name"] == "get_user"
+
+
+def test_upsert_replaces_previous_revision(index):
+    index.upsert_file(REPO, "app/views.py", "sha3", [_defn("render_page")])
+
+    assert index.search("render", repo=REPO)[0]["revision"] == "sha3"
+    assert not index.search("get_order", repo=REPO)
+    assert "get_order" not in [r["name"] for r in index.search("get_ordr", repo=REPO, mode="fuzzy")]
+    assert index.count() == 4
+
+
+def test_index_persists_across_connections(index, tmp_path):
+    index.close()
+    reopened = SymbolIndex(str(tmp_path / "symbols.sqlite3"))
+
+    assert reopened.count() == 5
@@ -0,0 +1,62 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from services.ttl_cache import TTLCache
+
+LESSON = {"chapters": [{"title": "Intro", "content": "..."}], "quiz": []}
+
+
+@pytest.fixture
+def cache():
+    return TTLCache(max_entries=2, ttl_seconds=60)
+
+
+def test_concurrent_requests_share_one_generation(cache):
+    calls = 0
+
+    async def generate():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return LESSON
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_compute("k", generate) for _ in range(20)])
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(r == LESSON for r in results)
+    assert cache.stats()["coalesced"] == 19
+
+
+def test_cached_result_is_reused_until_ttl(cache):
+    async def generate():
+        return LESSON
+
+    asyncio.run(cache.get_or_compute("k", generate))
+    asyncio.run(cache.get_or_compute("k", generate))
+    assert cache.stats()["hits"] == 1
+
+    with patch("services.ttl_cache.time.monotonic", return_value=10 ** 9):
+        assert cache.get("k") is None
+
+
+def test_size_bound_evicts_oldest(cache):
+    for key in ("a", "b", "c"):
+        cache.put(key, LESSON)
+
+    assert cache.get("a") is None
+    assert cache.get("c") == LESSON
+    assert cache.stats()["evictions"] == 1
+
+
+def test_uncacheable_results_are_not_stored(cache):
+    async def generate():
+        return {**LESSON, "is_fallback": True}
+
+    asyncio.run(cache.get_or_compute("k", generate, should_cache=lambda r: not r.get("is_fallback")))
+
+    assert cache.get("k") is None
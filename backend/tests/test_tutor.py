@@ -1,6 +1,15 @@
+import asyncio
+import json
+import re
+
 import pytest
 from unittest.mock import patch
-from agents.tutor import Tutor
+from agents.archaeologist import Archaeologist
+from agents.tutor import Tutor, MISSING_EXPLANATION
+from config import config
+from services.ai_service import ai_service
+from services.lesson_cache import definition_cache
+from services.llm_providers import LLMProvider, StubProvider
 
 @pytest.fixture
 def tutor():
@@ -21,3 +30,153 @@ def test_create_lesson_calls_ai_service(mock_ai_service, tutor, mock_code_analys
     # Verify it called the service with correct data
     mock_ai_service.generate_lesson_content.assert_called_once_with(mock_code_analysis)
     assert result == expected_response
+
+
+V1 = b"class Service:\n    def start(self):\n        return 1\n\n    def stop(self):\n        return 0\n\ndef main():\n    Service().start()\n"
+V2 = V1.replace(b"return 1", b"return 2")
+QUIZ = [{"question": "Q?", "options": [{"text": "A", "id": "a"}], "answer": "a"}]
+
+
+class RecordingProvider(LLMProvider):
+    """Explains every definition id it is asked about and records the prompts."""
+    model_name = "recording"
+
+    def __init__(self):
+        self.prompts = []
+        self.fail = False
+
+    async def generate(self, prompt: str) -> str:
+        if self.fail:
+            raise RuntimeError("quota")
+        self.prompts.append(prompt)
+        if '"quiz"' in prompt and "Explain each" not in prompt:
+            return json.dumps({"quiz": QUIZ})
+        ids = re.findall(r"^\[(\d+)\] (.+)$", prompt, re.MULTILINE)
+        return json.dumps({"explanations": [{"id": i, "content": f"About {label}"} for i, label in ids]})
+
+    def explained(self):
+        return [label for p in self.prompts for _, label in re.findall(r"^\[(\d+)\] (.+)$", p, re.MULTILINE)
+                if "Explain each" in p]
+
+    def quizzes(self):
+        return [p for p in self.prompts if "Explain each" not in p]
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = RecordingProvider()
+    monkeypatch.setattr(ai_service, "_provider", provider)
+    monkeypatch.setattr(ai_service, "_resolved", True)
+    definition_cache.clear()
+    yield provider
+    definition_cache.clear()
+
+
+def _lesson(source, previous=None):
+    analysis = Archaeologist().analyze_file(source, "svc.py")
+    return asyncio.run(Tutor().create_incremental_lesson(analysis, "svc.py", previous))
+
+
+def test_first_lesson_has_one_chapter_per_definition(provider):
+    lesson = _lesson(V1)
+
+    assert [c["title"] for c in lesson["chapters"]] == [
+        "class: Service", "function: Service.start", "function: Service.stop", "function: main"
+    ]
+    assert lesson["chapters"][1]["content"] == "About function: Service.start"
+    assert lesson["quiz"] == QUIZ
+    assert len(provider.quizzes()) == 1
+    assert Tutor().is_complete(lesson)
+
+
+def test_only_changed_definitions_are_regenerated(provider):
+    first = _lesson(V1)
+    provider.prompts.clear()
+
+    second = _lesson(V2, first)
+
+    assert provider.explained() == ["function: Service.start"]
+    assert [c["title"] for c in second["chapters"]] == [c["title"] for c in first["chapters"]]
+    # The quiz is regenerated, focused on the changed definition
+    assert len(provider.quizzes()) == 1
+    assert "return 2" in provider.quizzes()[0]
+
+
+def test_unchanged_definitions_reuse_chapters_and_quiz(provider):
+    first = _lesson(V1)
+    provider.prompts.clear()
+
+    # Only a comment outside every definition changed
+    second = _lesson(V1 + b"# trailing comment\n", first)
+
+    assert provider.prompts == []
+    assert second["chapters"] == first["chapters"]
+    assert second["quiz"] == first["quiz"]
+
+
+def test_failed_explanations_are_not_cached(provider):
+    provider.fail = True
+    assert Tutor().is_fallback(_lesson(V1))
+
+    provider.fail = False
+    lesson = _lesson(V1)
+    assert lesson["chapters"][0]["content"] == "About class: Service"
+
+
+def test_definition_calls_are_capped(provider, monkeypatch):
+    monkeypatch.setattr(config, "LESSON_CHUNK_TOKENS", 1)  # one definition per batch
+    monkeypatch.setattr(config, "LESSON_MAX_DEFINITION_CALLS", 2)
+
+    first = _lesson(V1)
+
+    assert provider.explained() == ["class: Service", "function: Service.start"]
+    assert first["chapters"][2]["content"].startswith("`def stop(self):` (")
+    assert not Tutor().is_complete(first)
+
+    # The summarized definitions are explained by the next analysis
+    provider.prompts.clear()
+    second = _lesson(V1, first)
+    assert provider.explained() == ["function: Service.stop", "function: main"]
+    assert second["chapters"][3]["content"] == "About function: main"
+    assert Tutor().is_complete(second)
+
+
+def test_incremental_lesson_from_the_stub_provider(monkeypatch):
+    # LLM_PROVIDER=stub must serve /reanalyze offline, not the fallback lesson
+    monkeypatch.setattr(ai_service, "_provider", StubProvider())
+    monkeypatch.setattr(ai_service, "_resolved", True)
+    definition_cache.clear()
+
+    lesson = _lesson(V1)
+    definition_cache.clear()
+
+    assert Tutor().is_complete(lesson)
+    assert not Tutor().is_fallback(lesson)
+    assert [c["title"] for c in lesson["chapters"]][-1] == "function: main"
+    assert all(MISSING_EXPLANATION != c["content"] for c in lesson["chapters"])
+    assert len(lesson["quiz"]) == 2
+
+
+class FailingStreamProvider(LLMProvider):
+    """Streams one chapter, then fails."""
+    model_name = "failing-stream"
+
+    async def stream(self, prompt: str):
+        yield '{"chapters": [{"title": "A", "content": "a"}, '
+        raise RuntimeError("connection reset")
+
+
+def test_failed_streams_raise_and_are_not_cached(monkeypatch, mock_code_analysis):
+    monkeypatch.setattr(ai_service, "_provider", FailingStreamProvider())
+    monkeypatch.setattr(ai_service, "_resolved", True)
+    events = []
+
+    async def consume():
+        async for event in Tutor().stream_lesson(mock_code_analysis):
+            events.append(event)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume())
+
+    assert events == [("chapter", {"title": "A", "content": "a"})]
+    assert not Tutor().has_cached_lesson(mock_code_analysis)
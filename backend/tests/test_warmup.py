@@ -0,0 +1,40 @@
+import asyncio
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+from config import config
+from services import warmup
+from services.ast_parser import AstParser
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_importing_the_app_does_not_load_the_llm_sdk():
+    code = "import sys, main; print('google.generativeai' in sys.modules)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR)
+    assert output.decode().strip().splitlines()[-1] == "False"
+
+
+def test_configured_languages():
+    with patch.object(config, "PREWARM_LANGUAGES", "*"):
+        assert set(warmup.configured_languages()) == {"python", "javascript", "typescript", "java", "c", "cpp"}
+    with patch.object(config, "PREWARM_LANGUAGES", " python, java ,"):
+        assert warmup.configured_languages() == ["python", "java"]
+    with patch.object(config, "PREWARM_LANGUAGES", ""):
+        assert warmup.configured_languages() == []
+
+
+def test_prewarm_loads_grammars_and_starts_workers():
+    parser = AstParser()
+    with patch.object(warmup, "parser_service", parser), \
+         patch.object(config, "PREWARM_LANGUAGES", "python,java"), \
+         patch.object(config, "PREWARM_WORKERS", True):
+        timings = asyncio.run(warmup.prewarm())
+
+    assert set(parser.parsers) == {"python", "java"}
+    assert parser.queries["python"] is not None
+    assert set(timings) == {"grammars", "workers", "clients"}
+    # Already loaded: prewarming again costs nothing
+    assert all(seconds < 0.001 for seconds in parser.prewarm(["python", "java"]).values())
@@ -14,3 +14,13 @@ export const analyzeRepo = async (repoUrl, filePath) => {
         throw error;
     }
 };
+
+export const expandGraphNode = async (graphId, nodeId) => {
+    try {
+        const response = await axios.get(`${API_BASE_URL}/graph/${graphId}/expand/${nodeId}`);
+        return response.data;
+    } catch (error) {
+        console.error("API Error:", error);
+        throw error;
+    }
+};
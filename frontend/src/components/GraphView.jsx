@@ -1,4 +1,4 @@
-import React, { useMemo } from 'react';
+import React, { useCallback } from 'react';
 import ReactFlow, {
     Controls,
     Background,
@@ -9,11 +9,32 @@ import ReactFlow, {
 import 'reactflow/dist/style.css';
 import { motion } from 'framer-motion';
 import { Network } from 'lucide-react';
+import { expandGraphNode } from '../api';
 
-const GraphView = ({ initialNodes, initialEdges }) => {
+const GraphView = ({ initialNodes, initialEdges, graphId }) => {
     const [nodes, setNodes, onNodesChange] = useNodesState(initialNodes || []);
     const [edges, setEdges, onEdgesChange] = useEdgesState(initialEdges || []);
 
+    // Summary graphs: collapsed nodes load their children on click
+    const onNodeClick = useCallback(async (_, node) => {
+        if (!graphId || !node.data?.collapsed) return;
+        const children = await expandGraphNode(graphId, node.id);
+        const added = children.nodes.map((child) => ({
+            ...child,
+            position: { x: node.position.x + child.position.x, y: node.position.y + child.position.y }
+        }));
+        const visible = new Set([...nodes.map((n) => n.id), ...added.map((n) => n.id)]);
+        setNodes((current) => [
+            ...current.map((n) => (n.id === node.id ? { ...n, data: { ...n.data, collapsed: false } } : n)),
+            ...added
+        ]);
+        setEdges((current) => {
+            const known = new Set(current.map((e) => e.id));
+            // Calls into definitions that are still collapsed are drawn once those expand
+            return [...current, ...children.edges.filter((e) => !known.has(e.id) && visible.has(e.source) && visible.has(e.target))];
+        });
+    }, [graphId, nodes, setNodes, setEdges]);
+
     return (
         <motion.div
             initial={{ opacity: 0, scale: 0.95 }}
@@ -52,6 +73,7 @@ const GraphView = ({ initialNodes, initialEdges }) => {
                     edges={edges}
                     onNodesChange={onNodesChange}
                     onEdgesChange={onEdgesChange}
+                    onNodeClick={onNodeClick}
                     fitView
                     attributionPosition="bottom-right"
                     proOptions={{ hideAttribution: true }}
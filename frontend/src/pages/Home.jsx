@@ -186,7 +186,7 @@ const Home = () => {
                         </div>
                         <div className="h-[70vh] bg-background/50 rounded-b-xl overflow-hidden relative">
                              {/* Graph Component */}
-                            <GraphView initialNodes={data.graph.nodes} initialEdges={data.graph.edges} />
+                            <GraphView initialNodes={data.graph.nodes} initialEdges={data.graph.edges} graphId={data.graph.graph_id} />
                         </div>
                     </motion.section>
 